@@ -18,23 +18,43 @@ import threading
 
 
 class RegexFacilitator(object):
+    """
+    Matches patterns and keeps the last match of the calling thread
+
+    _vlan_section = regex.compile("^vlan (\d+)")
+
+    if regex.match(_vlan_section, line):
+        number = int(regex[0])
+
+    Parsers compile their patterns once at import time through regex.compile, which keeps them in a registry
+    shared by all threads.  Pattern strings are still accepted and compiled into the same registry on first use.
+    """
     def __init__(self):
-        self._m = {}
+        self._local = threading.local()
+        self._patterns = {}
 
     @property
     def m(self):
-        return self._m[threading.current_thread().ident]
+        return self._local.m
 
     @m.setter
     def m(self, match):
-        self._m[threading.current_thread().ident] = match
+        self._local.m = match
+
+    def compile(self, pattern, flags=0):
+        try:
+            return self._patterns[pattern, flags]
+        except KeyError:
+            return self._patterns.setdefault((pattern, flags), re.compile(pattern, flags))
 
     def match(self, pattern, string, flags=0):
-        self.m = re.match(pattern, string, flags)
-        return self.m
+        if isinstance(pattern, basestring):
+            pattern = self.compile(pattern, flags)
+        self._local.m = match = pattern.match(string)
+        return match
 
     def __getitem__(self, key):
-        return self.m.groups()[key]
+        return self._local.m.groups()[key]
 
 
 regex = RegexFacilitator()
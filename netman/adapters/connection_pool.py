@@ -0,0 +1,168 @@
+# Copyright 2016 Internap.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import logging
+import threading
+import time
+
+from netman.core.objects.exceptions import NoConnectionAvailable
+
+
+class ConnectionPool(object):
+    """
+    Keeps authenticated connections to switches open between requests
+
+    pool = ConnectionPool(max_per_switch=2, idle_timeout=300, borrow_timeout=60)
+
+    connection = pool.borrow(switch_descriptor, open_connection, close=close_connection, probe=is_alive)
+    ...
+    pool.give_back(switch_descriptor, connection)
+
+    A borrowed connection is either an idle one that passed its probe or a brand new one from open_connection.
+    At most max_per_switch connections are open per switch, idle or borrowed: once they are all borrowed,
+    a borrower waits up to borrow_timeout seconds for one to be given back or discarded, then gives up
+    with NoConnectionAvailable.
+    Idle connections are closed once they have not been used for idle_timeout seconds.
+    """
+    def __init__(self, max_per_switch=2, idle_timeout=300, borrow_timeout=60):
+        self.max_per_switch = max_per_switch
+        self.idle_timeout = idle_timeout
+        self.borrow_timeout = borrow_timeout
+        self.logger = logging.getLogger(__name__)
+
+        self._lock = threading.Condition()
+        self._idle = {}
+        self._borrowed = {}
+        self._opening = {}
+        self._closers = {}
+
+    def borrow(self, switch_descriptor, open_connection, close, probe=None):
+        key = _key(switch_descriptor)
+        self.evict_idle()
+
+        for connection in iter(lambda: self._take(key, close, switch_descriptor.hostname), None):
+            if probe is None or _safe_probe(probe, connection):
+                return connection
+
+            self.logger.info("Dropping dead connection to {}".format(switch_descriptor.hostname))
+            self.discard(switch_descriptor, connection)
+
+        try:
+            connection = open_connection()
+        except Exception:
+            with self._lock:
+                self._opening[key] -= 1
+                self._lock.notify_all()
+            raise
+
+        with self._lock:
+            self._opening[key] -= 1
+            self._borrowed.setdefault(key, []).append(connection)
+            self._closers[id(connection)] = close
+        return connection
+
+    def give_back(self, switch_descriptor, connection):
+        key = _key(switch_descriptor)
+
+        with self._lock:
+            self._borrowed[key].remove(connection)
+            idle = self._idle.setdefault(key, [])
+            keep = len(idle) + len(self._borrowed[key]) + self._opening.get(key, 0) < self.max_per_switch
+            if keep:
+                idle.append((connection, time.time()))
+            else:
+                close = self._closers.pop(id(connection))
+            self._lock.notify_all()
+
+        if not keep:
+            _safe_close(close, connection)
+
+        self.evict_idle()
+
+    def discard(self, switch_descriptor, connection):
+        key = _key(switch_descriptor)
+
+        with self._lock:
+            self._borrowed[key].remove(connection)
+            close = self._closers.pop(id(connection))
+            self._lock.notify_all()
+
+        _safe_close(close, connection)
+
+    def evict_idle(self):
+        expired = []
+        with self._lock:
+            limit = time.time() - self.idle_timeout
+            for key, idle in self._idle.items():
+                for connection, released_at in list(idle):
+                    if released_at < limit:
+                        idle.remove((connection, released_at))
+                        expired.append((connection, self._closers.pop(id(connection))))
+            if expired:
+                self._lock.notify_all()
+
+        for connection, close in expired:
+            _safe_close(close, connection)
+
+    def close_all(self):
+        with self._lock:
+            idle = [(connection, self._closers.pop(id(connection)))
+                    for connections in self._idle.values() for connection, _ in connections]
+            self._idle = {}
+            self._lock.notify_all()
+
+        for connection, close in idle:
+            _safe_close(close, connection)
+
+    def _take(self, key, close, hostname):
+        """
+        Borrows an idle connection, or returns None once a slot is reserved for opening a new one
+        """
+        deadline = time.time() + self.borrow_timeout
+        with self._lock:
+            while True:
+                idle = self._idle.get(key)
+                if idle:
+                    connection, _ = idle.pop()
+                    self._borrowed.setdefault(key, []).append(connection)
+                    self._closers[id(connection)] = close
+                    return connection
+
+                if len(self._borrowed.get(key, [])) + self._opening.get(key, 0) < self.max_per_switch:
+                    self._opening[key] = self._opening.get(key, 0) + 1
+                    return None
+
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    raise NoConnectionAvailable(hostname)
+                self._lock.wait(remaining)
+
+
+def _key(switch_descriptor):
+    return (switch_descriptor.model, switch_descriptor.hostname, switch_descriptor.port,
+            switch_descriptor.username, switch_descriptor.password)
+
+
+def _safe_probe(probe, connection):
+    try:
+        return probe(connection)
+    except Exception:
+        return False
+
+
+def _safe_close(close, connection):
+    try:
+        close(connection)
+    except Exception:
+        logging.getLogger(__name__).exception("Error while closing a pooled connection")
@@ -0,0 +1,71 @@
+# Copyright 2016 Internap.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import math
+import threading
+
+from netman.core.metrics import MetricsSink
+
+
+class MemoryMetricsSink(MetricsSink):
+    def __init__(self):
+        super(MemoryMetricsSink, self).__init__()
+        self._lock = threading.Lock()
+        self._histograms = {}
+
+    def histogram(self, name, value, tags=None):
+        key = (name, tuple(sorted((tags or {}).items())))
+        with self._lock:
+            if key not in self._histograms:
+                self._histograms[key] = Histogram()
+            self._histograms[key].add(value)
+
+    def get(self, name, **tags):
+        return self._histograms.get((name, tuple(sorted(tags.items()))))
+
+    def histograms(self):
+        with self._lock:
+            return [(name, dict(tags), histogram) for (name, tags), histogram in self._histograms.items()]
+
+
+class Histogram(object):
+    """
+    Counts values in buckets doubling in size, bucket n holding values up to 2 ** n
+    """
+    def __init__(self):
+        self.count = 0
+        self.total = 0
+        self.min = None
+        self.max = None
+        self.buckets = {}
+
+    def add(self, value):
+        self.count += 1
+        self.total += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+        bucket = _bucket(value)
+        self.buckets[bucket] = self.buckets.get(bucket, 0) + 1
+
+    @property
+    def mean(self):
+        return float(self.total) / self.count if self.count else None
+
+
+def _bucket(value):
+    if value <= 0:
+        return None
+    mantissa, exponent = math.frexp(value)
+    return exponent - 1 if mantissa == 0.5 else exponent
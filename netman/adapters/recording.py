@@ -0,0 +1,56 @@
+# Copyright 2016 Internap.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import gzip
+import json
+import time
+
+
+class Recording(object):
+    """
+    Events captured from a switch session along with their timing
+
+    recording.save("session.rec.gz")
+    recording = TerminalRecording.load("session.rec.gz")
+
+    Recordings are saved as gzipped json.
+    """
+    kind = None
+
+    def __init__(self, events=None):
+        self.events = events if events is not None else []
+        self._last_event_at = time.time()
+
+    def elapsed(self):
+        now = time.time()
+        elapsed, self._last_event_at = round(now - self._last_event_at, 6), now
+        return elapsed
+
+    def save(self, path):
+        with gzip.open(path, "wb") as f:
+            json.dump({"kind": self.kind, "events": self.events}, f, separators=(",", ":"))
+
+    @classmethod
+    def load(cls, path):
+        with gzip.open(path, "rb") as f:
+            content = json.load(f)
+
+        if content["kind"] != cls.kind:
+            raise ValueError("{} is a {} recording, not a {} one".format(path, content["kind"], cls.kind))
+        return cls(content["events"])
+
+
+class ReplayMismatch(Exception):
+    def __init__(self, expected, actual):
+        super(ReplayMismatch, self).__init__("Replay expected {} but got {}".format(repr(expected), repr(actual)))
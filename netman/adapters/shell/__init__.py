@@ -14,3 +14,7 @@
 
 default_command_timeout = 300
 default_connect_timeout = 60
+default_probe_timeout = 5
+default_transcript_size = 64 * 1024
+default_metrics_sink = None
+default_shared_transports = None
@@ -12,11 +12,33 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+from collections import deque
+import re
+import time
+
+from netman.adapters import shell
+
 
 class TerminalClient(object):
+    """
+    A command line session on a switch
+
+    failed is set once a command timed out, the session is then in an unknown state and should be closed.
+    exec_prompt is set by the switch adapters once logged in, a session showing another prompt is not
+    considered alive.
+    """
+    failed = False
+    exec_prompt = None
+
     def do(self, command, wait_for=None, include_last_line=False):
         raise NotImplemented()
 
+    def do_batch(self, commands):
+        return [self.do(command) for command in commands]
+
+    def do_iter(self, command):
+        return iter(self.do(command))
+
     def send_key(self, key, wait_for=None, include_last_line=False):
         raise NotImplemented()
 
@@ -25,3 +47,286 @@ class TerminalClient(object):
 
     def get_current_prompt(self):
         raise NotImplemented()
+
+    def reset_transcript(self):
+        self.transcript.clear()
+
+    def is_alive(self, timeout=None):
+        if self.failed:
+            return False
+
+        prompt = self.get_current_prompt()
+        if self.exec_prompt is not None and prompt != self.exec_prompt:
+            return False
+
+        command_timeout = self.command_timeout
+        self.command_timeout = timeout or shell.default_probe_timeout
+        try:
+            return len(self.do("")) == 0 and self.get_current_prompt() == prompt
+        finally:
+            self.command_timeout = command_timeout
+
+
+class CommandMetrics(object):
+    """
+    Reports the connection time and the timings of each command to a metrics sink
+
+    Commands are reported by verb, their keyword and known sub-command without any operand, so every
+    "show running-config ..." lands in the same histograms and names or descriptions never become tags.
+    """
+    def __init__(self, sink, tags=None):
+        self.sink = sink
+        self.tags = tags or {}
+        self.expecting_reply = False
+
+    def connected(self, started_at):
+        if self.sink is not None:
+            self.sink.histogram("shell.connect.duration", time.time() - started_at, self.tags)
+
+    def command(self, command, wait_for=None, prompt=None):
+        verb = "<reply>" if self.expecting_reply else command_verb(command)
+        self.expecting_reply = wait_for is not None and not set(_as_tuple(wait_for)) & set(_as_tuple(prompt))
+        return CommandTiming(self, verb)
+
+    def key(self, wait_for=None, prompt=None):
+        self.expecting_reply = wait_for is not None and not set(_as_tuple(wait_for)) & set(_as_tuple(prompt))
+        return CommandTiming(self, "<key>")
+
+    def batch(self):
+        self.expecting_reply = False
+        return CommandTiming(self, "<batch>")
+
+    def report(self, timing):
+        if self.sink is None:
+            return
+
+        tags = dict(self.tags, command=timing.verb)
+        if timing.first_byte_at is not None:
+            self.sink.histogram("shell.command.time_to_first_byte", timing.first_byte_at - timing.started_at, tags)
+        self.sink.histogram("shell.command.duration", time.time() - timing.started_at, tags)
+        self.sink.histogram("shell.command.bytes_received", timing.bytes_received, tags)
+
+
+class CommandTiming(object):
+    def __init__(self, metrics, verb):
+        self.metrics = metrics
+        self.verb = verb
+        self.started_at = time.time()
+        self.first_byte_at = None
+        self.bytes_received = 0
+
+    def received(self, data):
+        if self.first_byte_at is None:
+            self.first_byte_at = time.time()
+        self.bytes_received += len(data)
+
+    def done(self):
+        self.metrics.report(self)
+
+
+_verb_token = re.compile("^[a-z][a-z-]*$")
+
+_keywords_with_subcommands = frozenset([
+    "clear", "configure", "copy", "ip", "ipv6", "lldp", "show", "spanning-tree", "standby", "switchport",
+    "terminal", "vrf", "vrrp", "vrrp-extended", "write"])
+
+
+def command_verb(command):
+    words = command.split()
+    verb = words[:1] if words[:1] == ["no"] else []
+
+    keywords = words[len(verb):len(verb) + 2]
+    if keywords and _verb_token.match(keywords[0]):
+        verb.append(keywords[0])
+        if keywords[0] in _keywords_with_subcommands and len(keywords) > 1 and _verb_token.match(keywords[1]):
+            verb.append(keywords[1])
+
+    return " ".join(verb) or "<other>"
+
+
+def _as_tuple(value):
+    return (value,) if isinstance(value, basestring) else tuple(value or ())
+
+
+class Transcript(object):
+    def __init__(self, max_size=None, spill_file=None):
+        self.max_size = max_size
+        self.spill_file = spill_file
+        self._chunks = deque()
+        self._size = 0
+        self._spill = None
+
+    def append(self, data):
+        if not data:
+            return
+
+        if self.spill_file:
+            if self._spill is None:
+                self._spill = open(self.spill_file, "a")
+            self._spill.write(data)
+
+        self._chunks.append(data)
+        self._size += len(data)
+
+        if self.max_size is not None:
+            self._trim(self.max_size)
+
+    def clear(self):
+        self._chunks.clear()
+        self._size = 0
+
+    def close(self):
+        if self._spill is not None:
+            self._spill.close()
+            self._spill = None
+
+    def _trim(self, max_size):
+        while self._size > max_size:
+            overflow = self._size - max_size
+            oldest = self._chunks[0]
+            if len(oldest) <= overflow:
+                self._chunks.popleft()
+                self._size -= len(oldest)
+            else:
+                self._chunks[0] = oldest[overflow:]
+                self._size -= overflow
+
+    def __str__(self):
+        return "".join(self._chunks)
+
+
+class Prompt(object):
+    """
+    The prompt of a device, telling when the output of a command is complete
+
+    Until it is learned any line ending with one of the terminators is taken for the prompt.  Once learned
+    from a line like "switch01#", only lines made of that hostname, an optional mode and a terminator are,
+    as in "switch01>" or "switch01(config-if)#".
+    """
+    def __init__(self, terminators):
+        self.terminators = (terminators,) if isinstance(terminators, basestring) else tuple(terminators)
+        self.pattern = None
+
+        self._ending = "(?:{})".format("|".join(re.escape(t) for t in self.terminators))
+        self._learning = re.compile(r"^(.+?)(?:\([^)]*\))?" + self._ending + r"\Z")
+
+    def learn(self, line):
+        match = self._learning.match(line.strip())
+        if match:
+            self.pattern = re.compile(re.escape(match.group(1)) + r"(?:\([^)]*\))?" + self._ending + r"\Z")
+
+    def matches(self, line):
+        line = line.lstrip("\r")
+        if self.pattern is None:
+            return line.endswith(self.terminators)
+
+        return self.pattern.match(line) is not None
+
+
+class EndsWith(object):
+    def __init__(self, expect):
+        self.expect = expect if isinstance(expect, basestring) else tuple(expect)
+
+    def matches(self, line):
+        return line.endswith(self.expect)
+
+
+class PromptTail(object):
+    def __init__(self, prompt):
+        self.prompt = prompt
+        self.line = ''
+
+    def feed(self, data):
+        self.line = (self.line + data).rsplit("\n", 1)[-1]
+        return self.prompt.matches(self.line)
+
+
+class OutputLines(object):
+    """
+    Cuts the output of a command in lines as it arrives
+
+    The echo of the command is skipped, empty lines are dropped and the line holding the prompt
+    stays in partial once the output is complete.
+    """
+    def __init__(self, prompt):
+        self.prompt = prompt
+        self.lines = deque()
+        self.lines_seen = 0
+        self.partial = ''
+
+    def feed(self, data):
+        lines = (self.partial + data).split("\n")
+        self.partial = lines.pop()
+        for line in lines:
+            line = line.rstrip("\r")
+            if self.lines_seen > 0 and line:
+                self.lines.append(line)
+            self.lines_seen += 1
+
+        return self.prompt.matches(self.partial)
+
+
+class BatchOutput(object):
+    """
+    Follows the output of commands sent all at once
+
+    Every command but the first is echoed right after the prompt that ended the previous one, so
+    the output is complete when the stream ends with a prompt following the echo of the last command,
+    even if the echo of a command in between got mangled.  The output can only be split per command
+    when all of those echoes were seen, otherwise every command gets the whole output so its errors
+    are still looked for.  Only commands that cannot change the mode should be batched, as they are
+    all sent before any of their output is checked.
+    """
+    def __init__(self, commands, prompt):
+        self.commands = commands
+        self.prompt = prompt
+        self.echoes_seen = 0
+        self.last_echoes_seen = 0
+        self.lines_seen = 0
+        self.partial = ''
+
+    def feed(self, data):
+        lines = (self.partial + data).split("\n")
+        self.partial = lines.pop()
+        for line in lines:
+            line = line.rstrip("\r")
+            if self.lines_seen > 0:
+                if self._is_next_echo(line):
+                    self.echoes_seen += 1
+                if self._is_echo_of(self.commands[-1], line):
+                    self.last_echoes_seen += 1
+            self.lines_seen += 1
+
+        return self._last_command_echoed() and self.prompt.matches(self.partial)
+
+    def split(self, output):
+        self.echoes_seen = 0
+        results = [[]]
+        for line in output.splitlines()[1:]:
+            if self._is_next_echo(line):
+                self.echoes_seen += 1
+                results.append([])
+            else:
+                results[-1].append(line)
+        results[-1] = results[-1][:-1]
+
+        if len(results) != len(self.commands):
+            whole_output = [line for line in output.splitlines()[1:-1] if line and not self._follows_a_prompt(line)]
+            return [list(whole_output) for _ in self.commands]
+
+        return [filter(None, lines) for lines in results]
+
+    def _last_command_echoed(self):
+        return self.echoes_seen == len(self.commands) - 1 \
+            or self.last_echoes_seen >= self.commands[1:].count(self.commands[-1]) > 0
+
+    def _is_next_echo(self, line):
+        if self.echoes_seen >= len(self.commands) - 1:
+            return False
+        return self._is_echo_of(self.commands[self.echoes_seen + 1], line)
+
+    def _follows_a_prompt(self, line):
+        return any(self.prompt.matches(line[:end]) for end in range(1, len(line) + 1))
+
+    def _is_echo_of(self, command, line):
+        return line.endswith(command) and self.prompt.matches(line[:len(line) - len(command)])
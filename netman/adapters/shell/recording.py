@@ -0,0 +1,133 @@
+# Copyright 2016 Internap.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from collections import deque
+import time
+
+from netman.adapters.recording import Recording, ReplayMismatch
+from netman.adapters.shell.ssh import SshClient
+
+
+class TerminalRecording(Recording):
+    """
+    What was sent to a terminal and what came back, chunk by chunk
+
+    Each event is an exchange: {"sent": data, "received": [[delay, chunk], ...]} where delay is the time
+    since the previous send or chunk.  The first exchange holds what came before anything was sent and has
+    no "sent", secrets like the enable password are recorded as a None "sent".
+    """
+    kind = "terminal"
+
+    def __init__(self, events=None):
+        super(TerminalRecording, self).__init__(events)
+        self.secrets = set()
+
+    def hide(self, secret):
+        self.secrets.add(secret)
+
+    def sent(self, data):
+        self.elapsed()
+        self.events.append({"sent": None if _strip_newline(data) in self.secrets else _to_text(data),
+                            "received": []})
+
+    def received(self, data):
+        if not self.events:
+            self.events.append({"received": []})
+        self.events[-1]["received"].append([self.elapsed(), _to_text(data)])
+
+
+class ReplayClient(SshClient):
+    """
+    A terminal playing back a TerminalRecording
+
+    It can stand in for an SshClient or a TelnetClient, for example as the shell_factory of a switch:
+
+    Dell(switch_descriptor, shell_factory=functools.partial(ReplayClient, recording))
+
+    The recording itself comes from a switch given a recorder: Cisco(switch_descriptor, recorder=TerminalRecording())
+
+    With delays=True each chunk is returned after the delay it originally took to arrive.
+    """
+    def __init__(self, recording, delays=False, host="replay", username=None, password=None, **kwargs):
+        self.recording = recording
+        self.delays = delays
+        kwargs.pop("port", None)
+
+        super(ReplayClient, self).__init__(host, username, password, **kwargs)
+
+    def _open_channel(self, host, port, username, password, connect_timeout):
+        self.channel = ReplayChannel(self.recording.events, self.delays)
+
+        self._wait_for(self.prompt)
+
+
+class ReplayChannel(object):
+    def __init__(self, exchanges, delays=False):
+        self.exchanges = deque(exchanges)
+        self.delays = delays
+        self.pending = deque()
+
+        if self.exchanges and "sent" not in self.exchanges[0]:
+            self.pending.extend(self.exchanges.popleft()["received"])
+
+    @property
+    def closed(self):
+        return len(self.pending) == 0
+
+    @property
+    def eof_received(self):
+        return len(self.pending) == 0
+
+    def send(self, data):
+        if not self.exchanges:
+            raise ReplayMismatch(None, data)
+
+        exchange = self.exchanges.popleft()
+        if exchange["sent"] is not None and _normalize(exchange["sent"]) != _normalize(data):
+            raise ReplayMismatch(exchange["sent"], data)
+
+        self.pending.extend(exchange["received"])
+
+    def recv_ready(self):
+        return len(self.pending) > 0
+
+    def recv(self, size):
+        if not self.pending:
+            return ''
+
+        delay, chunk = self.pending.popleft()
+        if self.delays and delay > 0:
+            time.sleep(delay)
+
+        if len(chunk) > size:
+            self.pending.appendleft([0, chunk[size:]])
+            chunk = chunk[:size]
+
+        return _from_text(chunk)
+
+
+def _to_text(data):
+    return data.decode("latin-1") if isinstance(data, str) else data
+
+
+def _from_text(data):
+    return data.encode("latin-1") if isinstance(data, unicode) else data
+
+
+def _strip_newline(data):
+    return data.rstrip("\r\n")
+
+
+def _normalize(data):
+    return _from_text(data).replace("\r\n", "\n")
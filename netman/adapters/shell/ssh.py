@@ -14,74 +14,117 @@
 
 from _socket import timeout, gaierror
 import logging
+import select
+import threading
 import time
 
 import paramiko
 from netman.adapters import shell
 
-from netman.adapters.shell.base import TerminalClient
+from netman.adapters.shell.base import TerminalClient, Transcript, PromptTail, BatchOutput, OutputLines, \
+    CommandMetrics, Prompt, EndsWith
 from netman.core.objects.exceptions import CouldNotConnect, ConnectTimeout, CommandTimeout
 
 
 class SshClient(TerminalClient):
 
     def __init__(self, host, username, password, port=22, prompt=('>', '#'), connect_timeout=None, command_timeout=None,
-                 reading_interval=0.01, reading_chunk_size=9999):
+                 reading_chunk_size=9999, transcript_size=None, transcript_file=None, metrics_sink=None,
+                 metrics_tags=None, recorder=None, shared_transports=None):
         self.logger = logging.getLogger(__name__)
 
         self.host = host
         self.port = port
         self.username = username
         self.prompt = prompt
+        self.prompt_matcher = Prompt(prompt)
         self.command_timeout = command_timeout or shell.default_command_timeout
         connect_timeout = connect_timeout or shell.default_connect_timeout
-        self.reading_interval = reading_interval
         self.reading_chunk_size = reading_chunk_size
 
         self.current_buffer = ''
         self.client = None
         self.channel = None
-        self.full_log = ""
+        self.shared_transports = shared_transports or shell.default_shared_transports
+        self._transport_key = None
+        self.transcript = Transcript(transcript_size or shell.default_transcript_size, transcript_file)
+        self.metrics = CommandMetrics(metrics_sink or shell.default_metrics_sink,
+                                      dict(metrics_tags or {}, protocol="ssh"))
+        self._timing = None
 
+        self.recorder = recorder
+        if recorder is not None:
+            recorder.hide(password)
+
+        started_at = time.time()
         self._open_channel(host, port, username, password, connect_timeout)
+        self.metrics.connected(started_at)
+
+        if self.current_buffer:
+            self.prompt_matcher.learn(self.get_current_prompt())
 
     def do(self, command, wait_for=None, include_last_line=False):
-        self.logger.debug("[SSH][{}@{}:{}] Send >> {}".format(self.username, self.host, self.port, command))
+        self.logger.debug("[SSH][%s@%s:%s] Send >> %s", self.username, self.host, self.port, command)
 
-        self.channel.send(command + '\n')
+        self._timing = self.metrics.command(command, wait_for, self.prompt)
+        self._send(command + '\n')
         return self._read_until(wait_for, include_last_line)
 
+    def do_batch(self, commands):
+        self.logger.debug("[SSH][%s@%s:%s] Send BATCH >> %s", self.username, self.host, self.port, commands)
+
+        batch = BatchOutput(commands, self.prompt_matcher)
+        self._timing = self.metrics.batch()
+        self._send("".join(command + '\n' for command in commands))
+        self._read(batch, self.prompt)
+
+        return batch.split(self.current_buffer)
+
+    def do_iter(self, command):
+        self.logger.debug("[SSH][%s@%s:%s] Send >> %s", self.username, self.host, self.port, command)
+
+        self._timing = self.metrics.command(command)
+        self._send(command + '\n')
+        return self._iter_lines(OutputLines(self.prompt_matcher))
+
     def send_key(self, key, wait_for=None, include_last_line=False):
-        self.logger.debug("[SSH][{}@{}:{}] Send KEY >> {}".format(self.username, self.host, self.port, key))
+        self.logger.debug("[SSH][%s@%s:%s] Send KEY >> %s", self.username, self.host, self.port, key)
 
-        self.channel.send(key)
+        self._timing = self.metrics.key(wait_for, self.prompt)
+        self._send(key)
         return self._read_until(wait_for, include_last_line)
 
     def quit(self, command):
-        self.logger.debug("[SSH][{}@{}:{}] Quit >> {}".format(self.username, self.host, self.port, command))
+        self.logger.debug("[SSH][%s@%s:%s] Quit >> %s", self.username, self.host, self.port, command)
+
+        self._send(command + '\n')
+        self.transcript.close()
+
+        if self.shared_transports is not None:
+            self.shared_transports.release(self._transport_key, self.client)
 
-        self.channel.send(command + '\n')
+    @property
+    def full_log(self):
+        return str(self.transcript)
 
     def get_current_prompt(self):
         return self.current_buffer.splitlines()[-1]
 
+    def _send(self, data):
+        if self.recorder is not None:
+            self.recorder.sent(data)
+        self.channel.send(data)
+
     def _open_channel(self, host, port, username, password, connect_timeout):
-        self.client = paramiko.SSHClient()
-        self.client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
-        try:
-            self.client.connect(host,
-                                port=port,
-                                username=username,
-                                password=password,
-                                timeout=connect_timeout,
-                                allow_agent=False,
-                                look_for_keys=False)
-        except timeout:
-            raise ConnectTimeout(host, port)
-        except gaierror:
-            raise CouldNotConnect(host, port)
-
-        self.channel = self.client.invoke_shell()
+        def connect():
+            return _connect(host, port, username, password, connect_timeout)
+
+        if self.shared_transports is not None:
+            self._transport_key = (host, port, username, password)
+            self.client, self.channel = self.shared_transports.open_channel(self._transport_key, connect)
+        else:
+            self.client = connect()
+            self.channel = self.client.invoke_shell()
 
         self._wait_for(self.prompt)
 
@@ -95,16 +138,138 @@ class SshClient(TerminalClient):
         return filter(None, lines)
 
     def _wait_for(self, wait_for):
+        self._read(PromptTail(self.prompt_matcher if wait_for is self.prompt else EndsWith(wait_for)), wait_for)
+
+    def _read(self, output, expecting):
         self.current_buffer = ''
+        chunks = []
 
-        started_at = time.time()
-        while not self.current_buffer.endswith(wait_for):
-            while not self.channel.recv_ready():
-                if time.time() - started_at > self.command_timeout:
-                    raise CommandTimeout(wait_for, self.current_buffer)
-                time.sleep(self.reading_interval)
+        for read in self._receive(output, expecting, lambda: "".join(chunks)):
+            chunks.append(read)
+
+        self.current_buffer = "".join(chunks)
+
+    def _iter_lines(self, output):
+        self.current_buffer = ''
+        reading = self._receive(output, self.prompt, lambda: output.partial)
+        try:
+            for _ in reading:
+                while output.lines:
+                    yield output.lines.popleft()
+        finally:
+            for _ in reading:
+                pass
+            self.current_buffer = output.partial
+
+    def _receive(self, output, expecting, current_buffer):
+        deadline = time.time() + self.command_timeout
+        done = False
+        while not done:
+            if not self._wait_readable(deadline):
+                self.failed = True
+                raise CommandTimeout(expecting, current_buffer())
 
             read = self.channel.recv(self.reading_chunk_size)
-            self.logger.debug("[SSH][{}@{}:{}] Recv << {}".format(self.username, self.host, self.port, repr(read)))
-            self.full_log += read
-            self.current_buffer += read
+            if not read:
+                self.failed = True
+                raise CommandTimeout(expecting, current_buffer())
+
+            self.logger.debug("[SSH][%s@%s:%s] Recv << %r", self.username, self.host, self.port, read)
+            self.transcript.append(read)
+            if self.recorder is not None:
+                self.recorder.received(read)
+            if self._timing is not None:
+                self._timing.received(read)
+
+            done = output.feed(read)
+            if done and self._timing is not None:
+                self._timing.done()
+                self._timing = None
+            yield read
+
+    def _wait_readable(self, deadline):
+        while not self.channel.recv_ready():
+            if self.channel.closed or self.channel.eof_received:
+                return True
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                return False
+            select.select([self.channel], [], [], remaining)
+        return True
+
+
+class SharedTransports(object):
+    """
+    Authenticated ssh connections on which more than one shell channel can be opened
+
+    A channel for a host and credentials already connected is opened on the existing transport, which
+    saves the tcp, key exchange and authentication round trips.  Devices refusing extra sessions get a
+    new connection instead.  A connection is closed when its last channel is released.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._key_locks = {}
+        self._connections = {}
+
+    def open_channel(self, key, connect):
+        with self._key_lock(key):
+            for connection in self._connections.get(key, []):
+                if connection.accepts_channels and connection.is_active():
+                    try:
+                        channel = connection.client.invoke_shell()
+                    except paramiko.SSHException:
+                        connection.accepts_channels = False
+                        continue
+
+                    connection.channels += 1
+                    return connection.client, channel
+
+            client = connect()
+            channel = client.invoke_shell()
+            self._connections.setdefault(key, []).append(_SharedConnection(client))
+            return client, channel
+
+    def release(self, key, client):
+        with self._key_lock(key):
+            connections = self._connections.get(key, [])
+            for connection in connections:
+                if connection.client is client:
+                    connection.channels -= 1
+                    if connection.channels == 0:
+                        connections.remove(connection)
+                        client.close()
+                    return
+
+    def _key_lock(self, key):
+        with self._lock:
+            return self._key_locks.setdefault(key, threading.Lock())
+
+
+class _SharedConnection(object):
+    def __init__(self, client):
+        self.client = client
+        self.channels = 1
+        self.accepts_channels = True
+
+    def is_active(self):
+        transport = self.client.get_transport()
+        return transport is not None and transport.is_active()
+
+
+def _connect(host, port, username, password, connect_timeout):
+    client = paramiko.SSHClient()
+    client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
+    try:
+        client.connect(host,
+                       port=port,
+                       username=username,
+                       password=password,
+                       timeout=connect_timeout,
+                       allow_agent=False,
+                       look_for_keys=False)
+    except timeout:
+        raise ConnectTimeout(host, port)
+    except gaierror:
+        raise CouldNotConnect(host, port)
+
+    return client
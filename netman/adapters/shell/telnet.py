@@ -12,44 +12,86 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 from _socket import timeout, gaierror
-import re
+import select
 import telnetlib
+import time
 from telnetlib import IAC, DO, DONT, WILL, WONT
 
 from netman.adapters import shell
-from netman.adapters.shell.base import TerminalClient
+from netman.adapters.shell.base import TerminalClient, Transcript, PromptTail, BatchOutput, OutputLines, \
+    CommandMetrics, Prompt, EndsWith
 from netman.core.objects.exceptions import CouldNotConnect, CommandTimeout, ConnectTimeout
 
 
 class TelnetClient(TerminalClient):
 
     def __init__(self, host, username, password, port=23, prompt=('>', '#'),
-                 connect_timeout=None, command_timeout=None, **_):
+                 connect_timeout=None, command_timeout=None, transcript_size=None, transcript_file=None,
+                 metrics_sink=None, metrics_tags=None, recorder=None, **_):
         self.prompt = prompt
+        self.prompt_matcher = Prompt(prompt)
         self.command_timeout = command_timeout or shell.default_command_timeout
         connect_timeout = connect_timeout or shell.default_connect_timeout
-        self.full_log = ""
-
+        self.current_buffer = ''
+        self.transcript = Transcript(transcript_size or shell.default_transcript_size, transcript_file)
+        self.metrics = CommandMetrics(metrics_sink or shell.default_metrics_sink,
+                                      dict(metrics_tags or {}, protocol="telnet"))
+        self._timing = None
+        self.recorder = None
+
+        started_at = time.time()
         self.telnet = _connect(host, port, connect_timeout)
         self._login(username, password)
+        self.metrics.connected(started_at)
+
+        if recorder is not None:
+            self.recorder = recorder
+            recorder.hide(password)
+            recorder.received(self.current_buffer)
 
     def do(self, command, wait_for=None, include_last_line=False):
-        self.telnet.write(str(command) + "\r\n")
+        self._timing = self.metrics.command(command, wait_for, self.prompt)
+        self._send(str(command) + "\r\n")
         result = self._read_until(wait_for)
 
         return _filter_input_and_empty_lines(command, include_last_line, result)
 
+    def do_batch(self, commands):
+        batch = BatchOutput(commands, self.prompt_matcher)
+        self._timing = self.metrics.batch()
+        self._send("".join(str(command) + "\r\n" for command in commands))
+        self.current_buffer = self._read(batch, self.prompt)
+        self.transcript.append(self.current_buffer)
+
+        return batch.split(self.current_buffer)
+
+    def do_iter(self, command):
+        self._timing = self.metrics.command(command)
+        self._send(str(command) + "\r\n")
+        return self._iter_lines(OutputLines(self.prompt_matcher))
+
     def send_key(self, key, wait_for=None, include_last_line=False):
-        self.telnet.write(key)
+        self._timing = self.metrics.key(wait_for, self.prompt)
+        self._send(key)
         result = self._read_until(wait_for)
 
         return _filter_input_and_empty_lines(key, include_last_line, result)
 
     def quit(self, command):
-        self.telnet.write(command + "\r\n")
+        self._send(command + "\r\n")
+        self.transcript.close()
+
+    @property
+    def full_log(self):
+        return str(self.transcript)
 
     def get_current_prompt(self):
-        return self.full_log.splitlines()[-1]
+        return self.current_buffer.splitlines()[-1]
+
+    def _send(self, data):
+        if self.recorder is not None:
+            self.recorder.sent(data)
+        self.telnet.write(data)
 
     def _login(self, username, password):
         self.telnet.read_until(":", self.command_timeout)
@@ -57,25 +99,60 @@ class TelnetClient(TerminalClient):
         self.telnet.read_until(":", self.command_timeout)
         self.telnet.write(str(password) + "\r\n")
 
-        result = self._wait_for(list(self.prompt))
-        self.full_log += result[len(password):].lstrip()
+        result = self._wait_for(self.prompt)
+        self.prompt_matcher.learn(result.splitlines()[-1])
+        self.current_buffer = result[len(password):].lstrip()
+        self.transcript.append(self.current_buffer)
 
     def _read_until(self, wait_for):
-        expect = wait_for or self.prompt
-        if isinstance(expect, basestring):
-            expect = [expect]
-        expect = ["{}$".format(re.escape(s)) for s in list(expect)]
-
-        result = self._wait_for(expect)
-        self.full_log += result
+        result = self._wait_for(wait_for or self.prompt)
+        self.current_buffer = result
+        self.transcript.append(result)
 
         return result
 
     def _wait_for(self, expect):
-        result = self.telnet.expect(expect, timeout=self.command_timeout)
-        if result[0] == -1:
-            raise CommandTimeout(expect)
-        return result[2]
+        return self._read(PromptTail(self.prompt_matcher if expect is self.prompt else EndsWith(expect)), expect)
+
+    def _read(self, output, expecting):
+        return "".join(self._receive(output, expecting))
+
+    def _iter_lines(self, output):
+        self.current_buffer = ''
+        reading = self._receive(output, self.prompt)
+        try:
+            for read in reading:
+                self.transcript.append(read)
+                while output.lines:
+                    yield output.lines.popleft()
+        finally:
+            for read in reading:
+                self.transcript.append(read)
+            self.current_buffer = output.partial
+
+    def _receive(self, output, expecting):
+        deadline = time.time() + self.command_timeout
+        read = self.telnet.read_very_eager()
+        while True:
+            if read:
+                if self.recorder is not None:
+                    self.recorder.received(read)
+                if self._timing is not None:
+                    self._timing.received(read)
+
+            done = output.feed(read)
+            if done and self._timing is not None:
+                self._timing.done()
+                self._timing = None
+            yield read
+            if done:
+                return
+
+            remaining = deadline - time.time()
+            if remaining <= 0 or not select.select([self.telnet], [], [], remaining)[0]:
+                self.failed = True
+                raise CommandTimeout(expecting)
+            read = self.telnet.read_very_eager()
 
 
 def _connect(host, port, connect_timeout):
@@ -22,7 +22,7 @@ from netman import regex
 from netman.adapters.shell.ssh import SshClient
 from netman.adapters.shell.telnet import TelnetClient
 from netman.adapters.switches.util import SubShell, split_on_bang, split_on_dedent, no_output, \
-    ResultChecker
+    ResultChecker, result_pattern
 from netman.core.objects.access_groups import IN, OUT
 from netman.core.objects.exceptions import IPNotAvailable, UnknownIP, UnknownVlan, UnknownAccessGroup, BadVlanNumber, \
     BadVlanName, UnknownInterface, TrunkVlanNotSet, VlanVrfNotSet, UnknownVrf, BadVrrpTimers, BadVrrpPriorityNumber, \
@@ -34,9 +34,48 @@ from netman.core.objects.interface_states import OFF, ON
 from netman.core.objects.port_modes import ACCESS, TRUNK
 from netman.core.objects.switch_base import SwitchBase
 from netman.core.objects.vlan import Vlan
+from netman.core.objects.vlan_set import VlanSet
 from netman.core.objects.vrrp_group import VrrpGroup
 
 
+_vlan_brief_row = regex.compile("^(\d+).*")
+_error = regex.compile("^Error.*")
+_vlan_ports = regex.compile("(Untagged|Statically tagged) Ports\s+: (.*)$")
+_vlan_interface_section = regex.compile("^interface ve (\d+)")
+_vlan_name = regex.compile(".*PORT-VLAN \d*, Name ([^,]+),.*")
+_vlan_interface_id = regex.compile(".*Associated Virtual Interface Id: (\d+).*")
+_interface_vlan_membership = regex.compile("VLAN: (\d*)  ([^\s]*)")
+_vlan_section = regex.compile("^vlan (\d+).*")
+_named_vlan_section = regex.compile("^vlan \d+ name ([^\s]*)")
+_router_interface = regex.compile("^\srouter-interface ve (\d+)")
+_ip_address = regex.compile("^ ip address ([^\s]*)")
+_access_group = regex.compile("^ ip access-group ([^\s]*) ([^\s]*)")
+_vrf_forwarding = regex.compile("^ vrf forwarding ([^\s]*)")
+_vrrp_group = regex.compile("^ ip vrrp-extended vrid ([^\s]*)")
+_vrrp_ip_address = regex.compile("^  ip-address ([^\s]*)")
+_vrrp_priority = regex.compile("^  backup priority ([^\s]*) track-priority ([^\s]*)")
+_vrrp_hello_interval = regex.compile("^  hello-interval ([^\s]*)")
+_vrrp_dead_interval = regex.compile("^  dead-interval ([^\s]*)")
+_vrrp_track_port = regex.compile("^  track-port (.*)")
+_vrrp_activate = regex.compile("^  activate")
+_dhcp_relay_server = regex.compile("^ ip helper-address ([^\s]*)")
+_no_icmp_redirects = regex.compile("^ no ip redirect")
+_interface_range = regex.compile("^(([^\s]*) ([^\s]*) to ([^\s]*)).*")
+_single_interface = regex.compile("^([^\s]* [^\s]*).*")
+_interface_vlan_state = regex.compile("VLAN: (\d+)  (Untagged|Tagged)")
+_vlan_config_section = regex.compile("^vlan (\d*)")
+_untagged_interfaces = regex.compile(" untagged (.*)")
+_tagged_interfaces = regex.compile(" tagged (.*)")
+_interface_status = regex.compile("^\w*Ethernet([^\s]*) is (\w*).*")
+_port_name = regex.compile("Port name is (.*)")
+_unprefixed_interface = regex.compile("^\d.*")
+
+_error_result = result_pattern("^Error.*")
+_invalid_input = result_pattern("^Invalid input.*")
+_tracking_out_of_range = result_pattern(".*not between 1 and 254$")
+_vrrp_without_ip = result_pattern("^error - please configure ip address before configuring vrrp-extended.*")
+
+
 def ssh(switch_descriptor):
     return BackwardCompatibleBrocade(switch_descriptor=switch_descriptor, shell_factory=SshClient)
 
@@ -46,31 +85,52 @@ def telnet(switch_descriptor):
 
 
 class Brocade(SwitchBase):
-    def __init__(self, switch_descriptor, shell_factory):
+    def __init__(self, switch_descriptor, shell_factory, recorder=None):
         super(Brocade, self).__init__(switch_descriptor)
         self.shell_factory = shell_factory
+        self.recorder = recorder
         self.shell = None
 
     def _connect(self):
+        self.shell = self._borrow_connection(self._open_shell, close=self._close_shell,
+                                             probe=lambda shell: shell.is_alive())
+
+    def _disconnect(self):
+        if self.shell.failed:
+            self._discard_connection(self.shell, close=self._close_shell)
+        else:
+            self._release_connection(self.shell, close=self._close_shell, reset=self._reset_shell)
+
+    def _open_shell(self):
         shell_params = dict(
             host=self.switch_descriptor.hostname,
             username=self.switch_descriptor.username,
             password=self.switch_descriptor.password,
+            metrics_tags=dict(model=self.switch_descriptor.model),
         )
         if self.switch_descriptor.port:
             shell_params["port"] = self.switch_descriptor.port
+        if self.recorder is not None:
+            shell_params["recorder"] = self.recorder
 
-        self.shell = self.shell_factory(**shell_params)
+        shell = self.shell_factory(**shell_params)
 
-        if self.shell.get_current_prompt().endswith(">"):
-            self.shell.do("enable", wait_for=":")
-            self.shell.do(self.switch_descriptor.password)
+        if shell.get_current_prompt().endswith(">"):
+            shell.do("enable", wait_for=":")
+            shell.do(self.switch_descriptor.password)
 
-        self.shell.do("skip-page-display")
+        shell.do("skip-page-display")
+        shell.exec_prompt = shell.get_current_prompt()
 
-    def _disconnect(self):
-        self.shell.quit("exit")
-        self.logger.info(self.shell.full_log)
+        return shell
+
+    def _close_shell(self, shell):
+        shell.quit("exit")
+        self.logger.debug(shell.full_log)
+
+    def _reset_shell(self, shell):
+        self.logger.debug(shell.full_log)
+        shell.reset_transcript()
 
     def _end_transaction(self):
         pass
@@ -109,38 +169,27 @@ class Brocade(SwitchBase):
 
     def get_interfaces(self):
         interfaces = []
-        vlans = []
-        interfaces_vlans = []
-
-        for if_data in split_on_dedent(self.shell.do("show interfaces")):
+        for if_data in split_on_dedent(self.shell.do_iter("show interfaces")):
             i = parse_interface(if_data)
             if i:
                 interfaces.append(i)
 
-        for vlan_data in split_on_bang(self.shell.do("show running-config vlan")):
-            vlans.append(parse_vlan_runningconfig(vlan_data))
+        vlans_by_interface = index_interface_vlans(
+            parse_vlan_runningconfig(vlan_data)
+            for vlan_data in split_on_bang(self.shell.do_iter("show running-config vlan")))
 
         for interface in interfaces:
-            interfaces_vlans.append(get_interface_vlans_association(interface, vlans))
-
-        for interface_vlans in interfaces_vlans:
-            set_vlans_properties(interface_vlans)
+            set_vlans_properties(interface, vlans_by_interface.get(interface.name, InterfaceVlans()))
         return interfaces
 
     def get_interface(self, interface_id):
-        vlans = []
-
         if_data = self.shell.do("show interfaces {}".format(interface_id))
         interface = parse_interface(if_data)
 
         if not interface:
             raise UnknownInterface(interface=interface_id)
 
-        for vlan_data in split_on_bang(self.shell.do("show running-config vlan")):
-            vlans.append(parse_vlan_runningconfig(vlan_data))
-
-        interface_vlans = get_interface_vlans_association(interface, vlans)
-        set_vlans_properties(interface_vlans)
+        set_vlans_properties(interface, parse_interface_vlans(self.shell.do("show vlan {}".format(interface_id))))
 
         return interface
 
@@ -171,11 +220,7 @@ class Brocade(SwitchBase):
         operations = self._get_vlan_association_removal_operations(result)
 
         with self.config():
-            if len(operations) > 0:
-                for operation in operations:
-                    self.shell.do("vlan {}".format(operation[0]))
-                    self.shell.do("no {} {}".format(operation[1], interface_id))
-                self.shell.do("exit")
+            self._remove_vlan_associations(operations, interface_id)
             result = self.shell.do("no interface {}".format(interface_id))
             if result:
                 raise UnknownInterface(interface_id)
@@ -191,7 +236,7 @@ class Brocade(SwitchBase):
             raise UnknownInterface(interface_id)
 
         self.logger.debug("show vlan result : \n" + "\n".join(content))
-        matches = re.compile("^(\d+).*").match(content[0])
+        matches = _vlan_brief_row.match(content[0])
 
         with self.config(), self.vlan(int(matches.groups()[0])):
             self.shell.do("no untagged {}".format(interface_id))
@@ -204,8 +249,8 @@ class Brocade(SwitchBase):
 
         with self.config(), self.vlan(vlan):
             self.set("no tagged {}".format(interface_id))\
-                .on_result_matching("^Error.*", TrunkVlanNotSet, interface_id)\
-                .on_result_matching("^Invalid input.*", UnknownInterface, interface_id)
+                .on_result_matching(_error_result, TrunkVlanNotSet, interface_id)\
+                .on_result_matching(_invalid_input, UnknownInterface, interface_id)
 
     def remove_vlan(self, number):
         self._get_vlan(number)
@@ -222,10 +267,7 @@ class Brocade(SwitchBase):
 
         if len(operations) > 0 and not (len(operations) == 1 and operations[0][1] == "untagged"):
             with self.config():
-                for operation in operations:
-                    self.shell.do("vlan {}".format(operation[0]))
-                    self.shell.do("no {} {}".format(operation[1], interface_id))
-                self.shell.do("exit")
+                self._remove_vlan_associations(operations, interface_id)
 
     def set_trunk_mode(self, interface_id):
         result = self.shell.do("show vlan {}".format(interface_id))
@@ -300,7 +342,7 @@ class Brocade(SwitchBase):
         vlan = self._get_vlan(vlan_number)
         with self.config(), self.interface_vlan(vlan):
             result = self.shell.do("vrf forwarding {}".format(vrf_name))
-            if regex.match("^Error.*", result[0]):
+            if regex.match(_error, result[0]):
                 raise UnknownVrf(vrf_name)
 
     def unset_vlan_vrf(self, vlan_number):
@@ -317,7 +359,7 @@ class Brocade(SwitchBase):
         if result[0].startswith("Error"):
             raise UnknownVlan(vlan_number)
         for line in result:
-            if regex.match("(Untagged|Statically tagged) Ports\s+: (.*)$", line):
+            if regex.match(_vlan_ports, line):
                 for real_name in _to_real_names(parse_if_ranges(regex[1])):
                     interfaces.append(real_name)
         return interfaces
@@ -350,7 +392,7 @@ class Brocade(SwitchBase):
         with self.config(), self.interface_vlan(vlan):
             if len(vlan.vrrp_groups) == 0:
                 self.set('ip vrrp-extended auth-type simple-text-auth VLAN{}', vlan_number)\
-                    .on_result_matching("^error - please configure ip address before configuring vrrp-extended.*", NoIpOnVlanForVrrp, vlan_number)\
+                    .on_result_matching(_vrrp_without_ip, NoIpOnVlanForVrrp, vlan_number)\
                     .on_any_result(BadVrrpAuthentication)
 
             self.set("ip vrrp-extended vrid {}".format(group_id)).on_any_result(BadVrrpGroupNumber, 1, 255)
@@ -363,8 +405,8 @@ class Brocade(SwitchBase):
 
     def set_vrrp_properties(self, ips, priority, track_decrement, track_id, dead_interval, hello_interval):
         self.set('backup priority {} track-priority {}', priority, track_decrement) \
-            .on_result_matching("^Invalid input -> {}.*".format(track_decrement), BadVrrpTracking) \
-            .on_result_matching(".*not between 1 and 254$".format(track_decrement), BadVrrpTracking) \
+            .on_result_matching("^Invalid input -> {}.*".format(re.escape(str(track_decrement))), BadVrrpTracking) \
+            .on_result_matching(_tracking_out_of_range, BadVrrpTracking) \
             .on_any_result(BadVrrpPriorityNumber, 1, 255)
 
         for i, ip in enumerate(ips):
@@ -391,8 +433,8 @@ class Brocade(SwitchBase):
     def add_vif_data_to_vlans(self, vlans):
         vlans_interface_name_dict = {vlan.vlan_interface_name: vlan for vlan in vlans if vlan.vlan_interface_name}
 
-        for int_vlan_data in split_on_bang(self.shell.do("show running-config interface")):
-            if regex.match("^interface ve (\d+)", int_vlan_data[0]):
+        for int_vlan_data in split_on_bang(self.shell.do_iter("show running-config interface")):
+            if regex.match(_vlan_interface_section, int_vlan_data[0]):
                 current_vlan = vlans_interface_name_dict.get(regex[0])
                 if current_vlan:
                     add_interface_vlan_data(current_vlan, int_vlan_data)
@@ -425,7 +467,7 @@ class Brocade(SwitchBase):
 
     def _list_vlans(self):
         vlans = []
-        for vlan_data in split_on_bang(self.shell.do("show running-config vlan | begin vlan")):
+        for vlan_data in split_on_bang(self.shell.do_iter("show running-config vlan | begin vlan")):
             vlans.append(parse_vlan(vlan_data))
         return vlans
 
@@ -436,10 +478,10 @@ class Brocade(SwitchBase):
 
         vlan = VlanBrocade(vlan_number)
         for line in result:
-            if regex.match(".*PORT-VLAN \d*, Name ([^,]+),.*", line):
+            if regex.match(_vlan_name, line):
                 vlan.name = regex[0] if regex[0] != "[None]" else None
                 vlan.name = vlan.name if vlan.name != "DEFAULT-VLAN" else "default"
-            elif regex.match(".*Associated Virtual Interface Id: (\d+).*", line):
+            elif regex.match(_vlan_interface_id, line):
                 vlan.vlan_interface_name = regex[0]
                 if include_vif_data:
                     add_interface_vlan_data(vlan, self.shell.do("show running-config interface ve {}".format(regex[0])))
@@ -451,23 +493,31 @@ class Brocade(SwitchBase):
     def _get_vlan_association_removal_operations(self, result):
         operations = []
         for line in result:
-            if regex.match("VLAN: (\d*)  ([^\s]*)", line):
+            if regex.match(_interface_vlan_membership, line):
                 vlan, state = regex
                 if int(vlan) > 1:
                     operations.append((vlan, state.lower()))
         return operations
 
+    def _remove_vlan_associations(self, operations, interface_id):
+        if len(operations) > 0:
+            for vlan, state in operations:
+                self.shell.do("vlan {}".format(vlan))
+                self.shell.do("no {} {}".format(state, interface_id))
+            self.shell.do("exit")
+
+
 def parse_vlan(vlan_data):
-    regex.match("^vlan (\d+).*", vlan_data[0])
+    regex.match(_vlan_section, vlan_data[0])
     current_vlan = VlanBrocade(int(regex[0]))
 
-    if regex.match("^vlan \d+ name ([^\s]*)", vlan_data[0]):
+    if regex.match(_named_vlan_section, vlan_data[0]):
         current_vlan.name = regex[0] if regex[0] != "DEFAULT-VLAN" else "default"
     else:
         current_vlan.name = None
 
     for line in vlan_data[1:]:
-        if regex.match("^\srouter-interface ve (\d+)", line):
+        if regex.match(_router_interface, line):
             current_vlan.vlan_interface_name = regex[0]
 
     return current_vlan
@@ -479,35 +529,35 @@ def add_interface_vlan_data(target_vlan, int_vlan_data):
         if vrrp_group is not None and not line.startswith("  "):
             vrrp_group = False
 
-        if regex.match("^ ip address ([^\s]*)", line):
+        if regex.match(_ip_address, line):
             target_vlan.ips.append(BrocadeIPNetwork(regex[0], is_secondary=line.endswith("secondary")))
-        elif regex.match("^ ip access-group ([^\s]*) ([^\s]*)", line):
+        elif regex.match(_access_group, line):
             direction = {'in': IN, 'out': OUT}[regex[1]]
             target_vlan.access_groups[direction] = regex[0]
-        elif regex.match("^ vrf forwarding ([^\s]*)", line):
+        elif regex.match(_vrf_forwarding, line):
             target_vlan.vrf_forwarding = regex[0]
-        elif regex.match("^ ip vrrp-extended vrid ([^\s]*)", line):
+        elif regex.match(_vrrp_group, line):
             vrrp_group = next((group for group in target_vlan.vrrp_groups if str(group.id) == regex[0]), None)
             if vrrp_group is None:
                 vrrp_group = VrrpGroup(id=int(regex[0]))
                 target_vlan.vrrp_groups.append(vrrp_group)
-        elif regex.match("^  ip-address ([^\s]*)", line):
+        elif regex.match(_vrrp_ip_address, line):
             vrrp_group.ips.append(IPAddress(regex[0]))
         if vrrp_group:
-            if regex.match("^  backup priority ([^\s]*) track-priority ([^\s]*)", line):
+            if regex.match(_vrrp_priority, line):
                 vrrp_group.priority = int(regex[0])
                 vrrp_group.track_decrement = int(regex[1])
-            elif regex.match("^  hello-interval ([^\s]*)", line):
+            elif regex.match(_vrrp_hello_interval, line):
                 vrrp_group.hello_interval = int(regex[0])
-            elif regex.match("^  dead-interval ([^\s]*)", line):
+            elif regex.match(_vrrp_dead_interval, line):
                 vrrp_group.dead_interval = int(regex[0])
-            elif regex.match("^  track-port (.*)", line):
+            elif regex.match(_vrrp_track_port, line):
                 vrrp_group.track_id = regex[0]
-            elif regex.match("^  activate", line):
+            elif regex.match(_vrrp_activate, line):
                 vrrp_group = None
-        elif regex.match("^ ip helper-address ([^\s]*)", line):
+        elif regex.match(_dhcp_relay_server, line):
             target_vlan.dhcp_relay_servers.append(IPAddress(regex[0]))
-        elif regex.match("^ no ip redirect", line):
+        elif regex.match(_no_icmp_redirects, line):
             target_vlan.icmp_redirects = False
 
 
@@ -515,14 +565,14 @@ def parse_if_ranges(string):
     consumed_string = string.strip()
     while len(consumed_string) > 0:
 
-        if regex.match("^(([^\s]*) ([^\s]*) to ([^\s]*)).*", consumed_string):
+        if regex.match(_interface_range, consumed_string):
             parsed_part, port_type, lower_bound, higher_bound = regex
             lower_values = lower_bound.split("/")
             higher_values = higher_bound.split("/")
             for port_id in range(int(lower_values[-1]), int(higher_values[-1]) + 1):
                 yield "{} {}/{}".format(port_type, "/".join(lower_values[:-1]), port_id)
         else:
-            regex.match("^([^\s]* [^\s]*).*", consumed_string)
+            regex.match(_single_interface, consumed_string)
             parsed_part = regex[0]
             yield regex[0]
 
@@ -537,45 +587,68 @@ def _to_short_name(interface_id):
     return interface_id.replace("ethernet", "ethe")
 
 
-def set_vlans_properties(interface_vlans):
-    if interface_vlans["untagged"] is not None and len(interface_vlans["tagged"]) == 0:
-        interface_vlans["object"].access_vlan = interface_vlans["untagged"]
-    elif interface_vlans["untagged"] is not None and len(interface_vlans["tagged"]) > 0:
-        interface_vlans["object"].trunk_native_vlan = interface_vlans["untagged"]
-    if len(interface_vlans["tagged"]) > 0:
-        interface_vlans["object"].port_mode = TRUNK
-        interface_vlans["object"].trunk_vlans = interface_vlans["tagged"]
+class InterfaceVlans(object):
+    """
+    The vlans of an interface, an untagged membership to the default vlan 1 is not an access vlan
+    """
+    def __init__(self):
+        self.untagged = None
+        self.tagged = VlanSet()
 
+    def add(self, vlan, tagged):
+        if tagged:
+            self.tagged.add(vlan)
+        elif vlan > 1:
+            self.untagged = vlan
 
-def get_interface_vlans_association(interface, vlans):
-    interface_dic = {"tagged": [], "untagged": None, "object": interface}
+
+def set_vlans_properties(interface, interface_vlans):
+    if interface_vlans.untagged is not None and len(interface_vlans.tagged) == 0:
+        interface.access_vlan = interface_vlans.untagged
+    elif interface_vlans.untagged is not None and len(interface_vlans.tagged) > 0:
+        interface.trunk_native_vlan = interface_vlans.untagged
+    if len(interface_vlans.tagged) > 0:
+        interface.port_mode = TRUNK
+        interface.trunk_vlans = interface_vlans.tagged
+
+
+def index_interface_vlans(vlans):
+    index = {}
     for vlan in vlans:
-        if interface.name in vlan["tagged_interface"]:
-            interface_dic["tagged"].append(vlan['id'])
-        if interface.name in vlan["untagged_interface"]:
-            interface_dic["untagged"] = vlan['id']
-    return interface_dic
+        for name in vlan["tagged_interface"]:
+            index.setdefault(name, InterfaceVlans()).add(vlan['id'], tagged=True)
+        for name in vlan["untagged_interface"]:
+            index.setdefault(name, InterfaceVlans()).add(vlan['id'], tagged=False)
+    return index
+
+
+def parse_interface_vlans(show_vlan_result):
+    interface_vlans = InterfaceVlans()
+    for line in show_vlan_result:
+        if regex.match(_interface_vlan_state, line):
+            interface_vlans.add(int(regex[0]), tagged=regex[1] == "Tagged")
+    return interface_vlans
 
 
 def parse_vlan_runningconfig(data):
     vlan = {"tagged_interface": [], "untagged_interface": []}
-    if regex.match("^vlan (\d*)", data[0]):
+    if regex.match(_vlan_config_section, data[0]):
         vlan['id'] = int(regex[0])
         for line in data:
-            if regex.match(" untagged (.*)", line):
+            if regex.match(_untagged_interfaces, line):
                 for name in _to_real_names(parse_if_ranges(regex[0])):
                     vlan["untagged_interface"].append(name)
-            if regex.match(" tagged (.*)", line):
+            if regex.match(_tagged_interfaces, line):
                 for name in _to_real_names(parse_if_ranges(regex[0])):
                     vlan["tagged_interface"].append(name)
     return vlan
 
 
 def parse_interface(if_data):
-    if regex.match("^\w*Ethernet([^\s]*) is (\w*).*", if_data[0]):
+    if regex.match(_interface_status, if_data[0]):
         i = Interface(name="ethernet {}".format(regex[0]), port_mode=ACCESS, shutdown=regex[1] == "disabled")
         for line in if_data:
-            if regex.match("Port name is (.*)", line): i.description = regex[0]
+            if regex.match(_port_name, line): i.description = regex[0]
         return i
 
 
@@ -597,8 +670,8 @@ class BrocadeIPNetwork(IPNetwork):
 
 
 class BackwardCompatibleBrocade(Brocade):
-    def __init__(self, switch_descriptor, shell_factory):
-        super(BackwardCompatibleBrocade, self).__init__(switch_descriptor, shell_factory)
+    def __init__(self, switch_descriptor, shell_factory, recorder=None):
+        super(BackwardCompatibleBrocade, self).__init__(switch_descriptor, shell_factory, recorder)
 
         self.logger = logging.getLogger(
                 "{module}.{hostname}".format(module=Brocade.__module__,
@@ -645,7 +718,7 @@ class BackwardCompatibleBrocade(Brocade):
 
 
 def _add_ethernet(interface_id):
-    if interface_id is not None and re.match("^\d.*", interface_id):
+    if interface_id is not None and _unprefixed_interface.match(interface_id):
         warnings.warn("The brocade interface naming without the \"ethernet\" prefix has been deprecated", DeprecationWarning)
         return "ethernet {}".format(interface_id)
     return interface_id
@@ -252,25 +252,19 @@ class CachedSwitch(SwitchBase):
 
     def add_trunk_vlan(self, interface_id, vlan):
         self.real_switch.add_trunk_vlan(interface_id, vlan)
-        self.interfaces_cache[interface_id].trunk_vlans.append(vlan)
+        self.interfaces_cache[interface_id].trunk_vlans.add(vlan)
 
     def remove_trunk_vlan(self, interface_id, vlan):
         self.real_switch.remove_trunk_vlan(interface_id, vlan)
-        try:
-            self.interfaces_cache[interface_id].trunk_vlans.remove(vlan)
-        except ValueError:
-            pass
+        self.interfaces_cache[interface_id].trunk_vlans.discard(vlan)
 
     def add_bond_trunk_vlan(self, bond_number, vlan):
         self.real_switch.add_bond_trunk_vlan(bond_number, vlan)
-        self.bonds_cache[bond_number].trunk_vlans.append(vlan)
+        self.bonds_cache[bond_number].trunk_vlans.add(vlan)
 
     def remove_bond_trunk_vlan(self, bond_number, vlan):
         self.real_switch.remove_bond_trunk_vlan(bond_number, vlan)
-        try:
-            self.bonds_cache[bond_number].trunk_vlans.remove(vlan)
-        except ValueError:
-            pass
+        self.bonds_cache[bond_number].trunk_vlans.discard(vlan)
 
     def set_interface_description(self, interface_id, description):
         # No cache to update
@@ -11,14 +11,13 @@
 # WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 # See the License for the specific language governing permissions and
 # limitations under the License.
-import re
 import warnings
 
 from netaddr.ip import IPNetwork, IPAddress
 
 from netman import regex
 from netman.adapters.shell.ssh import SshClient
-from netman.adapters.switches.util import SubShell, split_on_dedent, split_on_bang, no_output
+from netman.adapters.switches.util import SubShell, no_output, LineClassifier, parse_vlan_ranges
 from netman.core.objects.access_groups import IN, OUT
 from netman.core.objects.exceptions import IPNotAvailable, UnknownVlan, UnknownIP, UnknownAccessGroup, BadVlanNumber, \
     BadVlanName, UnknownInterface, UnknownVrf, VlanVrfNotSet, IPAlreadySet, VrrpAlreadyExistsForVlan, BadVrrpGroupNumber, \
@@ -30,9 +29,15 @@ from netman.core.objects.port_modes import DYNAMIC, ACCESS, TRUNK
 from netman.core.objects.switch_base import SwitchBase
 from netman.core.objects.switch_transactional import FlowControlSwitch
 from netman.core.objects.vlan import Vlan
+from netman.core.objects.vlan_set import VlanSet
 from netman.core.objects.vrrp_group import VrrpGroup
 
 
+_version_property = regex.compile("^(.*)\s:\s(.*)$")
+_version_unit = regex.compile("^.*(\d+)\s+(\d+)\s+([^\s]+)\s+([^\s]+)\s+([^\s]+)\s*$")
+_vlan_brief_row = regex.compile("^(\d+)\s+(\S+).*")
+
+
 def ssh(switch_descriptor):
     return Cisco(switch_descriptor=switch_descriptor)
 
@@ -45,31 +50,51 @@ def factory(switch_descriptor, lock):
 
 class Cisco(SwitchBase):
 
-    def __init__(self, switch_descriptor):
+    def __init__(self, switch_descriptor, shell_factory=None, recorder=None):
         super(Cisco, self).__init__(switch_descriptor)
+        self.shell_factory = shell_factory or SshClient
+        self.recorder = recorder
         self.ssh = None
 
     def _connect(self):
+        self.ssh = self._borrow_connection(self._open_ssh, close=self._close_ssh, probe=lambda ssh: ssh.is_alive())
+
+    def _disconnect(self):
+        if self.ssh.failed:
+            self._discard_connection(self.ssh, close=self._close_ssh)
+        else:
+            self._release_connection(self.ssh, close=self._close_ssh, reset=self._reset_ssh)
+
+    def _open_ssh(self):
         params = dict(
             host=self.switch_descriptor.hostname,
             username=self.switch_descriptor.username,
             password=self.switch_descriptor.password,
+            metrics_tags=dict(model=self.switch_descriptor.model),
         )
         if self.switch_descriptor.port:
             params["port"] = self.switch_descriptor.port
+        if self.recorder is not None:
+            params["recorder"] = self.recorder
 
-        self.ssh = SshClient(**params)
+        ssh = self.shell_factory(**params)
 
-        if self.ssh.get_current_prompt().endswith(">"):
-            self.ssh.do("enable", wait_for=": ")
-            self.ssh.do(self.switch_descriptor.password)
+        if ssh.get_current_prompt().endswith(">"):
+            ssh.do("enable", wait_for=": ")
+            ssh.do(self.switch_descriptor.password)
 
-        self.ssh.do("terminal length 0")
-        self.ssh.do("terminal width 0")
+        ssh.do_batch(["terminal length 0", "terminal width 0"])
+        ssh.exec_prompt = ssh.get_current_prompt()
 
-    def _disconnect(self):
-        self.ssh.quit("exit")
-        self.logger.info(self.ssh.full_log)
+        return ssh
+
+    def _close_ssh(self, ssh):
+        ssh.quit("exit")
+        self.logger.debug(ssh.full_log)
+
+    def _reset_ssh(self, ssh):
+        self.logger.debug(ssh.full_log)
+        ssh.reset_transcript()
 
     def _end_transaction(self):
         pass
@@ -93,27 +118,16 @@ class Cisco(SwitchBase):
         return vlan
 
     def get_vlans(self):
-        vlan_list = self.ssh.do("show vlan brief")
-
-        vlans = {}
-        for line in vlan_list:
-            if regex.match('^(\d+)\s+(\S+).*', line):
-                number, name = regex
+        config = parse_running_config(self.ssh.do_iter("show running-config"))
 
-                if name == ("VLAN{}".format(number)):
-                    name = None
+        vlans = []
+        for number, name in self._show_vlan_brief():
+            vlan = config.vlan_data(number)
+            if vlan.name is None and name != "VLAN{}".format(number):
+                vlan.name = name
 
-                vlans[number] = Vlan(int(number), name, icmp_redirects=True)
-
-        for ip_interface_data in split_on_dedent(self.ssh.do("show ip interface")):
-            if regex.match("^Vlan(\d+)\s.*", ip_interface_data[0]):
-                current_vlan = vlans.get(regex[0])
-                if current_vlan:
-                    apply_interface_running_config_data(
-                        current_vlan,
-                        self.ssh.do("show running-config interface vlan {}".format(current_vlan.number))
-                    )
-        return vlans.values()
+            vlans.append(vlan)
+        return vlans
 
     def add_vlan(self, number, name=None):
         if self._show_run_vlan(number):
@@ -136,16 +150,10 @@ class Cisco(SwitchBase):
         self._get_vlan_run_conf(number)
 
         with self.config():
-            self.ssh.do('no interface vlan {}'.format(number))
-            self.ssh.do('no vlan {}'.format(number))
+            self.ssh.do_batch(['no interface vlan {}'.format(number), 'no vlan {}'.format(number)])
 
     def get_interfaces(self):
-        interfaces = []
-        for data in split_on_bang(self.ssh.do("show running-config | begin interface")):
-            interface = parse_interface(data)
-            if interface:
-                interfaces.append(interface)
-        return interfaces
+        return parse_running_config(self.ssh.do_iter("show running-config | begin interface")).interfaces
 
     def set_access_vlan(self, interface_id, vlan):
         self._get_vlan_run_conf(vlan)
@@ -293,9 +301,11 @@ class Cisco(SwitchBase):
             self.ssh.do("no ip helper-address {}".format(ip_address))
 
     def get_vlan_interfaces(self, vlan_number):
-        vlan_interfaces = get_vlan_interfaces_from_data(vlan_number, self.get_interfaces())
-        if not vlan_interfaces:
-            self.get_vlan(vlan_number)
+        config = self._running_config()
+        vlan_interfaces = get_vlan_interfaces_from_data(vlan_number, config.interfaces)
+        if not vlan_interfaces and vlan_number not in config.vlans \
+                and vlan_number not in [number for number, _ in self._show_vlan_brief()]:
+            raise UnknownVlan(vlan_number)
         return vlan_interfaces
 
     def set_bond_trunk_mode(self, number):
@@ -332,12 +342,24 @@ class Cisco(SwitchBase):
     def interface_vlan(self, interface_id):
         return SubShell(self.ssh, enter=["interface vlan {}".format(interface_id), "no shutdown"], exit_cmd='exit')
 
+    def _running_config(self):
+        config = parse_running_config(self.ssh.do_iter("show running-config"))
+        config.vlan(1).name = "default"
+        return config
+
     def _get_vlan_run_conf(self, vlan_number):
         run_config = self._show_run_vlan(vlan_number)
         if not run_config:
             raise UnknownVlan(vlan_number)
         return run_config
 
+    def _show_vlan_brief(self):
+        rows = []
+        for line in self.ssh.do("show vlan brief"):
+            if regex.match(_vlan_brief_row, line):
+                rows.append((int(regex[0]), regex[1]))
+        return rows
+
     def _show_run_vlan(self, vlan_number):
         return self.ssh.do('show running-config vlan {} | begin vlan'.format(vlan_number))
 
@@ -426,12 +448,12 @@ class Cisco(SwitchBase):
 
         versions = {}
         for i, line in enumerate(result):
-            matches = re.match("^(.*)\s:\s(.*)$", line)
+            matches = _version_property.match(line)
             if matches:
                 values = matches.groups()
                 versions[values[0].strip()] = values[1]
 
-            matches = re.match("^.*(\d+)\s+(\d+)\s+([^\s]+)\s+([^\s]+)\s+([^\s]+)\s*$", line)
+            matches = _version_unit.match(line)
             if matches:
                 values = matches.groups()
                 if "units" not in versions:
@@ -447,95 +469,210 @@ class Cisco(SwitchBase):
         return versions
 
 
+class RunningConfig(object):
+    """
+    Interfaces and vlans found in a running config
+
+    Only the vlans defined by a "vlan" section are listed in vlans, the settings of an "interface Vlan"
+    section go to the same Vlan whether it comes before or after the definition.
+    """
+    def __init__(self):
+        self.interfaces = []
+        self.vlans = {}
+        self._vlan_data = {}
+
+    def vlan(self, number):
+        vlan = self.vlans[number] = self.vlan_data(number)
+        return vlan
+
+    def vlan_data(self, number):
+        vlan = self._vlan_data.get(number)
+        if vlan is None:
+            vlan = self._vlan_data[number] = Vlan(number, icmp_redirects=True)
+        return vlan
+
+
+def parse_running_config(lines):
+    """
+    Builds the interfaces and vlans of a running config in a single pass
+
+    Each top level line is classified once to open a section and each indented line is classified once
+    by the table of that section.
+    """
+    config = RunningConfig()
+    interfaces = []
+    lines_table = section = None
+    for line in lines:
+        if line.startswith(" "):
+            if lines_table is not None:
+                lines_table.dispatch(line, section)
+        else:
+            lines_table, section = _sections.dispatch(line, config) or (None, None)
+            if isinstance(section, _InterfaceConfig):
+                interfaces.append(section)
+
+    config.interfaces = [interface.build() for interface in interfaces]
+    return config
+
+
 def parse_interface(data):
-    if data and (regex.match("interface (\w*Ethernet[^\s]*)", data[0])
-                 or regex.match("interface (Port-channel[^\s]*)", data[0])):
-        i = Interface(name=regex[0], shutdown=False)
-        port_mode = access_vlan = native_vlan = trunk_vlans = None
-        for line in data:
-            if regex.match(" switchport mode (.*)", line): port_mode = regex[0]
-            if regex.match(" switchport access vlan (\d*)", line): access_vlan = int(regex[0])
-            if regex.match(" switchport trunk native vlan (\d*)", line): native_vlan = int(regex[0])
-            if regex.match(" switchport trunk allowed vlan (.*)", line): trunk_vlans = regex[0]
-            if regex.match(" shutdown", line): i.shutdown = True
-
-        if not port_mode:
+    interfaces = parse_running_config(data[:1] + [line for line in data[1:] if line.startswith(" ")]).interfaces
+    return interfaces[0] if interfaces else None
+
+
+def apply_interface_running_config_data(vlan, data):
+    for line in data:
+        _vlan_interface_lines.dispatch(line, vlan)
+
+
+def apply_vlan_running_config_data(vlan, data):
+    for line in data:
+        _vlan_lines.dispatch(line, [vlan])
+
+
+class _InterfaceConfig(object):
+    def __init__(self, name):
+        self.interface = Interface(name=name, shutdown=False)
+        self.port_mode = self.access_vlan = self.native_vlan = self.trunk_vlans = None
+
+    def set_port_mode(self, port_mode):
+        self.port_mode = port_mode
+
+    def set_access_vlan(self, vlan):
+        self.access_vlan = int(vlan)
+
+    def set_native_vlan(self, vlan):
+        self.native_vlan = int(vlan)
+
+    def set_trunk_vlans(self, vlans):
+        self.trunk_vlans = vlans
+
+    def shut_down(self):
+        self.interface.shutdown = True
+
+    def build(self):
+        i = self.interface
+        if not self.port_mode:
             i.port_mode = DYNAMIC
-            i.access_vlan = access_vlan
-            i.trunk_native_vlan = native_vlan
-            i.trunk_vlans = parse_vlan_ranges(trunk_vlans) if trunk_vlans else []
-        elif port_mode == 'access':
+            i.access_vlan = self.access_vlan
+            i.trunk_native_vlan = self.native_vlan
+            i.trunk_vlans = parse_vlan_ranges(self.trunk_vlans) if self.trunk_vlans else VlanSet()
+        elif self.port_mode == 'access':
             i.port_mode = ACCESS
-            i.access_vlan = access_vlan
-        elif port_mode == 'trunk':
+            i.access_vlan = self.access_vlan
+        elif self.port_mode == 'trunk':
             i.port_mode = TRUNK
-            i.trunk_native_vlan = native_vlan
-            i.trunk_vlans = parse_vlan_ranges(trunk_vlans) if trunk_vlans else []
+            i.trunk_native_vlan = self.native_vlan
+            i.trunk_vlans = parse_vlan_ranges(self.trunk_vlans) if self.trunk_vlans else VlanSet()
 
         return i
-    return None
 
 
-def apply_interface_running_config_data(vlan, data):
-    for line in data:
-        if regex.match("^ ip address ([^\s]*) ([^\s]*)(.*)", line):
-            ip = IPNetwork("{}/{}".format(regex[0], regex[1]))
-            if "secondary" not in regex[2]:
-                vlan.ips.insert(0, ip)
-            else:
-                vlan.ips.append(ip)
-
-        elif regex.match("^ ip access-group ([^\s]*) ([^\s]*).*", line):
-            if regex[1] == "in":
-                vlan.access_groups[IN] = regex[0]
-            else:
-                vlan.access_groups[OUT] = regex[0]
+def _open_interface(config, name):
+    return _interface_lines, _InterfaceConfig(name)
 
-        elif regex.match("^ ip vrf forwarding ([^\s]*).*", line):
-            vlan.vrf_forwarding = regex[0]
 
-        elif regex.match("^ standby ([^\s]*)(.*)", line):
-            vrrp_group = next((group for group in vlan.vrrp_groups if str(group.id) == regex[0]), None)
-            if vrrp_group is None:
-                vrrp_group = VrrpGroup(id=int(regex[0]))
-                vlan.vrrp_groups.append(vrrp_group)
+def _open_vlan_interface(config, number):
+    return _vlan_interface_lines, config.vlan_data(int(number))
 
-            vrrp_info = regex[1].strip()
 
-            if regex.match("^ip ([^\s]*).*", vrrp_info):
-                vrrp_group.ips.append(IPAddress(regex[0]))
-            elif regex.match("^timers ([^\s]*) ([^\s]*)", vrrp_info):
-                vrrp_group.hello_interval = int(regex[0])
-                vrrp_group.dead_interval = int(regex[1])
-            elif regex.match("^priority ([^\s]*)", vrrp_info):
-                vrrp_group.priority = int(regex[0])
-            elif regex.match("^track ([^\s]*) decrement ([^\s]*)", vrrp_info):
-                vrrp_group.track_id = regex[0]
-                vrrp_group.track_decrement = int(regex[1])
+def _open_vlans(config, ranges):
+    return _vlan_lines, [config.vlan(number) for number in parse_vlan_ranges(ranges)]
 
-        elif regex.match("^ ip helper-address ([^\s]*)", line):
-            vlan.dhcp_relay_servers.append(IPAddress(regex[0]))
 
-        elif regex.match("^ no ip redirects", line):
-            vlan.icmp_redirects = False
+def _set_vlans_name(vlans, name):
+    for vlan in vlans:
+        vlan.name = name
 
 
-def apply_vlan_running_config_data(vlan, data):
-    for line in data:
-        if regex.match("^ name ([^\s]*)", line):
-            vlan.name = regex[0]
+def _add_ip(vlan, ip, netmask, options):
+    ip = IPNetwork("{}/{}".format(ip, netmask))
+    if "secondary" not in options:
+        vlan.ips.insert(0, ip)
+    else:
+        vlan.ips.append(ip)
 
 
-def parse_vlan_ranges(all_ranges):
-    if all_ranges is None:
-        return range(1, 4094)
-    elif all_ranges == "none":
-        return []
+def _set_access_group(vlan, name, direction):
+    if direction == "in":
+        vlan.access_groups[IN] = name
     else:
-        full_list = []
-        for vlan_list in [parse(r) for r in all_ranges.split(",")]:
-            full_list += vlan_list
-        return full_list
+        vlan.access_groups[OUT] = name
+
+
+def _set_vrf_forwarding(vlan, vrf_name):
+    vlan.vrf_forwarding = vrf_name
+
+
+def _apply_standby(vlan, group_id, vrrp_info):
+    vrrp_group = next((group for group in vlan.vrrp_groups if str(group.id) == group_id), None)
+    if vrrp_group is None:
+        vrrp_group = VrrpGroup(id=int(group_id))
+        vlan.vrrp_groups.append(vrrp_group)
+
+    _standby_options.dispatch(vrrp_info.strip(), vrrp_group)
+
+
+def _add_vrrp_ip(vrrp_group, ip):
+    vrrp_group.ips.append(IPAddress(ip))
+
+
+def _set_vrrp_timers(vrrp_group, hello_interval, dead_interval):
+    vrrp_group.hello_interval = int(hello_interval)
+    vrrp_group.dead_interval = int(dead_interval)
+
+
+def _set_vrrp_priority(vrrp_group, priority):
+    vrrp_group.priority = int(priority)
+
+
+def _set_vrrp_tracking(vrrp_group, track_id, track_decrement):
+    vrrp_group.track_id = track_id
+    vrrp_group.track_decrement = int(track_decrement)
+
+
+def _add_dhcp_relay_server(vlan, ip_address):
+    vlan.dhcp_relay_servers.append(IPAddress(ip_address))
+
+
+def _disable_icmp_redirects(vlan):
+    vlan.icmp_redirects = False
+
+
+_sections = LineClassifier([
+    ("interface (\w*Ethernet[^\s]*)", _open_interface),
+    ("interface (Port-channel[^\s]*)", _open_interface),
+    ("interface Vlan(\d+)", _open_vlan_interface),
+    ("vlan ([\d,-]+)$", _open_vlans),
+])
+
+_interface_lines = LineClassifier([
+    (" switchport mode (.*)", _InterfaceConfig.set_port_mode),
+    (" switchport access vlan (\d*)", _InterfaceConfig.set_access_vlan),
+    (" switchport trunk native vlan (\d*)", _InterfaceConfig.set_native_vlan),
+    (" switchport trunk allowed vlan (.*)", _InterfaceConfig.set_trunk_vlans),
+    (" shutdown", _InterfaceConfig.shut_down),
+])
+
+_vlan_lines = LineClassifier([
+    ("^ name ([^\s]*)", _set_vlans_name),
+])
+
+_vlan_interface_lines = LineClassifier([
+    ("^ ip address ([^\s]*) ([^\s]*)(.*)", _add_ip),
+    ("^ ip access-group ([^\s]*) ([^\s]*).*", _set_access_group),
+    ("^ ip vrf forwarding ([^\s]*).*", _set_vrf_forwarding),
+    ("^ standby ([^\s]*)(.*)", _apply_standby),
+    ("^ ip helper-address ([^\s]*)", _add_dhcp_relay_server),
+    ("^ no ip redirects", _disable_icmp_redirects),
+])
+
+_standby_options = LineClassifier([
+    ("^ip ([^\s]*).*", _add_vrrp_ip),
+    ("^timers ([^\s]*) ([^\s]*)", _set_vrrp_timers),
+    ("^priority ([^\s]*)", _set_vrrp_priority),
+    ("^track ([^\s]*) decrement ([^\s]*)", _set_vrrp_tracking),
+])
 
 
 def get_vlan_interfaces_from_data(vlan_number, interfaces_data):
@@ -555,13 +692,6 @@ def get_vlan_interfaces_from_data(vlan_number, interfaces_data):
     return vlan_interfaces
 
 
-def parse(single_range):
-    if regex.match("(\d+)-(\d+)", single_range):
-        return range(int(regex[0]), int(regex[1]) + 1)
-    else:
-        return [int(single_range)]
-
-
 def bond_name(number):
     return "Port-channel{}".format(number)
 
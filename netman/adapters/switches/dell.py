@@ -16,20 +16,46 @@ import warnings
 from netman.adapters.shell.ssh import SshClient
 from netman.adapters.shell.telnet import TelnetClient
 from netman.core.objects.interface_states import OFF, ON
-from netman.core.objects.port_modes import TRUNK
-from netman.core.objects.port_modes import ACCESS
-from netman.core.objects.interface import Interface
 from netman.adapters.switches.cisco import parse_vlan_ranges
 from netman.core.objects.vlan import Vlan
 from netman import regex
 from netman.core.objects.switch_transactional import FlowControlSwitch
-from netman.adapters.switches.util import SubShell, no_output, ResultChecker
+from netman.adapters.switches.util import SubShell, no_output, ResultChecker, result_pattern, \
+    parse_switchport_interface
 from netman.core.objects.exceptions import UnknownInterface, BadVlanName, \
     BadVlanNumber, UnknownVlan, InterfaceInWrongPortMode, NativeVlanNotSet, TrunkVlanNotSet, BadInterfaceDescription, \
     VlanAlreadyExist, UnknownBond, InvalidMtuSize
 from netman.core.objects.switch_base import SwitchBase
 
 
+_invalid_input = regex.compile(".*\^.*")
+_error = regex.compile("^ERROR")
+_vlan_header = regex.compile("^VLAN")
+_unknown_interface = regex.compile("ERROR.*")
+_ethernet_status = regex.compile("(\d\S+).*")
+_port_channel_status = regex.compile("ch(\d+).*")
+_vlan_row = regex.compile('^(\d+)(.*)')
+_vlan_row_ports = regex.compile('^\s{1,6}\S*\s+([a-zA-Z0-9-,/]+).*')
+_vlan_continued_ports = regex.compile('^\s+([a-zA-Z0-9-,/]+).*')
+_port_channel_range = regex.compile('^ch(\d+)-(\d+)')
+_port_channel = regex.compile('^ch(\d+)')
+_ethernet_range = regex.compile('^(\d/[a-z]+)(\d+)-\d/[a-z]+(\d+)')
+_ethernet = regex.compile('^(\d/[a-z]+)(\d+)')
+_trunk_vlans = regex.compile("switchport \S+ allowed vlan add (\S+)")
+_interface_section = regex.compile("^interface (.+)$")
+_vlan_row_name = regex.compile('^\s{1,6}(\S+).*')
+_port_mode = regex.compile("switchport mode (\S+)")
+_any_access_vlan = regex.compile("switchport access vlan .*")
+_any_native_vlan = regex.compile("switchport general pvid (\S+)")
+_allowed_vlans = regex.compile("switchport (\S+) allowed vlan.*")
+
+_unknown_vlans = result_pattern(".*These VLANs do not exist:.*")
+_vlan_id_not_found = result_pattern(".*VLAN ID not found.*")
+_not_in_access_mode = result_pattern(".*Interface not in Access Mode.*")
+_out_of_range = result_pattern(".*Value is out of range.*")
+_vlan_does_not_exist = result_pattern(".*VLAN does not exist.*")
+
+
 def ssh(switch_descriptor):
     return Dell(switch_descriptor, shell_factory=SshClient)
 
@@ -50,29 +76,50 @@ def factory_telnet(switch_descriptor, lock):
 
 class Dell(SwitchBase):
 
-    def __init__(self, switch_descriptor, shell_factory):
+    def __init__(self, switch_descriptor, shell_factory, recorder=None):
         super(Dell, self).__init__(switch_descriptor)
         self.shell = None
         self.shell_factory = shell_factory
+        self.recorder = recorder
 
     def _connect(self):
+        self.shell = self._borrow_connection(self._open_shell, close=self._close_shell,
+                                             probe=lambda shell: shell.is_alive())
+
+    def _disconnect(self):
+        if self.shell.failed:
+            self._discard_connection(self.shell, close=self._close_shell)
+        else:
+            self._release_connection(self.shell, close=self._close_shell, reset=self._reset_shell)
+
+    def _open_shell(self):
         params = dict(
             host=self.switch_descriptor.hostname,
             username=self.switch_descriptor.username,
             password=self.switch_descriptor.password,
+            metrics_tags=dict(model=self.switch_descriptor.model),
         )
 
         if self.switch_descriptor.port:
             params["port"] = self.switch_descriptor.port
+        if self.recorder is not None:
+            params["recorder"] = self.recorder
 
-        self.shell = self.shell_factory(**params)
+        shell = self.shell_factory(**params)
 
-        self.shell.do("enable", wait_for=":")
-        self.shell.do(self.switch_descriptor.password)
+        shell.do("enable", wait_for=":")
+        shell.do(self.switch_descriptor.password)
+        shell.exec_prompt = shell.get_current_prompt()
 
-    def _disconnect(self):
-        self.shell.quit("quit")
-        self.logger.info(self.shell.full_log)
+        return shell
+
+    def _close_shell(self, shell):
+        shell.quit("quit")
+        self.logger.debug(shell.full_log)
+
+    def _reset_shell(self, shell):
+        self.logger.debug(shell.full_log)
+        shell.reset_transcript()
 
     def _start_transaction(self):
         pass
@@ -92,31 +139,25 @@ class Dell(SwitchBase):
             self.shell.do('shutdown' if state is OFF else 'no shutdown')
 
     def get_vlans(self):
-        result = self.shell.do('show vlan', wait_for=("--More-- or (q)uit", "#"), include_last_line=True)
-        while len(result) > 0 and "--More--" in result[-1]:
-            result += self.shell.send_key("m", wait_for=("--More-- or (q)uit", "#"), include_last_line=True)
+        result = self.show_paged('show vlan')
 
         vlans = parse_vlan_list(result)
         return vlans
 
     def get_vlan(self, vlan_number):
-        result = self.shell.do("show vlan id {}".format(vlan_number), wait_for=("--More-- or (q)uit", "#"), include_last_line=True)
-        while len(result) > 0 and "--More--" in result[-1]:
-            result += self.shell.send_key("m", wait_for=("--More-- or (q)uit", "#"), include_last_line=True)
-        if regex.match(".*\^.*", result[0]):
+        result = self.show_paged("show vlan id {}".format(vlan_number))
+        if regex.match(_invalid_input, result[0]):
             raise BadVlanNumber()
-        elif regex.match("^ERROR", result[0]):
+        elif regex.match(_error, result[0]):
             raise UnknownVlan(vlan_number)
         vlan = parse_vlan_list(result)[0]
         return vlan
 
     def get_vlan_interfaces(self, vlan_number):
-        result = self.shell.do("show vlan id {}".format(vlan_number), wait_for=("--More-- or (q)uit", "#"), include_last_line=True)
-        while len(result) > 0 and "--More--" in result[-1]:
-            result += self.shell.send_key("m", wait_for=("--More-- or (q)uit", "#"), include_last_line=True)
-        if regex.match(".*\^.*", result[0]):
+        result = self.show_paged("show vlan id {}".format(vlan_number))
+        if regex.match(_invalid_input, result[0]):
             raise BadVlanNumber()
-        elif regex.match("^ERROR", result[0]):
+        elif regex.match(_error, result[0]):
             raise UnknownVlan(vlan_number)
 
         return self.parse_interface_from_vlan_list(vlan_number, result)
@@ -125,20 +166,16 @@ class Dell(SwitchBase):
         return self.read_interface(interface_id)
 
     def get_interfaces(self):
-        result = self.shell.do('show interfaces status', wait_for=("--More-- or (q)uit", "#"), include_last_line=True)
-        name_list = self.parse_interface_names(result)
-
-        while len(result) > 0 and "--More--" in result[-1]:
-            result = self.shell.send_key("m", wait_for=("--More-- or (q)uit", "#"), include_last_line=True)
-            name_list += self.parse_interface_names(result)
+        name_list = self.parse_interface_names(self.show_paged('show interfaces status'))
+        interfaces_data = split_interfaces_data(self.show_paged('show running-config'))
 
-        return [self.read_interface(name) for name in name_list]
+        return [parse_interface(name, interfaces_data.get(name, [])) for name in name_list]
 
     def add_vlan(self, number, name=None):
         result = self.shell.do("show vlan id {}".format(number))
-        if regex.match(".*\^.*", result[0]):
+        if regex.match(_invalid_input, result[0]):
             raise BadVlanNumber()
-        elif regex.match("^VLAN", result[0]):
+        elif regex.match(_vlan_header, result[0]):
             raise VlanAlreadyExist(number)
 
         with self.config():
@@ -152,7 +189,7 @@ class Dell(SwitchBase):
     def remove_vlan(self, number, name=None):
         with self.config():
             with self.vlan_database():
-                self.set('no vlan {}', number).on_result_matching(".*These VLANs do not exist:.*", UnknownVlan, number)
+                self.set('no vlan {}', number).on_result_matching(_unknown_vlans, UnknownVlan, number)
 
     def set_interface_description(self, interface_id, description):
         with self.config(), self.interface(interface_id):
@@ -173,13 +210,13 @@ class Dell(SwitchBase):
     def set_access_vlan(self, interface_id, vlan):
         with self.config(), self.interface(interface_id):
             self.set("switchport access vlan {}", vlan)\
-                .on_result_matching(".*VLAN ID not found.*", UnknownVlan, vlan)\
-                .on_result_matching(".*Interface not in Access Mode.*", InterfaceInWrongPortMode, "trunk")
+                .on_result_matching(_vlan_id_not_found, UnknownVlan, vlan)\
+                .on_result_matching(_not_in_access_mode, InterfaceInWrongPortMode, "trunk")
 
     def set_interface_mtu(self, interface_id, size):
         with self.config(), self.interface(interface_id):
             self.set("mtu {}", size)\
-                .on_result_matching(".*Value is out of range.*", InvalidMtuSize, size)
+                .on_result_matching(_out_of_range, InvalidMtuSize, size)
 
     def unset_interface_mtu(self, interface_id):
         with self.config(), self.interface(interface_id):
@@ -233,7 +270,7 @@ class Dell(SwitchBase):
                 actual_port_mode = "trunk"
 
             self.set("switchport {} allowed vlan add {}", actual_port_mode, vlan)\
-                .on_result_matching(".*VLAN does not exist.*", UnknownVlan, vlan)
+                .on_result_matching(_vlan_does_not_exist, UnknownVlan, vlan)
 
     def remove_trunk_vlan(self, interface_id, vlan):
         interface_data = self.get_interface_data(interface_id)
@@ -300,6 +337,19 @@ class Dell(SwitchBase):
         return SubShell(self.shell, enter="interface {}".format(interface_id), exit_cmd='exit',
                         validate=no_output(UnknownInterface, interface_id))
 
+    def show_paged(self, command):
+        page = self.shell.do(command, wait_for=("--More-- or (q)uit", "#"), include_last_line=True)
+        pages = [page]
+        while len(page) > 0 and "--More--" in page[-1]:
+            page = self.shell.send_key("m", wait_for=("--More-- or (q)uit", "#"), include_last_line=True)
+            pages.append(page)
+
+        return [line for page in pages for line in page]
+
+    def copy_vlans(self, data, from_mode, to_mode):
+        for command in copy_vlans_commands(data, from_mode, to_mode):
+            self.shell.do(command)
+
     def set(self, command, *arguments):
         result = self.shell.do(command.format(*arguments))
 
@@ -307,56 +357,34 @@ class Dell(SwitchBase):
 
     def get_interface_data(self, interface_id):
         interface_data = self.shell.do("show running-config interface {}".format(interface_id))
-        if len(interface_data) > 0 and regex.match("ERROR.*", interface_data[0]):
+        if len(interface_data) > 0 and regex.match(_unknown_interface, interface_data[0]):
             raise UnknownInterface(interface_id)
         return interface_data
 
-    def copy_vlans(self, data, from_mode, to_mode):
-        for line in data:
-            if regex.match("switchport {} allowed vlan.*".format(from_mode), line):
-                self.shell.do(line.replace(from_mode, to_mode))
-
     def parse_interface_names(self, status_list):
         interfaces = []
         for line in status_list:
-            if regex.match("(\d\S+).*", line):
+            if regex.match(_ethernet_status, line):
                 interfaces.append("ethernet {}".format(regex[0]))
-            elif regex.match("ch(\d+).*", line):
+            elif regex.match(_port_channel_status, line):
                 interfaces.append("port-channel {}".format(regex[0]))
 
         return interfaces
 
     def read_interface(self, interface_name):
-        data = self.get_interface_data(interface_name)
-
-        interface = Interface(name=interface_name, port_mode=ACCESS, shutdown=False)
-        for line in data:
-            if regex.match("switchport mode \S+", line):
-                interface.port_mode = TRUNK
-            if regex.match("shutdown", line):
-                interface.shutdown = True
-            if regex.match("switchport access vlan (\d+)", line):
-                interface.access_vlan = int(regex[0])
-            if regex.match("switchport general pvid (\d+)", line):
-                interface.trunk_native_vlan = int(regex[0])
-            if regex.match("switchport \S+ allowed vlan add (\S+)", line):
-                interface.trunk_vlans += parse_vlan_ranges(regex[0])
-            if regex.match("mtu (\d+)", line):
-                interface.mtu = int(regex[0])
-
-        return interface
+        return parse_interface(interface_name, self.get_interface_data(interface_name))
 
     def parse_interface_from_vlan_list(self, vlan_number, result):
         vlan_interfaces = []
         number = None
         for line in result:
-            if regex.match('^(\d+)(.*)', line):
+            if regex.match(_vlan_row, line):
                 number, leftover = regex
                 if int(number) == vlan_number:
-                    if regex.match('^\s{1,6}\S*\s+([a-zA-Z0-9-,/]+).*', leftover):
+                    if regex.match(_vlan_row_ports, leftover):
                         vlan_interfaces.extend(self.parse_interface_port_list(regex[0]))
 
-            elif regex.match('^\s+([a-zA-Z0-9-,/]+).*', line) and int(number) == vlan_number:
+            elif regex.match(_vlan_continued_ports, line) and int(number) == vlan_number:
                 vlan_interfaces.extend(self.parse_interface_port_list(regex[0]))
 
         return vlan_interfaces
@@ -365,30 +393,54 @@ class Dell(SwitchBase):
         port_list = filter(None, ports.split(','))
         interface_list = []
         for port in port_list:
-            if regex.match('^ch(\d+)-(\d+)', port):
+            if regex.match(_port_channel_range, port):
                 start, end = regex
                 for i in range(int(start), int(end)+1):
                     interface_list.append("port-channel {}".format(i))
-            elif regex.match('^ch(\d+)', port):
+            elif regex.match(_port_channel, port):
                 start = regex[0]
                 interface_list.append("port-channel {}".format(start))
-            elif regex.match('^(\d/[a-z]+)(\d+)-\d/[a-z]+(\d+)', port):
+            elif regex.match(_ethernet_range, port):
                 debut, start, end = regex
                 for i in range(int(start), int(end)+1):
                     interface_list.append("ethernet {0}{1}".format(debut, i))
-            elif regex.match('^(\d/[a-z]+)(\d+)', port):
+            elif regex.match(_ethernet, port):
                 debut, start = regex
                 interface_list.append("ethernet {0}{1}".format(debut, start))
         return interface_list
 
 
+def parse_interface(interface_name, data):
+    return parse_switchport_interface(interface_name, data, _trunk_vlans)
+
+
+def split_interfaces_data(running_config):
+    """
+    Gives the lines of every "interface" section of a running config by interface name
+
+    Interfaces left to their defaults have no section.
+    """
+    interfaces_data = {}
+    current = None
+    for line in running_config:
+        line = line.strip()
+        if regex.match(_interface_section, line):
+            current = interfaces_data.setdefault(regex[0], [])
+        elif line == "exit":
+            current = None
+        elif current is not None and line:
+            current.append(line)
+
+    return interfaces_data
+
+
 def parse_vlan_list(result):
     vlans = []
     for line in result:
-        if regex.match('^(\d+)(.*)', line):
+        if regex.match(_vlan_row, line):
             number, leftovers = regex
             name = None
-            if regex.match('^\s{1,6}(\S+).*', leftovers):
+            if regex.match(_vlan_row_name, leftovers):
                 name = regex[0]
             vlan = Vlan(number=int(number),
                         name=name if int(number) > 1 else "default")
@@ -398,27 +450,32 @@ def parse_vlan_list(result):
 
 def resolve_port_mode(interface_data):
     for line in interface_data:
-        if regex.match("switchport mode (\S+)", line):
+        if regex.match(_port_mode, line):
             return regex[0]
-        elif regex.match("switchport access vlan .*", line):
+        elif regex.match(_any_access_vlan, line):
             return "access"
     return None
 
 
 def assert_native_vlan_is_set(interface_id, interface_data):
     for line in interface_data:
-        if regex.match("switchport general pvid (\S+)", line):
+        if regex.match(_any_native_vlan, line):
             return
     raise NativeVlanNotSet(interface_id)
 
 
 def resolve_trunk_vlans(interface_data):
     for line in interface_data:
-        if regex.match("switchport \S+ allowed vlan add (\S+)", line):
+        if regex.match(_trunk_vlans, line):
             return parse_vlan_ranges(regex[0])
     return []
 
 
+def copy_vlans_commands(interface_data, from_mode, to_mode):
+    return [line.replace(from_mode, to_mode) for line in interface_data
+            if regex.match(_allowed_vlans, line) and regex[0] == from_mode]
+
+
 def bond_name(number):
     return "port-channel {}".format(number)
 
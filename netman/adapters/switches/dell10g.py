@@ -17,15 +17,39 @@ from netman import regex
 from netman.adapters.shell.ssh import SshClient
 from netman.adapters.shell.telnet import TelnetClient
 from netman.adapters.switches.cisco import parse_vlan_ranges
-from netman.adapters.switches.dell import Dell, resolve_port_mode
+from netman.adapters.switches.dell import Dell, resolve_port_mode, split_interfaces_data
+from netman.adapters.switches.util import result_pattern, parse_switchport_interface
 from netman.core.objects.exceptions import InterfaceInWrongPortMode, UnknownVlan, UnknownInterface, BadVlanName, \
     BadVlanNumber, TrunkVlanNotSet, VlanAlreadyExist
-from netman.core.objects.interface import Interface
-from netman.core.objects.port_modes import TRUNK, ACCESS
 from netman.core.objects.switch_transactional import FlowControlSwitch
 from netman.core.objects.vlan import Vlan
 
 
+_invalid_input = regex.compile(".*\^.*")
+_error = regex.compile("^ERROR")
+_vlan_header = regex.compile("^VLAN")
+_unknown_interface = regex.compile(".*invalid interface.*")
+_tengigabit_range = regex.compile("Te(\d+/\d+/)(\d+)-(\d+).*")
+_tengigabit = regex.compile("Te(\d+/\d+/\S+).*")
+_fortygigabit_range = regex.compile("Fo(\d+/\d+/)(\d+)-(\d+).*")
+_fortygigabit = regex.compile("Fo(\d+/\d+/\S+).*")
+_port_channel_range = regex.compile("Po(\d+)-(\d+)")
+_port_channel = regex.compile("Po(\d+).*")
+_any_trunk_vlans = regex.compile(".*trunk allowed vlan.*")
+_interface_trunk_vlans = regex.compile("switchport \S* allowed vlan (?:add )?(\S+)")
+_short_tengigabit = regex.compile("Te(\d+/\d+/\S+)$")
+_short_fortygigabit = regex.compile("Fo(\d+/\d+/\S+)$")
+_short_port_channel = regex.compile("Po(\d+)$")
+_vlan_row = regex.compile('^(\d+)(.*)')
+_vlan_row_name_and_ports = regex.compile('^\s{1,6}(\S+)\s+([A-Za-z0-9-,/]+)')
+_vlan_row_name = regex.compile('^\s{1,6}(\S+).*')
+_trunk_vlans = regex.compile("switchport \S+ allowed vlan (add )?(\S+)")
+
+_unknown_vlans = result_pattern(".*These VLANs do not exist:.*")
+_vlan_id_not_found = result_pattern(".*VLAN ID not found.*")
+_vlan_does_not_exist = result_pattern(".*VLAN does not exist.*")
+
+
 def ssh(switch_descriptor):
     return Dell10G(switch_descriptor, shell_factory=SshClient)
 
@@ -46,10 +70,12 @@ def factory_telnet(switch_descriptor, lock):
 
 class Dell10G(Dell):
 
-    def _connect(self):
-        super(Dell10G, self)._connect()
+    def _open_shell(self):
+        shell = super(Dell10G, self)._open_shell()
 
-        self.shell.do("terminal length 0")
+        shell.do("terminal length 0")
+
+        return shell
 
     def get_vlans(self):
         result = self.shell.do('show vlan')
@@ -57,22 +83,25 @@ class Dell10G(Dell):
 
     def get_vlan(self, number):
         result = self.shell.do("show vlan id {}".format(number))
-        if regex.match(".*\^.*", result[0]):
+        if regex.match(_invalid_input, result[0]):
             raise BadVlanNumber()
-        elif regex.match("^ERROR", result[0]):
+        elif regex.match(_error, result[0]):
             raise UnknownVlan(number)
         else:
             return parse_vlan_list(result)[0]
 
     def get_interfaces(self):
-        result = self.shell.do('show interfaces status')
-        return [self.read_interface(name) for name in parse_interface_names(result)]
+        name_list = parse_interface_names(self.shell.do('show interfaces status'))
+        interfaces_data = dict((long_interface_name(name), data) for name, data
+                               in split_interfaces_data(self.shell.do_iter('show running-config')).items())
+
+        return [parse_interface(name, interfaces_data.get(name, [])) for name in name_list]
 
     def add_vlan(self, number, name=None):
         result = self.shell.do("show vlan id {}".format(number))
-        if regex.match(".*\^.*", result[0]):
+        if regex.match(_invalid_input, result[0]):
             raise BadVlanNumber()
-        elif regex.match("^VLAN", result[0]):
+        elif regex.match(_vlan_header, result[0]):
             raise VlanAlreadyExist(number)
 
         with self.config():
@@ -90,7 +119,7 @@ class Dell10G(Dell):
 
     def remove_vlan(self, number, name=None):
         with self.config():
-            self.set('no vlan {}', number).on_result_matching(".*These VLANs do not exist:.*", UnknownVlan, number)
+            self.set('no vlan {}', number).on_result_matching(_unknown_vlans, UnknownVlan, number)
 
     def set_access_mode(self, interface_id):
         with self.config(), self.interface(interface_id):
@@ -117,7 +146,7 @@ class Dell10G(Dell):
 
         with self.config(), self.interface(interface_id):
             self.set("switchport access vlan {}", vlan) \
-                .on_result_matching(".*VLAN ID not found.*", UnknownVlan, vlan)
+                .on_result_matching(_vlan_id_not_found, UnknownVlan, vlan)
 
     def add_trunk_vlan(self, interface_id, vlan):
         interface_data = self.get_interface_data(interface_id)
@@ -138,13 +167,13 @@ class Dell10G(Dell):
             if actual_port_mode == "trunk":
                 if has_trunk_vlans(interface_data):
                     self.set("switchport {} allowed vlan add {}", actual_port_mode, vlan) \
-                        .on_result_matching(".*VLAN does not exist.*", UnknownVlan, vlan)
+                        .on_result_matching(_vlan_does_not_exist, UnknownVlan, vlan)
                 else:
                     self.set("switchport {} allowed vlan {}", actual_port_mode, vlan) \
-                        .on_result_matching(".*VLAN does not exist.*", UnknownVlan, vlan)
+                        .on_result_matching(_vlan_does_not_exist, UnknownVlan, vlan)
             else:
                 self.set("switchport {} allowed vlan add {}", actual_port_mode, vlan) \
-                    .on_result_matching(".*VLAN does not exist.*", UnknownVlan, vlan)
+                    .on_result_matching(_vlan_does_not_exist, UnknownVlan, vlan)
 
     def remove_trunk_vlan(self, interface_id, vlan):
         interface_data = self.get_interface_data(interface_id)
@@ -159,51 +188,36 @@ class Dell10G(Dell):
 
     def get_interface_data(self, interface_id):
         interface_data = self.shell.do("show running-config interface {}".format(interface_id))
-        if len(interface_data) > 0 and regex.match(".*invalid interface.*", interface_data[0]):
+        if len(interface_data) > 0 and regex.match(_unknown_interface, interface_data[0]):
             raise UnknownInterface(interface_id)
         return interface_data
 
     def read_interface(self, interface_name):
-        data = self.get_interface_data(interface_name)
-
-        interface = Interface(name=interface_name, port_mode=ACCESS, shutdown=False)
-        for line in data:
-            if regex.match("switchport mode \S+", line):
-                interface.port_mode = TRUNK
-            if regex.match("shutdown", line):
-                interface.shutdown = True
-            if regex.match("switchport access vlan (\d+)", line):
-                interface.access_vlan = int(regex[0])
-            if regex.match("switchport general pvid (\d+)", line):
-                interface.trunk_native_vlan = int(regex[0])
-            if regex.match("switchport \S* allowed vlan (add )?(\S+)", line):
-                interface.trunk_vlans = parse_vlan_ranges(regex[1])
-
-        return interface
+        return parse_interface(interface_name, self.get_interface_data(interface_name))
 
     def parse_interface_port_list(self, ports):
         port_list = filter(None, ports.split(','))
         interfaces = []
         for line in port_list:
-            if regex.match("Te(\d+/\d+/)(\d+)-(\d+).*", line):
+            if regex.match(_tengigabit_range, line):
                 debut, start, end = regex
                 for i in range(int(start), int(end)+1):
                     interfaces.append("tengigabitethernet {0}{1}".format(debut, i))
-            elif regex.match("Te(\d+/\d+/\S+).*", line):
+            elif regex.match(_tengigabit, line):
                 interfaces.append("tengigabitethernet {}".format(regex[0]))
 
-            elif regex.match("Fo(\d+/\d+/)(\d+)-(\d+).*", line):
+            elif regex.match(_fortygigabit_range, line):
                 debut, start, end = regex
                 for i in range(int(start), int(end)+1):
                     interfaces.append("fortygigabitethernet {0}{1}".format(debut, i))
-            elif regex.match("Fo(\d+/\d+/\S+).*", line):
+            elif regex.match(_fortygigabit, line):
                 interfaces.append("fortygigabitethernet {}".format(regex[0]))
 
-            elif regex.match("Po(\d+)-(\d+)", line):
+            elif regex.match(_port_channel_range, line):
                 start, end = regex
                 for i in range(int(start), int(end)+1):
                     interfaces.append("port-channel {}".format(i))
-            elif regex.match("Po(\d+).*", line):
+            elif regex.match(_port_channel, line):
                 interfaces.append("port-channel {}".format(regex[0]))
 
         return interfaces
@@ -223,17 +237,31 @@ class Dell10G(Dell):
 
 def has_trunk_vlans(interface_data):
     for line in interface_data:
-        if regex.match(".*trunk allowed vlan.*", line):
+        if regex.match(_any_trunk_vlans, line):
             return True
     return False
 
 
+def parse_interface(interface_name, data):
+    return parse_switchport_interface(interface_name, data, _interface_trunk_vlans)
+
+
+def long_interface_name(name):
+    if regex.match(_short_tengigabit, name):
+        return "tengigabitethernet {}".format(regex[0])
+    elif regex.match(_short_fortygigabit, name):
+        return "fortygigabitethernet {}".format(regex[0])
+    elif regex.match(_short_port_channel, name):
+        return "port-channel {}".format(regex[0])
+    return name
+
+
 def parse_interface_names(status_list):
     interfaces = []
     for line in status_list:
-        if regex.match("Te(\d+/\d+/\S+).*", line):
+        if regex.match(_tengigabit, line):
             interfaces.append("tengigabitethernet {}".format(regex[0]))
-        elif regex.match("Po(\d+).*", line):
+        elif regex.match(_port_channel, line):
             interfaces.append("port-channel {}".format(regex[0]))
 
     return interfaces
@@ -242,12 +270,12 @@ def parse_interface_names(status_list):
 def parse_vlan_list(result):
     vlans = []
     for line in result:
-        if regex.match('^(\d+)(.*)', line):
+        if regex.match(_vlan_row, line):
             number, leftovers = regex
             name = None
-            if regex.match('^\s{1,6}(\S+)\s+([A-Za-z0-9-,/]+)', leftovers):
+            if regex.match(_vlan_row_name_and_ports, leftovers):
                 name, ports = regex
-            elif regex.match('^\s{1,6}(\S+).*', leftovers):
+            elif regex.match(_vlan_row_name, leftovers):
                 name = regex[0]
 
             if name == "VLAN{:0>4}".format(number):
@@ -260,6 +288,6 @@ def parse_vlan_list(result):
 
 def resolve_trunk_vlans(interface_data):
     for line in interface_data:
-        if regex.match("switchport \S+ allowed vlan (add )?(\S+)", line):
+        if regex.match(_trunk_vlans, line):
             return parse_vlan_ranges(regex[1])
     return []
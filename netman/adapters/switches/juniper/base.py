@@ -12,6 +12,11 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import calendar
+from copy import deepcopy
+import logging
+import time
+
 from ncclient import manager
 from ncclient.operations import RPCError, TimeoutExpiredError
 from ncclient.xml_ import new_ele, sub_ele, to_ele, to_xml
@@ -27,21 +32,63 @@ from netman.core.objects.interface_states import ON, OFF
 from netman.core.objects.port_modes import ACCESS, TRUNK, BOND_MEMBER
 from netman.core.objects.switch_base import SwitchBase
 from netman.core.objects.vlan import Vlan
+from netman.core.objects.vlan_set import VlanSet
 from netman.core.objects.bond import Bond
+from netman.adapters.switches.juniper.candidate import CandidateSnapshot
+from netman.adapters.switches.juniper.records import GetConfigurationRecords
+from netman.adapters.switches.juniper.running_config import SharedReply
+
+default_streaming_replies = False
+default_deferred_edits = False
+default_running_config_cache = None
+default_physical_interface_inventory = None
+default_probe_timeout = 5
+
+
+_not_checked = object()
+
+_vlan_range = regex.compile("^(\d+)-(\d+)$")
+_vlan_number = regex.compile("^(\d+)$")
 
 
 class Juniper(SwitchBase):
 
     def __init__(self, switch_descriptor, custom_strategies,
-                 timeout=300):
+                 timeout=300, streaming_replies=None, deferred_edits=None, running_config_cache=None,
+                 physical_interface_inventory=None):
         super(Juniper, self).__init__(switch_descriptor)
         self.timeout = timeout
         self.custom_strategies = custom_strategies
+        self.streaming_replies = default_streaming_replies if streaming_replies is None else streaming_replies
+        self.deferred_edits = default_deferred_edits if deferred_edits is None else deferred_edits
+        self.running_config_cache = default_running_config_cache if running_config_cache is None \
+            else running_config_cache
+        self.physical_interface_inventory = default_physical_interface_inventory \
+            if physical_interface_inventory is None else physical_interface_inventory
         self.netconf = None
+        self.latest_commit = _not_checked
 
         self.in_transaction = False
+        self.candidate_locked = False
+        self.candidate = None
+        self.pending_edits = []
+        self.sent_edits = []
+        self.physical_interfaces_changed = False
 
     def _connect(self):
+        self.latest_commit = _not_checked
+        self.netconf = self._borrow_connection(self._open_netconf, close=self._close_netconf,
+                                               probe=self._probe_netconf)
+
+    def _disconnect(self):
+        if self.candidate_locked:
+            self.logger.info("Closing a session that still holds the candidate lock")
+            self.candidate_locked = False
+            self._discard_connection(self.netconf, close=self._close_netconf)
+        else:
+            self._release_connection(self.netconf, close=self._close_netconf)
+
+    def _open_netconf(self):
         params = dict(
             host=self.switch_descriptor.hostname,
             username=self.switch_descriptor.username,
@@ -54,11 +101,23 @@ class Juniper(SwitchBase):
         if self.switch_descriptor.port:
             params["port"] = self.switch_descriptor.port
 
-        self.netconf = manager.connect(**params)
+        return manager.connect(**params)
 
-    def _disconnect(self):
+    def _probe_netconf(self, netconf):
+        if not netconf.connected:
+            return False
+
+        timeout = netconf.timeout
+        netconf.timeout = default_probe_timeout
         try:
-            self.netconf.close_session()
+            netconf.rpc(to_ele("<get-software-information/>"))
+        finally:
+            netconf.timeout = timeout
+        return True
+
+    def _close_netconf(self, netconf):
+        try:
+            netconf.close_session()
         except TimeoutExpiredError:
             pass
 
@@ -73,23 +132,48 @@ class Juniper(SwitchBase):
                 raise LockedSwitch()
             else:
                 raise
+        self.candidate_locked = True
         self.in_transaction = True
+        self.candidate = CandidateSnapshot()
 
     def end_transaction(self):
         self.in_transaction = False
+        self.candidate = None
+        self.pending_edits = []
+        self.sent_edits = []
         self.netconf.unlock(target="candidate")
+        self.candidate_locked = False
 
     def rollback_transaction(self):
+        self.pending_edits = []
+        self.sent_edits = []
+        self.physical_interfaces_changed = False
         self.netconf.discard_changes()
+        if self.candidate is not None:
+            self.candidate = CandidateSnapshot()
 
     def commit_transaction(self):
+        self._send_pending_edits()
+
         try:
             self.netconf.commit()
         except RPCError as e:
             self.logger.info("An RPCError was raised : {}".format(e))
             raise OperationNotCompleted(str(e).strip())
+        finally:
+            self.latest_commit = _not_checked
+            if self.running_config_cache is not None:
+                self.running_config_cache.invalidate(self.switch_descriptor)
+
+        if self.physical_interfaces_changed and self.physical_interface_inventory is not None:
+            self.physical_interface_inventory.invalidate(self.switch_descriptor)
+        self.physical_interfaces_changed = False
 
     def get_vlans(self):
+        if self.streaming_replies:
+            records = self.query_records(all_vlans, all_interfaces)
+            return [record_to_vlan(vlan, records) for vlan in records.vlans if vlan.number is not None]
+
         config = self.query(all_vlans, all_interfaces)
 
         vlan_list = []
@@ -122,8 +206,7 @@ class Juniper(SwitchBase):
 
             l3_if_type, l3_if_name = get_l3_interface(vlan_node)
             if l3_if_name is not None:
-                interface_vlan_node = first(config.xpath("data/configuration/interfaces/interface/name[text()=\"{}\"]/.."
-                                                    "/unit/name[text()=\"{}\"]/..".format(l3_if_type, l3_if_name)))
+                interface_vlan_node = interface_index(config).units.get((l3_if_type, l3_if_name))
                 if interface_vlan_node is not None:
                     vlan.ips = parse_ips(interface_vlan_node)
                     vlan.access_groups[IN] = parse_inet_filter(interface_vlan_node, "input")
@@ -132,13 +215,16 @@ class Juniper(SwitchBase):
 
     def get_interfaces(self):
         physical_interfaces = self._list_physical_interfaces()
+        if self.streaming_replies:
+            return self._get_interfaces_from_records(physical_interfaces)
+
         config = self.query(all_interfaces, all_vlans)
+        interface_nodes = interface_index(config).nodes_by_name
 
         interface_list = []
         for phys_int in physical_interfaces:
             if not phys_int.name.startswith("ae"):
-                interface_node = first(config.xpath("data/configuration/interfaces/interface/name[text()=\"{}\"]/.."
-                                                    .format(phys_int.name)))
+                interface_node = interface_nodes.get(phys_int.name)
                 if interface_node is not None:
                     interface_list.append(self.node_to_interface(interface_node, config))
                 else:
@@ -146,6 +232,20 @@ class Juniper(SwitchBase):
 
         return interface_list
 
+    def _get_interfaces_from_records(self, physical_interfaces):
+        records = self.query_records(all_interfaces, all_vlans)
+
+        interface_list = []
+        for phys_int in physical_interfaces:
+            if not phys_int.name.startswith("ae"):
+                interface_record = records.interfaces.get(phys_int.name)
+                if interface_record is not None:
+                    interface_list.append(self.record_to_interface(interface_record, records))
+                else:
+                    interface_list.append(phys_int.to_interface())
+
+        return interface_list
+
     def add_vlan(self, number, name=None):
         config = self.query(all_vlans)
 
@@ -158,24 +258,24 @@ class Juniper(SwitchBase):
         update = Update()
         update.add_vlan(vlan_update(number, name))
 
-        try:
-            self._push(update)
-        except RPCError as e:
+        def on_error(e):
             if "being used by" in e.message:
-                raise VlanAlreadyExist(number)
+                return VlanAlreadyExist(number)
             elif "not within range" in e.message:
                 if e.message.startswith("Value"):
-                    raise BadVlanNumber()
+                    return BadVlanNumber()
                 elif e.message.startswith("Length"):
-                    raise BadVlanName()
+                    return BadVlanName()
 
-            raise
+            return e
+
+        self._push(update, on_error)
 
     def remove_vlan(self, number):
         config = self.query(all_vlans, all_interfaces)
 
         vlan_node = self.get_vlan_config(number, config)
-        vlan_name = first(vlan_node.xpath("name")).text
+        vlan_name = vlan_index(config).names_by_id[number]
 
         update = Update()
         update.add_vlan(vlan_removal(vlan_name))
@@ -199,7 +299,7 @@ class Juniper(SwitchBase):
     def set_access_mode(self, interface_id):
         update_attributes = []
 
-        config = self.query(all_interfaces, all_vlans)
+        config = self.query_interface(interface_id)
 
         interface_node = self.get_interface_config(interface_id, config)
 
@@ -222,7 +322,7 @@ class Juniper(SwitchBase):
     def set_trunk_mode(self, interface_id):
         update_attributes = []
 
-        config = self.query(one_interface(interface_id), all_vlans)
+        config = self.query_interface(interface_id)
         interface_node = self.get_interface_config(interface_id, config)
         interface = self.node_to_interface(interface_node, config)
 
@@ -242,7 +342,7 @@ class Juniper(SwitchBase):
         update_attributes = []
         update_vlan_members = []
 
-        config = self.query(all_interfaces, all_vlans)
+        config = self.query_interface(interface_id, vlan)
 
         self.get_vlan_config(vlan, config)
 
@@ -264,15 +364,10 @@ class Juniper(SwitchBase):
             update = Update()
             update.add_interface(interface_update(interface_id, "0", update_attributes, update_vlan_members))
 
-            try:
-                self._push_interface_update(interface_id, update)
-            except RPCError as e:
-                if "No vlan matches vlan tag" in e.message:
-                    raise UnknownVlan(vlan)
-                raise
+            self._push_interface_update(interface_id, update, on_error=unknown_vlan_errors(vlan))
 
     def unset_interface_access_vlan(self, interface_id):
-        config = self.query(one_interface(interface_id), all_vlans)
+        config = self.query_interface(interface_id)
         interface_node = self.get_interface_config(interface_id, config)
         interface = self.node_to_interface(interface_node, config)
 
@@ -291,7 +386,7 @@ class Juniper(SwitchBase):
         port_mode_node = None
         native_vlan_id_node = None
 
-        config = self.query(all_interfaces, all_vlans)
+        config = self.query_interface(interface_id, vlan)
 
         self.get_vlan_config(vlan, config)
 
@@ -317,12 +412,7 @@ class Juniper(SwitchBase):
             update = Update()
             update.add_interface(interface)
 
-            try:
-                self._push_interface_update(interface_id, update)
-            except RPCError as e:
-                if "No vlan matches vlan tag" in e.message:
-                    raise UnknownVlan(vlan)
-                raise
+            self._push_interface_update(interface_id, update, on_error=unknown_vlan_errors(vlan))
 
     def set_interface_auto_negotiation_state(self, interface_id, negotiation_state):
         content = to_ele("""
@@ -344,7 +434,7 @@ class Juniper(SwitchBase):
         interface_node = self.get_interface_config(interface_id, config)
 
         if interface_node is None:
-            self._get_physical_interface(interface_id)
+            self._check_physical_interface(interface_id)
             return
 
         auto_negotiation_present = first(interface_node.xpath('ether-options/auto-negotiation')) is not None
@@ -378,9 +468,10 @@ class Juniper(SwitchBase):
         update.add_interface(content)
 
         self._push_interface_update(interface_id, update)
+        self.physical_interfaces_changed = True
 
     def unset_interface_native_vlan(self, interface_id):
-        config = self.query(one_interface(interface_id), all_vlans)
+        config = self.query_interface(interface_id)
         interface_node = self.get_interface_config(interface_id, config)
         interface = self.node_to_interface(interface_node, config)
 
@@ -393,7 +484,7 @@ class Juniper(SwitchBase):
         self._push(update)
 
     def add_trunk_vlan(self, interface_id, vlan):
-        config = self.query(all_interfaces, all_vlans)
+        config = self.query_interface(interface_id, vlan)
 
         self.get_vlan_config(vlan, config)
 
@@ -417,7 +508,7 @@ class Juniper(SwitchBase):
             self._push_interface_update(interface_id, update)
 
     def remove_trunk_vlan(self, interface_id, vlan):
-        config = self.query(all_interfaces, all_vlans)
+        config = self.query_interface(interface_id, vlan)
         interface_node = self.get_interface_config(interface_id, config)
         if interface_node is None:
             raise UnknownInterface(interface_id)
@@ -445,11 +536,11 @@ class Juniper(SwitchBase):
             to_ele("<description>{}</description>".format(description))
         ]))
 
-        try:
-            self._push(update)
-        except RPCError as e:
+        def on_error(e):
             self.logger.info("actual setting error was {}".format(e))
-            raise UnknownInterface(interface_id)
+            return UnknownInterface(interface_id)
+
+        self._push(update, on_error)
 
     def unset_interface_description(self, interface_id):
         update = Update()
@@ -457,11 +548,7 @@ class Juniper(SwitchBase):
             to_ele("<description operation=\"delete\" />")
         ]))
 
-        try:
-            self._push(update)
-        except RPCError as e:
-            if e.severity != "warning":
-                raise UnknownInterface(interface_id)
+        self._push(update, on_error=unknown_interface_errors(interface_id))
 
     def set_interface_mtu(self, interface_id, size):
         update = Update()
@@ -469,14 +556,14 @@ class Juniper(SwitchBase):
             to_ele("<mtu>{}</mtu>".format(size))
         ]))
 
-        try:
-            self._push(update)
-        except RPCError as e:
+        def on_error(e):
             self.logger.info("actual setting error was {}".format(e))
             if "Value {} is not within range".format(size) in str(e):
-                raise InvalidMtuSize(str(e))
+                return InvalidMtuSize(str(e))
 
-            raise UnknownInterface(interface_id)
+            return UnknownInterface(interface_id)
+
+        self._push(update, on_error)
 
     def unset_interface_mtu(self, interface_id):
         update = Update()
@@ -484,11 +571,7 @@ class Juniper(SwitchBase):
             to_ele("<mtu operation=\"delete\" />")
         ]))
 
-        try:
-            self._push(update)
-        except RPCError as e:
-            if e.severity != "warning":
-                raise UnknownInterface(interface_id)
+        self._push(update, on_error=unknown_interface_errors(interface_id))
 
     def edit_interface_spanning_tree(self, interface_id, edge=None):
         config = self.query(one_interface(interface_id), one_protocol_interface("rstp", interface_id))
@@ -511,14 +594,15 @@ class Juniper(SwitchBase):
         update = Update()
         update.add_interface(interface_state_update(interface_id, state))
 
-        try:
-            self._push(update)
-        except RPCError as e:
+        def on_error(e):
             self.logger.info("actual setting error was {}".format(e))
             # When sending a "delete operation" on a nonexistent element <disable />, this is the error that is thrown.
             # It's ignored because the result of this operation would be the same as if the command was successful.
             if e.message != "statement not found: ":
-                raise UnknownInterface(interface_id)
+                return UnknownInterface(interface_id)
+
+        self._push(update, on_error)
+        self.physical_interfaces_changed = True
 
     def unset_interface_state(self, interface_id):
         self.set_interface_state(interface_id, state=ON)
@@ -552,13 +636,14 @@ class Juniper(SwitchBase):
         update = Update()
         update.add_interface(bond_update(number, bond_lacp_options()))
 
-        try:
-            self._push(update)
-        except RPCError as e:
+        def on_error(e):
             if "device value outside range" in e.message:
-                raise BadBondNumber()
+                return BadBondNumber()
+
+            return e
 
-            raise
+        self._push(update, on_error)
+        self.physical_interfaces_changed = True
 
     def remove_bond(self, number):
         config = self.query(all_interfaces, one_protocol_interface("rstp", bond_name(number)))
@@ -576,6 +661,7 @@ class Juniper(SwitchBase):
             update.add_interface(free_from_bond_operation(interface_name))
 
         self._push(update)
+        self.physical_interfaces_changed = True
 
     def add_interface_to_bond(self, interface, bond_id):
         config = self.query(all_interfaces, all_vlans, rstp_protocol_interfaces)
@@ -588,16 +674,19 @@ class Juniper(SwitchBase):
             update.add_protocol_interface("rstp", rstp_interface_removal(name_node.text))
 
         self._push_interface_update(interface, update)
+        self.physical_interfaces_changed = True
 
     def remove_interface_from_bond(self, interface):
-        try:
-            update = Update()
-            update.add_interface(free_from_bond_operation(interface))
-            self._push(update)
-        except RPCError:
-            self._get_physical_interface(interface)
+        update = Update()
+        update.add_interface(free_from_bond_operation(interface))
 
-            raise InterfaceNotInBond()
+        def on_error(_):
+            self._check_physical_interface(interface)
+
+            return InterfaceNotInBond()
+
+        self._push(update, on_error)
+        self.physical_interfaces_changed = True
 
     def set_bond_link_speed(self, number, speed):
         config = self.query(all_interfaces)
@@ -662,36 +751,152 @@ class Juniper(SwitchBase):
     def edit_bond_spanning_tree(self, number, edge=None):
         return self.edit_interface_spanning_tree(bond_name(number), edge=edge)
 
-    def _push_interface_update(self, interface_id, configuration):
-        try:
-            self._push(configuration)
-        except RPCError as e:
+    def _push_interface_update(self, interface_id, configuration, on_error=None):
+        def on_interface_error(e):
             if "port value outside range" in e.message \
                     or "invalid interface type" in e.message \
                     or "device value outside range" in e.message:
-                raise UnknownInterface(interface_id)
-            raise
+                return UnknownInterface(interface_id)
+            return on_error(e) if on_error is not None else e
+
+        self._push(configuration, on_interface_error)
+
+    def _push(self, configuration, on_error=None):
+        """
+        Edits the candidate with an Update
+
+        on_error receives the RPCError if the switch refuses the edit and returns the exception to raise
+        instead, or None to ignore the error.  With deferred edits, the updates of a transaction are only
+        sent before querying the switch or committing, all merged in a single edit-config.  An error is
+        then raised by that next query or commit rather than by the operation that pushed the update, and
+        the refused update stays pending, failing every later query or commit, until a rollback.
+        """
+        if self.deferred_edits and self.in_transaction:
+            self.pending_edits.append((configuration, on_error))
+        elif not self._edit_candidate(configuration, on_error):
+            return
+
+        if self.candidate is not None:
+            self.candidate.apply(configuration.root)
+
+    def _send_pending_edits(self):
+        if len(self.pending_edits) == 0:
+            return
+
+        update = Update()
+        for configuration, _ in self.pending_edits:
+            merge_configuration(update.root, configuration.root)
 
-    def _push(self, configuration):
+        try:
+            self._edit_candidate(update)
+        except RPCError:
+            self.logger.info("Sending the {} pending edits one by one".format(len(self.pending_edits)))
+            self.netconf.discard_changes()
+            self.pending_edits = self.sent_edits + self.pending_edits
+            self.sent_edits = []
+
+            sent_edits = []
+            for configuration, on_error in self.pending_edits:
+                if self._edit_candidate(configuration, on_error):
+                    sent_edits.append((configuration, on_error))
+            self.sent_edits = sent_edits
+        else:
+            self.sent_edits.extend(self.pending_edits)
+        self.pending_edits = []
+
+    def _edit_candidate(self, configuration, on_error=None):
         config = new_ele('config')
-        config.append(configuration.root)
+        config.append(deepcopy(configuration.root))
 
-        self.logger.info("Sending edit : {}".format(to_xml(config)))
+        if self.logger.isEnabledFor(logging.DEBUG):
+            self.logger.debug("Sending edit : %s", to_xml(config))
         try:
             self.netconf.edit_config(target="candidate", config=config)
         except RPCError as e:
             self.logger.info("An RPCError was raised : {}".format(e))
-            raise
+            if self.candidate is not None:
+                self.candidate = CandidateSnapshot()
+
+            error = on_error(e) if on_error is not None else e
+            if error is e:
+                raise
+            elif error is not None:
+                raise error
+            return False
+
+        return True
 
     def query(self, *args):
-        filter_node = new_ele("filter")
-        conf = sub_ele(filter_node, "configuration")
-        for arg in args:
-            conf.append(arg())
-        return self.netconf.get_config(source="candidate" if self.in_transaction else "running", filter=filter_node)
+        filter_node = configuration_filter(*args)
+        config = self.candidate.answer(filter_node) if self.candidate is not None else None
+        if config is None:
+            self._send_pending_edits()
+            config = self._running_config(to_xml(filter_node), lambda: self.netconf.get_config(
+                source=self._query_source(), filter=filter_node))
+            if self.candidate is not None:
+                self.candidate.absorb(filter_node, config)
+        return config
+
+    def query_interface(self, interface_id, *vlan_numbers):
+        config = self.query(one_interface(interface_id), *[one_vlan_by_vlan_id(number) for number in vlan_numbers])
+
+        interface_node = self.get_interface_config(interface_id, config)
+        if interface_node is not None:
+            index = vlan_index(config)
+            names = unresolved_vlan_names(interface_node, index)
+            if names:
+                index.add(self.query(some_vlans_by_name(names)).xpath("data/configuration/vlans/vlan"))
+
+        return config
+
+    def query_records(self, *args):
+        self._send_pending_edits()
+        filter_node = configuration_filter(*args)
+        return self._running_config("records:" + to_xml(filter_node), lambda: self.netconf.execute(
+            GetConfigurationRecords, source=self._query_source(), filter=filter_node).configuration)
+
+    def _query_source(self):
+        return "candidate" if self.in_transaction else "running"
+
+    def _running_config(self, key, fetch):
+        commit = self._latest_commit() if self.running_config_cache is not None and not self.in_transaction else None
+        if commit is None:
+            return fetch()
+
+        config = self.running_config_cache.get(self.switch_descriptor, commit, key)
+        if config is None:
+            config = fetch()
+            self.running_config_cache.put(self.switch_descriptor, commit, key, config)
+        return SharedReply(config)
+
+    def _latest_commit(self):
+        """
+        The identity of the latest commit, asked once per connection
+
+        It is None when the running configuration should not be cached until the next connection or
+        commit: the latest commit is unavailable or too recent to tell apart from one that could follow.
+        """
+        if self.latest_commit is _not_checked:
+            self.latest_commit = None
+            try:
+                reply = self.netconf.rpc(to_ele("<get-commit-information/>"))
+            except RPCError as e:
+                self.logger.info("The running configuration will not be cached, "
+                                 "the latest commit is unavailable : {}".format(e))
+                return None
+
+            last_commit = first(reply.xpath("commit-information/commit-history"))
+            if last_commit is not None and self._is_settled(last_commit):
+                self.latest_commit = tuple((child.text or "").strip() for child in last_commit)
+
+        return self.latest_commit
+
+    def _is_settled(self, commit_node):
+        committed_at = commit_time(first(commit_node.xpath("date-time")))
+        return committed_at is not None and time.time() - committed_at >= self.running_config_cache.settle_time
 
     def get_interface(self, interface_id):
-        config = self.query(one_interface(interface_id), all_vlans)
+        config = self.query_interface(interface_id)
         interface_node = self.get_interface_config(interface_id, config)
         if interface_node is not None:
             return self.node_to_interface(interface_node, config)
@@ -700,18 +905,16 @@ class Juniper(SwitchBase):
 
     def get_interface_config(self, interface_id, config=None):
         config = config or self.query(one_interface(interface_id))
-        interface_node = first(config.xpath(
-            "data/configuration/interfaces/interface/name[text()=\"{0:s}\"]/..".format(interface_id)))
-        return interface_node
+        return interface_index(config).nodes_by_name.get(interface_id)
 
     def get_vlan_config(self, number, config):
-        vlan_node = first(config.xpath("data/configuration/vlans/vlan/vlan-id[text()=\"{}\"]/..".format(number)))
+        vlan_node = vlan_index(config).nodes_by_id.get(number)
         if vlan_node is None:
             raise UnknownVlan(number)
         return vlan_node
 
     def get_bond_config(self, number, config):
-        interface_node = first(config.xpath("data/configuration/interfaces/interface/name[text()=\"{}\"]/..".format(bond_name(number))))
+        interface_node = interface_index(config).nodes_by_name.get(bond_name(number))
         if interface_node is None:
             raise UnknownBond(number)
         return interface_node
@@ -719,10 +922,7 @@ class Juniper(SwitchBase):
     def get_bond_slaves_config(self, bond_id, config=None):
         config = config or self.query(all_interfaces)
 
-        return config.xpath(
-            'data/configuration/interfaces/interface/ether-options/'
-            'ieee-802.3ad/bundle[text()=\"{0}\"]/../../..'.format(
-                bond_name(bond_id)))
+        return interface_index(config).members_by_bundle.get(bond_name(bond_id), [])
 
     def get_port_mode(self, interface_node):
         if interface_node is None:
@@ -761,6 +961,37 @@ class Juniper(SwitchBase):
         self.fill_interface_from_node(interface, interface_node, config)
         return interface
 
+    def record_to_interface(self, interface_record, records):
+        ids_by_name = records.vlan_ids_by_name
+
+        vlans = VlanSet()
+        for unit in interface_record.units.values():
+            for members in unit.members:
+                vlan_id = ids_by_name.get(members)
+                if vlan_id:
+                    vlans.add(vlan_id)
+                else:
+                    vlans |= parse_range(members)
+
+        interface = Interface(name=interface_record.name)
+        interface.bond_master = bond_number(interface_record.bundle) if interface_record.bundle is not None else None
+        if interface.bond_master is not None:
+            interface.port_mode = BOND_MEMBER
+        else:
+            port_mode = self.custom_strategies.get_port_mode_in_interface_record(interface_record)
+            interface.port_mode = {"trunk": TRUNK}.get(port_mode, ACCESS)
+
+        if interface.port_mode is ACCESS:
+            interface.access_vlan = first(vlans)
+        else:
+            interface.trunk_vlans = vlans
+        interface.trunk_native_vlan = self.custom_strategies.get_trunk_native_vlan_id_in_interface_record(
+            interface_record)
+        interface.shutdown = interface_record.disabled
+        interface.mtu = interface_record.mtu
+        interface.auto_negotiation = interface_record.auto_negotiation
+        return interface
+
     def node_to_bond(self, bond_node, config, member_nodes=None):
         member_nodes = member_nodes or []
         bond = Bond(
@@ -774,16 +1005,14 @@ class Juniper(SwitchBase):
     def get_vlan_interfaces(self, vlan_number):
         config = self.query(one_vlan_by_vlan_id(vlan_number), all_interfaces)
 
-        if not config.xpath("data/configuration/vlans/vlan"):
-            raise UnknownVlan(vlan_number)
-
-        vlan_node = config.xpath("data/configuration/vlans/vlan")[0]
+        vlan_node = self.get_vlan_config(vlan_number, config)
         interface_nodes = config.xpath("data/configuration/interfaces/interface")
-        return self.get_vlan_interfaces_from_node(vlan_node, interface_nodes)
+        return self.get_vlan_interfaces_from_node(vlan_node, interface_nodes, vlan_index(config))
 
-    def get_vlan_interfaces_from_node(self, vlan_node, interface_nodes):
-        vlan_name = first(vlan_node.xpath("name")).text
-        vlan_number = int(first(vlan_node.xpath("vlan-id")).text)
+    def get_vlan_interfaces_from_node(self, vlan_node, interface_nodes, index=None):
+        index = index or VlanIndex([vlan_node])
+        vlan_number = value_of(vlan_node.xpath("vlan-id"), transformer=int)
+        vlan_name = index.names_by_id[vlan_number]
         interfaces = []
         for interface in interface_nodes:
             native_vlan_id_node = self.custom_strategies.get_interface_trunk_native_vlan_id_node(interface)
@@ -795,22 +1024,119 @@ class Juniper(SwitchBase):
                 interfaces.append(first(interface.xpath("name")).text)
         return interfaces
 
-    def _get_physical_interface(self, interface_id):
-        try:
-            return next(i for i in self._list_physical_interfaces() if i.name == interface_id)
-        except StopIteration:
+    def _check_physical_interface(self, interface_id):
+        exists = None
+        if self.physical_interface_inventory is not None:
+            exists = self.physical_interface_inventory.exists(self.switch_descriptor, interface_id)
+        if exists is None:
+            exists = any(i.name == interface_id for i in self._list_physical_interfaces())
+
+        if not exists:
             raise UnknownInterface(interface_id)
 
+    def _get_physical_interface(self, interface_id):
+        if self.physical_interface_inventory is None:
+            try:
+                return next(i for i in self._list_physical_interfaces() if i.name == interface_id)
+            except StopIteration:
+                raise UnknownInterface(interface_id)
+
+        self._check_physical_interface(interface_id)
+        shutdown = self.physical_interface_inventory.shutdown(self.switch_descriptor, interface_id)
+        if shutdown is None:
+            shutdown = self._fetch_physical_interface(interface_id).shutdown
+        return _PhysicalInterface(interface_id, shutdown=shutdown)
+
     def _list_physical_interfaces(self):
+        if self.physical_interface_inventory is not None:
+            interfaces = self.physical_interface_inventory.interfaces(self.switch_descriptor)
+            if interfaces is not None:
+                return [_PhysicalInterface(name, shutdown=shutdown) for name, shutdown in interfaces]
+
         terse = self.netconf.rpc(to_ele("""
             <get-interface-information>
               <terse/>
             </get-interface-information>
         """))
+        physical_interfaces = parse_physical_interfaces(terse)
+
+        if self.physical_interface_inventory is not None:
+            self.physical_interface_inventory.store(self.switch_descriptor,
+                                                    [(i.name, i.shutdown) for i in physical_interfaces])
+        return physical_interfaces
+
+    def _fetch_physical_interface(self, interface_id):
+        try:
+            terse = self.netconf.rpc(to_ele("""
+                <get-interface-information>
+                  <terse/>
+                  <interface-name>{}</interface-name>
+                </get-interface-information>
+            """.format(interface_id)))
+        except RPCError as e:
+            self.logger.info("Could not get the status of {} alone : {}".format(interface_id, e))
+            self.physical_interface_inventory.invalidate(self.switch_descriptor)
+            physical_interface = next((i for i in self._list_physical_interfaces() if i.name == interface_id), None)
+        else:
+            physical_interface = first(parse_physical_interfaces(terse))
+            if physical_interface is not None:
+                self.physical_interface_inventory.store_status(self.switch_descriptor, interface_id,
+                                                               physical_interface.shutdown)
+
+        if physical_interface is None:
+            raise UnknownInterface(interface_id)
+        return physical_interface
+
+
+def parse_physical_interfaces(terse):
+    return [_PhysicalInterface(i.xpath("name")[0].text.strip(),
+                               shutdown=i.xpath("admin-status")[0].text.strip() == "down")
+            for i in terse.xpath("interface-information/physical-interface")]
+
+
+def configuration_filter(*args):
+    filter_node = new_ele("filter")
+    conf = sub_ele(filter_node, "configuration")
+    sections = {}
+    for arg in args:
+        section = arg()
+        name = section.tag.rsplit("}", 1)[-1]
+        existing = sections.get(name)
+        if existing is None:
+            sections[name] = section
+            conf.append(section)
+        elif len(existing) > 0 and len(section) > 0:
+            existing.extend(list(section))
+        else:
+            del existing[:]
+    return filter_node
+
 
-        return [_PhysicalInterface(i.xpath("name")[0].text.strip(),
-                                   shutdown=i.xpath("admin-status")[0].text.strip() == "down")
-                for i in terse.xpath("interface-information/physical-interface")]
+def merge_configuration(target, configuration):
+    for node in configuration:
+        container = None
+        if node.get("operation") is None and first(node.xpath("name")) is None:
+            container = first([c for c in target if c.tag == node.tag and c.get("operation") is None])
+
+        if container is None:
+            target.append(deepcopy(node))
+        else:
+            merge_configuration(container, node)
+
+
+def unknown_vlan_errors(vlan):
+    def on_error(e):
+        if "No vlan matches vlan tag" in e.message:
+            return UnknownVlan(vlan)
+        return e
+    return on_error
+
+
+def unknown_interface_errors(interface_id):
+    def on_error(e):
+        if e.severity != "warning":
+            return UnknownInterface(interface_id)
+    return on_error
 
 
 def all_vlans():
@@ -847,6 +1173,16 @@ def one_vlan(vlan_name):
     return m
 
 
+def some_vlans_by_name(vlan_names):
+    def m():
+        vlans = new_ele("vlans")
+        for vlan_name in vlan_names:
+            sub_ele(sub_ele(vlans, "vlan"), "name").text = vlan_name
+        return vlans
+
+    return m
+
+
 def one_vlan_by_vlan_id(vlan_id):
     def m():
         return to_ele("""
@@ -1071,9 +1407,9 @@ def first_text(node):
 
 
 def parse_range(r):
-    if regex.match("(\d+)-(\d+)", r):
+    if regex.match(_vlan_range, r):
         return range(int(regex[0]), int(regex[1]) + 1)
-    elif regex.match("(\d+)", r):
+    elif regex.match(_vlan_number, r):
         return [int(regex[0])]
     return []
 
@@ -1191,14 +1527,114 @@ def protocol_interface_update(name):
     """.format(name))
 
 def list_vlan_members(interface_node, config):
-    vlans = set()
+    ids_by_name = vlan_index(config).ids_by_name
+    vlans = VlanSet()
     for members in interface_node.xpath("unit/family/ethernet-switching/vlan/members"):
-        vlan_id = value_of(config.xpath('data/configuration/vlans/vlan/name[text()="{}"]/../vlan-id'.format(members.text)), transformer=int)
+        vlan_id = ids_by_name.get(members.text)
         if vlan_id:
-            vlans = vlans.union([vlan_id])
+            vlans.add(vlan_id)
         else:
-            vlans = vlans.union(parse_range(members.text))
-    return sorted(vlans)
+            vlans |= parse_range(members.text)
+    return vlans
+
+
+class VlanIndex(object):
+    """
+    Lookups over the vlans of a configuration, built with a single pass over its vlan nodes
+
+    index = VlanIndex(config.xpath("data/configuration/vlans/vlan"))
+    index.ids_by_name["VLAN1000"] -> 1000
+    index.nodes_by_id[1000] -> <vlan> node
+    """
+    def __init__(self, vlan_nodes):
+        self.ids_by_name = {}
+        self.names_by_id = {}
+        self.nodes_by_id = {}
+        self.add(vlan_nodes)
+
+    def add(self, vlan_nodes):
+        for vlan_node in vlan_nodes:
+            name = value_of(vlan_node.xpath("name"))
+            number = value_of(vlan_node.xpath("vlan-id"), transformer=int)
+            if number is not None:
+                self.ids_by_name[name] = number
+                self.names_by_id[number] = name
+                self.nodes_by_id[number] = vlan_node
+
+
+def commit_time(date_time_node):
+    if date_time_node is None:
+        return None
+
+    for name, value in date_time_node.attrib.items():
+        if name.endswith("}seconds") or name == "seconds":
+            return int(value)
+
+    try:
+        return calendar.timegm(time.strptime((date_time_node.text or "").strip(), "%Y-%m-%d %H:%M:%S UTC"))
+    except ValueError:
+        return None
+
+
+def vlan_index(config):
+    index = getattr(config, "_vlan_index", None)
+    if index is None:
+        index = VlanIndex(config.xpath("data/configuration/vlans/vlan"))
+        config._vlan_index = index
+    return index
+
+
+def unresolved_vlan_names(interface_node, index):
+    return [members.text for members in interface_node.xpath("unit/family/ethernet-switching/vlan/members")
+            if members.text not in index.ids_by_name and not parse_range(members.text)]
+
+
+class InterfaceIndex(object):
+    """
+    Lookups over the interfaces of a configuration, built with a single pass over its interface nodes
+
+    index = InterfaceIndex(config.xpath("data/configuration/interfaces/interface"))
+    index.nodes_by_name["ge-0/0/1"] -> <interface> node
+    index.units[("irb", "1000")] -> <unit> node
+    index.members_by_bundle["ae1"] -> [<interface> nodes bundled in ae1]
+    """
+    def __init__(self, interface_nodes):
+        self.nodes_by_name = {}
+        self.units = {}
+        self.members_by_bundle = {}
+
+        for interface_node in interface_nodes:
+            name = value_of(interface_node.xpath("name"))
+            self.nodes_by_name.setdefault(name, interface_node)
+
+            for unit_node in interface_node.xpath("unit"):
+                self.units.setdefault((name, value_of(unit_node.xpath("name"))), unit_node)
+
+            bundle = value_of(interface_node.xpath("ether-options/ieee-802.3ad/bundle"))
+            if bundle is not None:
+                self.members_by_bundle.setdefault(bundle, []).append(interface_node)
+
+
+def interface_index(config):
+    index = getattr(config, "_interface_index", None)
+    if index is None:
+        index = InterfaceIndex(config.xpath("data/configuration/interfaces/interface"))
+        config._interface_index = index
+    return index
+
+
+def record_to_vlan(vlan_record, records):
+    vlan = Vlan(number=vlan_record.number, name=vlan_record.description)
+
+    if vlan_record.l3_interface is not None:
+        l3_if_type, l3_if_name = vlan_record.l3_interface.split(".")
+        interface_record = records.interfaces.get(l3_if_type)
+        unit_record = interface_record.units.get(l3_if_name) if interface_record is not None else None
+        if unit_record is not None:
+            vlan.ips = sorted([IPNetwork(ip) for ip in unit_record.ips], key=lambda ip: (ip.value, ip.prefixlen))
+            vlan.access_groups[IN] = unit_record.input_filter
+            vlan.access_groups[OUT] = unit_record.output_filter
+    return vlan
 
 
 def get_bond_master(interface_node):
@@ -1242,13 +1678,13 @@ def _compute_edge_state_modifications(interface_id, edge, config):
 
 def _is_vlan_in_interface_members(vlan_number, vlan_name, members):
     for member_name in members:
-        if regex.match("(\d+)-(\d+)", member_name):
+        if regex.match(_vlan_range, member_name):
             start, end = regex
             if int(start) <= vlan_number <= int(end):
                 return True
         elif member_name == vlan_name:
             return True
-        elif int(member_name) == vlan_number:
+        elif regex.match(_vlan_number, member_name) and int(regex[0]) == vlan_number:
             return True
 
     return False
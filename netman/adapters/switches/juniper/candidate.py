@@ -0,0 +1,222 @@
+# Copyright 2016 Internap.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from copy import deepcopy
+
+from lxml import etree
+
+LEAF_LISTS = ("members",)
+
+
+class CandidateSnapshot(object):
+    """
+    What is known of the candidate configuration during a transaction
+
+    Interfaces and vlans fetched from the switch are kept, every edit pushed to the candidate is
+    applied to them, and a later get-config asking only for known entries is answered locally.
+
+    reply = snapshot.answer(filter_node)
+    if reply is None:
+        reply = netconf.get_config(source="candidate", filter=filter_node)
+        snapshot.absorb(filter_node, reply)
+    ...
+    snapshot.apply(update.root)
+    """
+    def __init__(self):
+        self.interfaces = _Section("interface", keys=("name",))
+        self.vlans = _Section("vlan", keys=("name", "vlan-id"))
+
+    def answer(self, filter_node):
+        selections = _selections(filter_node, self._sections())
+        if selections is None or not all(section.knows(keys) for section, keys in selections):
+            return None
+
+        reply = etree.Element("rpc-reply")
+        configuration = etree.SubElement(etree.SubElement(reply, "data"), "configuration")
+        for section, keys in selections:
+            container = etree.SubElement(configuration, section.container)
+            for entry in section.entries(keys):
+                container.append(deepcopy(entry))
+
+        return SnapshotReply(reply)
+
+    def absorb(self, filter_node, reply):
+        for section, keys in _selections(filter_node, self._sections()) or []:
+            section.absorb(keys, reply.xpath("data/configuration/{}/{}".format(section.container, section.tag)))
+
+    def apply(self, configuration):
+        for change in configuration:
+            section = self._sections().get(_local_name(change))
+            if section is not None:
+                for entry_change in change:
+                    section.apply(entry_change)
+
+    def _sections(self):
+        return {"interfaces": self.interfaces, "vlans": self.vlans}
+
+
+class SnapshotReply(object):
+    def __init__(self, root):
+        self.root = root
+
+    def xpath(self, expression):
+        return self.root.xpath(expression)
+
+
+class _Section(object):
+    def __init__(self, tag, keys):
+        self.tag = tag
+        self.container = tag + "s"
+        self.keys = keys
+        self.complete = False
+        self.known = set()
+        self.nodes = []
+
+    def knows(self, keys):
+        return self.complete or (keys is not None and keys <= self.known)
+
+    def entries(self, keys):
+        if keys is None:
+            return list(self.nodes)
+        return [node for node in self.nodes if self._keys_of(node) & keys]
+
+    def absorb(self, keys, nodes):
+        if keys is None:
+            self.nodes = []
+            self.complete = True
+        else:
+            self.nodes = [node for node in self.nodes if not self._keys_of(node) & keys]
+            self.known |= keys
+        self.nodes.extend(_copy(node) for node in nodes)
+
+    def apply(self, entry_change):
+        name = _child_text(entry_change, "name")
+        current = next((node for node in self.nodes if _child_text(node, "name") == name), None)
+        operation = entry_change.get("operation")
+
+        if current is not None and operation in ("delete", "replace"):
+            self.nodes.remove(current)
+            current = None
+
+        if operation == "delete":
+            return
+        if current is None:
+            current = _copy(entry_change)
+            self.nodes.append(current)
+            if _has_deletions(entry_change):
+                self._forget(current)
+        elif not _merge_children(current, entry_change):
+            self._forget(current)
+
+    def _forget(self, node):
+        self.nodes.remove(node)
+        if self.complete:
+            self.complete = False
+            self.known = set(key for remaining in self.nodes for key in self._keys_of(remaining))
+        else:
+            self.known -= self._keys_of(node)
+
+    def _keys_of(self, node):
+        return set((key, _child_text(node, key)) for key in self.keys)
+
+
+def _selections(filter_node, sections):
+    selections = []
+    for configuration in filter_node:
+        for container in configuration:
+            section = sections.get(_local_name(container))
+            if section is None:
+                return None
+            if len(container) == 0:
+                selections.append((section, None))
+                continue
+
+            keys = set()
+            for entry in container:
+                key = next(((_local_name(child), child.text.strip()) for child in entry
+                            if _local_name(child) in section.keys and child.text), None)
+                if key is None or len(entry) != 1:
+                    return None
+                keys.add(key)
+            selections.append((section, keys))
+    return selections
+
+
+def _merge_children(target, change):
+    """
+    Returns False when a deletion targets something that is not there, the switch may then
+    have removed something else and the entry can no longer be trusted
+    """
+    consistent = True
+    for child in change:
+        tag = _local_name(child)
+        if tag == "name":
+            continue
+
+        match = _find_match(target, child, tag)
+        operation = child.get("operation")
+        if operation == "delete" and match is None:
+            consistent = False
+        if match is not None and operation in ("delete", "replace"):
+            target.remove(match)
+            match = None
+
+        if operation == "delete":
+            continue
+        if match is None:
+            target.append(_copy(child))
+            if _has_deletions(child):
+                consistent = False
+        elif len(child) == 0:
+            match.text = child.text
+        elif not _merge_children(match, child):
+            consistent = False
+    return consistent
+
+
+def _find_match(target, child, tag):
+    name = _child_text(child, "name")
+    for candidate in target:
+        if _local_name(candidate) != tag:
+            continue
+        if tag in LEAF_LISTS and (candidate.text or "").strip() != (child.text or "").strip():
+            continue
+        if name is not None and _child_text(candidate, "name") != name:
+            continue
+        return candidate
+    return None
+
+
+def _has_deletions(node):
+    return any(child.get("operation") == "delete" for child in node.iterdescendants())
+
+
+def _copy(node):
+    copy = etree.Element(_local_name(node))
+    copy.text = node.text.strip() if node.text and len(node) == 0 else None
+    for child in node:
+        if isinstance(child.tag, basestring) and child.get("operation") != "delete":
+            copy.append(_copy(child))
+    return copy
+
+
+def _child_text(node, tag):
+    for child in node:
+        if _local_name(child) == tag:
+            return child.text.strip() if child.text else child.text
+    return None
+
+
+def _local_name(node):
+    return node.tag.rsplit("}", 1)[-1] if isinstance(node.tag, basestring) else None
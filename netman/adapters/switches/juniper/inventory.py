@@ -0,0 +1,97 @@
+# Copyright 2016 Internap.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import threading
+import time
+
+
+class PhysicalInterfaceInventory(object):
+    """
+    The physical interfaces of each switch with their admin status, kept between requests
+
+    inventory = PhysicalInterfaceInventory(names_ttl=3600, status_ttl=60)
+
+    inventory.store(switch_descriptor, [("ge-0/0/1", False), ("ge-0/0/2", True)])
+    inventory.exists(switch_descriptor, "ge-0/0/1")     # True, False or None when unknown
+    inventory.shutdown(switch_descriptor, "ge-0/0/2")   # True, False or None when unknown
+
+    The list of interfaces is trusted for names_ttl seconds and each admin status for status_ttl seconds,
+    a status can be refreshed alone with store_status.
+    """
+    def __init__(self, names_ttl=3600, status_ttl=60):
+        self.names_ttl = names_ttl
+        self.status_ttl = status_ttl
+
+        self._lock = threading.Lock()
+        self._switches = {}
+
+    def interfaces(self, switch_descriptor):
+        with self._lock:
+            inventory = self._inventory(switch_descriptor)
+            if inventory is None:
+                return None
+
+            limit = time.time() - self.status_ttl
+            if any(inventory.statuses[name][1] < limit for name in inventory.names):
+                return None
+            return [(name, inventory.statuses[name][0]) for name in inventory.names]
+
+    def exists(self, switch_descriptor, name):
+        with self._lock:
+            inventory = self._inventory(switch_descriptor)
+            return None if inventory is None else name in inventory.statuses
+
+    def shutdown(self, switch_descriptor, name):
+        with self._lock:
+            inventory = self._inventory(switch_descriptor)
+            if inventory is None or name not in inventory.statuses:
+                return None
+
+            shutdown, fetched_at = inventory.statuses[name]
+            return shutdown if fetched_at >= time.time() - self.status_ttl else None
+
+    def store(self, switch_descriptor, interfaces):
+        now = time.time()
+        with self._lock:
+            self._switches[_key(switch_descriptor)] = _SwitchInventory(
+                names=[name for name, _ in interfaces],
+                statuses=dict((name, (shutdown, now)) for name, shutdown in interfaces),
+                listed_at=now)
+
+    def store_status(self, switch_descriptor, name, shutdown):
+        with self._lock:
+            inventory = self._inventory(switch_descriptor)
+            if inventory is not None and name in inventory.statuses:
+                inventory.statuses[name] = (shutdown, time.time())
+
+    def invalidate(self, switch_descriptor):
+        with self._lock:
+            self._switches.pop(_key(switch_descriptor), None)
+
+    def _inventory(self, switch_descriptor):
+        inventory = self._switches.get(_key(switch_descriptor))
+        if inventory is None or inventory.listed_at < time.time() - self.names_ttl:
+            return None
+        return inventory
+
+
+class _SwitchInventory(object):
+    def __init__(self, names, statuses, listed_at):
+        self.names = names
+        self.statuses = statuses
+        self.listed_at = listed_at
+
+
+def _key(switch_descriptor):
+    return switch_descriptor.model, switch_descriptor.hostname, switch_descriptor.port, switch_descriptor.username
@@ -29,6 +29,10 @@ class JuniperQfxCopperCustomStrategies(JuniperCustomStrategies):
     def get_port_mode_node_in_inteface_node(self, interface_node):
         return interface_node.xpath("unit/family/ethernet-switching/interface-mode")
 
+    def get_port_mode_in_interface_record(self, interface_record):
+        return next((unit.interface_mode for unit in interface_record.units.values()
+                     if unit.interface_mode is not None), None)
+
     def add_enslave_to_bond_operations(self, update, interface, bond):
         ether_options = [
             to_ele("<auto-negotiation/>"),
@@ -46,5 +50,8 @@ class JuniperQfxCopperCustomStrategies(JuniperCustomStrategies):
     def get_interface_trunk_native_vlan_id_node(self, interface):
         return interface.xpath("native-vlan-id")
 
+    def get_trunk_native_vlan_id_in_interface_record(self, interface_record):
+        return interface_record.native_vlan
+
     def set_native_vlan_id_node(self, interface_node, native_vlan_id_node):
         return interface_node.xpath("//interface")[0].append(native_vlan_id_node)
@@ -0,0 +1,107 @@
+# Copyright 2016 Internap.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from collections import deque
+import time
+
+from ncclient.devices.junos import JunosDeviceHandler
+from ncclient.operations import RPCError, TimeoutExpiredError
+from ncclient.xml_ import NCElement, to_ele, to_xml
+
+from netman.adapters.recording import Recording, ReplayMismatch
+
+
+class NetconfRecording(Recording):
+    """
+    The netconf operations of a session with their replies
+
+    Each event is {"operation": name, "duration": seconds} with either the "reply",
+    the "rpc_error" that was raised or "timeout": true.
+    """
+    kind = "netconf"
+
+
+class RecordingNetconf(object):
+    """
+    Wraps a netconf manager and records every operation going through it
+
+    switch.connect()
+    switch.netconf = RecordingNetconf(switch.netconf, recording)
+    """
+    def __init__(self, netconf, recording):
+        self.netconf = netconf
+        self.recording = recording
+
+    def __getattr__(self, name):
+        operation = getattr(self.netconf, name)
+        if not callable(operation):
+            return operation
+
+        def record(*args, **kwargs):
+            event = {"operation": name}
+            started_at = time.time()
+            try:
+                reply = operation(*args, **kwargs)
+                event["reply"] = str(reply) if reply is not None else None
+                return reply
+            except RPCError as e:
+                event["rpc_error"] = to_xml(e.xml)
+                raise
+            except TimeoutExpiredError:
+                event["timeout"] = True
+                raise
+            finally:
+                event["duration"] = round(time.time() - started_at, 6)
+                self.recording.events.append(event)
+
+        return record
+
+
+class ReplayNetconf(object):
+    """
+    Plays back a NetconfRecording in place of a netconf manager
+
+    switch.netconf = ReplayNetconf(recording)
+
+    With delays=True each operation takes as long as it originally did.
+    """
+    def __init__(self, recording, delays=False):
+        self.events = deque(recording.events)
+        self.delays = delays
+        self.transform_reply = JunosDeviceHandler(None).transform_reply()
+
+    def __getattr__(self, name):
+        def replay(*args, **__):
+            if not self.events:
+                raise ReplayMismatch(None, name)
+
+            event = self.events.popleft()
+            if event["operation"] != name:
+                raise ReplayMismatch(event["operation"], name)
+
+            if self.delays:
+                time.sleep(event["duration"])
+
+            if "rpc_error" in event:
+                raise RPCError(to_ele(event["rpc_error"]))
+            if event.get("timeout"):
+                raise TimeoutExpiredError()
+            if event["reply"] is not None:
+                if name == "execute":
+                    reply = args[0].REPLY_CLS(event["reply"])
+                    reply.parse()
+                    return reply
+                return NCElement(event["reply"], self.transform_reply)
+
+        return replay
@@ -0,0 +1,297 @@
+# Copyright 2016 Internap.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from collections import OrderedDict
+
+from lxml import etree
+from ncclient.operations.retrieve import GetConfig
+from ncclient.operations.rpc import RPCReply
+
+
+class VlanRecord(object):
+    __slots__ = ("name", "number", "description", "l3_interface")
+
+    def __init__(self, name=None, number=None, description=None, l3_interface=None):
+        self.name = name
+        self.number = number
+        self.description = description
+        self.l3_interface = l3_interface
+
+
+class UnitRecord(object):
+    __slots__ = ("name", "port_mode", "interface_mode", "members", "native_vlan", "ips", "input_filter",
+                 "output_filter")
+
+    def __init__(self, name=None):
+        self.name = name
+        self.port_mode = None
+        self.interface_mode = None
+        self.members = []
+        self.native_vlan = None
+        self.ips = []
+        self.input_filter = None
+        self.output_filter = None
+
+
+class InterfaceRecord(object):
+    __slots__ = ("name", "disabled", "mtu", "bundle", "native_vlan", "auto_negotiation", "link_speed", "units")
+
+    def __init__(self, name=None):
+        self.name = name
+        self.disabled = False
+        self.mtu = None
+        self.bundle = None
+        self.native_vlan = None
+        self.auto_negotiation = None
+        self.link_speed = None
+        self.units = OrderedDict()
+
+
+class ProtocolInterfaceRecord(object):
+    __slots__ = ("name", "disabled", "edge", "no_root_port")
+
+    def __init__(self, name=None):
+        self.name = name
+        self.disabled = False
+        self.edge = False
+        self.no_root_port = False
+
+
+class ConfigurationRecords(object):
+    def __init__(self):
+        self.vlans = []
+        self.vlan_ids_by_name = {}
+        self.interfaces = OrderedDict()
+        self.protocols = {}
+
+
+def read_configuration(source):
+    """
+    Decodes the <configuration> of a get-config <rpc-reply> in a single incremental pass
+
+    Every vlan, interface and protocol interface is turned into a record as soon as its element is
+    complete, then the element is dropped, so no tree of the whole document is ever built.
+    The rpc-error elements of the reply are returned untouched, and the number of every vlan is
+    indexed by its name along the way.
+
+    Records keep what the reply says as is, port-mode and interface-mode or a native-vlan-id on the
+    interface and on its units alike; the strategies of the switch tell which of them its model uses.
+    """
+    records = ConfigurationRecords()
+    errors = []
+    path = []
+
+    for event, element in etree.iterparse(source, events=("start", "end")):
+        if event == "start":
+            path.append(_local_name(element))
+            continue
+
+        tag = path.pop()
+        if tag == "vlan" and path[-2:] == ["configuration", "vlans"]:
+            vlan = _vlan_record(element)
+            records.vlans.append(vlan)
+            if vlan.number is not None:
+                records.vlan_ids_by_name[vlan.name] = vlan.number
+        elif tag == "interface" and path[-2:] == ["configuration", "interfaces"]:
+            interface = _interface_record(element)
+            records.interfaces[interface.name] = interface
+        elif tag == "interface" and path[-3:-1] == ["configuration", "protocols"]:
+            protocol_interface = _protocol_interface_record(element)
+            records.protocols.setdefault(path[-1], OrderedDict())[protocol_interface.name] = protocol_interface
+        elif tag == "rpc-error":
+            errors.append(element)
+            continue
+        else:
+            continue
+
+        _drop(element)
+
+    return records, errors
+
+
+class ConfigurationReply(RPCReply):
+    """
+    An <rpc-reply> decoded into ConfigurationRecords instead of a DOM
+
+    Whatever ncclient hands to its replies is passed on as is, as only its later versions add huge_tree.
+    """
+    def __init__(self, raw, *args, **kwargs):
+        super(ConfigurationReply, self).__init__(raw, *args, **kwargs)
+        self.configuration = None
+
+    def parse(self):
+        if self._parsed:
+            return
+
+        self.configuration, errors = read_configuration(_ReplyReader(self._raw))
+        self._errors = [self.ERROR_CLS(error) for error in errors]
+        self._parsed = True
+
+
+class _ReplyReader(object):
+    """
+    Reads the text of a reply as utf-8 a chunk at a time
+
+    ncclient hands over the whole reply as text, encoding it chunk by chunk spares a full encoded copy.
+    """
+    def __init__(self, raw):
+        self.raw = raw
+        self.encoded = isinstance(raw, bytes)
+        self.position = 0
+
+    def read(self, size=-1):
+        if size < 0:
+            size = len(self.raw) - self.position
+        elif not self.encoded:
+            size = max(size // 4, 1)
+
+        chunk = self.raw[self.position:self.position + size]
+        self.position += len(chunk)
+        return chunk if self.encoded else chunk.encode("utf-8")
+
+
+class GetConfigurationRecords(GetConfig):
+    """
+    The get-config operation, replying with ConfigurationRecords
+
+    records = netconf.execute(GetConfigurationRecords, source="running", filter=filter_node).configuration
+    """
+    REPLY_CLS = ConfigurationReply
+
+    def __init__(self, session, device_handler, *args, **kwargs):
+        super(GetConfigurationRecords, self).__init__(session, _UntransformedReplies(device_handler), *args, **kwargs)
+
+
+class _UntransformedReplies(object):
+    def __init__(self, device_handler):
+        self.device_handler = device_handler
+
+    def transform_reply(self):
+        return False
+
+    def __getattr__(self, name):
+        return getattr(self.device_handler, name)
+
+
+def _vlan_record(element):
+    record = VlanRecord()
+    for child in element:
+        tag = _local_name(child)
+        if tag == "name":
+            record.name = child.text
+        elif tag == "vlan-id":
+            record.number = int(child.text)
+        elif tag == "description":
+            record.description = child.text
+        elif tag == "l3-interface":
+            record.l3_interface = child.text
+    return record
+
+
+def _interface_record(element):
+    record = InterfaceRecord()
+    for child in element:
+        tag = _local_name(child)
+        if tag == "name":
+            record.name = child.text
+        elif tag == "disable":
+            record.disabled = True
+        elif tag == "mtu":
+            record.mtu = int(child.text)
+        elif tag == "native-vlan-id":
+            record.native_vlan = int(child.text)
+        elif tag == "ether-options":
+            _read_ether_options(record, child)
+        elif tag == "aggregated-ether-options":
+            record.link_speed = _text(child, "link-speed")
+        elif tag == "unit":
+            unit = _unit_record(child)
+            record.units[unit.name] = unit
+    return record
+
+
+def _read_ether_options(record, element):
+    for child in element:
+        tag = _local_name(child)
+        if tag == "ieee-802.3ad":
+            record.bundle = _text(child, "bundle")
+        elif tag == "auto-negotiation":
+            record.auto_negotiation = True
+        elif tag == "no-auto-negotiation":
+            record.auto_negotiation = False
+
+
+def _unit_record(element):
+    record = UnitRecord(_text(element, "name"))
+    for family in _children(element, "family"):
+        for switching in _children(family, "ethernet-switching"):
+            for child in switching:
+                tag = _local_name(child)
+                if tag == "port-mode":
+                    record.port_mode = child.text
+                elif tag == "interface-mode":
+                    record.interface_mode = child.text
+                elif tag == "native-vlan-id":
+                    record.native_vlan = int(child.text)
+                elif tag == "vlan":
+                    record.members.extend(members.text for members in _children(child, "members"))
+        for inet in _children(family, "inet"):
+            for child in inet:
+                tag = _local_name(child)
+                if tag == "address":
+                    record.ips.append(_text(child, "name"))
+                elif tag == "filter":
+                    record.input_filter = _text(child, "input", "filter-name")
+                    record.output_filter = _text(child, "output", "filter-name")
+    return record
+
+
+def _protocol_interface_record(element):
+    record = ProtocolInterfaceRecord()
+    for child in element:
+        tag = _local_name(child)
+        if tag == "name":
+            record.name = child.text
+        elif tag == "disable":
+            record.disabled = True
+        elif tag == "edge":
+            record.edge = True
+        elif tag == "no-root-port":
+            record.no_root_port = True
+    return record
+
+
+def _children(element, name):
+    return (child for child in element if _local_name(child) == name)
+
+
+def _text(element, *path):
+    for name in path:
+        element = next(_children(element, name), None)
+        if element is None:
+            return None
+    return element.text
+
+
+def _local_name(element):
+    tag = element.tag
+    if not isinstance(tag, basestring):
+        return None
+    return tag.rsplit("}", 1)[-1]
+
+
+def _drop(element):
+    element.clear()
+    while element.getprevious() is not None:
+        del element.getparent()[0]
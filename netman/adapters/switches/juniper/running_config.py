@@ -0,0 +1,85 @@
+# Copyright 2016 Internap.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import threading
+from collections import OrderedDict
+
+
+class RunningConfigCache(object):
+    """
+    Parsed replies of running configuration queries kept between requests, per switch
+
+    cache = RunningConfigCache(max_entries_per_switch=64)
+
+    config = cache.get(switch_descriptor, commit, key)
+    if config is None:
+        config = netconf.get_config(source="running", filter=filter_node)
+        cache.put(switch_descriptor, commit, key, config)
+
+    Replies are only served while the switch reports the same latest commit as when they were
+    fetched, every reply of an older commit is dropped as soon as a new one is seen.
+    The least recently used replies are dropped past max_entries_per_switch.
+
+    Junos tells commits apart by their time, to the second, so nothing should be cached for a commit
+    less than settle_time seconds old: another commit could still follow under the same identity.
+    """
+    def __init__(self, max_entries_per_switch=64, settle_time=2):
+        self.max_entries_per_switch = max_entries_per_switch
+        self.settle_time = settle_time
+
+        self._lock = threading.Lock()
+        self._switches = {}
+
+    def get(self, switch_descriptor, commit, key):
+        with self._lock:
+            switch_commit, entries = self._switches.get(_key(switch_descriptor), (None, None))
+            if switch_commit != commit or key not in entries:
+                return None
+
+            entries[key] = entries.pop(key)
+            return entries[key]
+
+    def put(self, switch_descriptor, commit, key, config):
+        with self._lock:
+            switch_commit, entries = self._switches.get(_key(switch_descriptor), (None, None))
+            if switch_commit != commit:
+                entries = OrderedDict()
+                self._switches[_key(switch_descriptor)] = (commit, entries)
+
+            entries.pop(key, None)
+            entries[key] = config
+            while len(entries) > self.max_entries_per_switch:
+                entries.popitem(last=False)
+
+    def invalidate(self, switch_descriptor):
+        with self._lock:
+            self._switches.pop(_key(switch_descriptor), None)
+
+
+class SharedReply(object):
+    """
+    A caller's own handle on a cached reply
+
+    Parsers memoize what they derive from a reply on the object they were given (see vlan_index), with
+    a handle per caller they never write to the reply other threads are reading.
+    """
+    def __init__(self, reply):
+        self.reply = reply
+
+    def __getattr__(self, name):
+        return getattr(self.reply, name)
+
+
+def _key(switch_descriptor):
+    return switch_descriptor.model, switch_descriptor.hostname, switch_descriptor.port, switch_descriptor.username
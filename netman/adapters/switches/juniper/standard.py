@@ -29,6 +29,9 @@ class JuniperCustomStrategies(object):
     def get_port_mode_node_in_inteface_node(self, interface_node):
         return interface_node.xpath("unit/family/ethernet-switching/port-mode")
 
+    def get_port_mode_in_interface_record(self, interface_record):
+        return next((unit.port_mode for unit in interface_record.units.values() if unit.port_mode is not None), None)
+
     def add_enslave_to_bond_operations(self, update, interface, bond):
         ether_options = [
             to_ele("""
@@ -49,6 +52,10 @@ class JuniperCustomStrategies(object):
     def get_interface_trunk_native_vlan_id_node(self, interface):
         return interface.xpath("unit/family/ethernet-switching/native-vlan-id")
 
+    def get_trunk_native_vlan_id_in_interface_record(self, interface_record):
+        return next((unit.native_vlan for unit in interface_record.units.values() if unit.native_vlan is not None),
+                    None)
+
     def set_native_vlan_id_node(self, interface_node, native_vlan_id_node):
         return interface_node.xpath("//ethernet-switching")[0].append(native_vlan_id_node)
 
@@ -15,10 +15,27 @@
 import logging
 import traceback
 
+import paramiko
+
 from netman import regex
+from netman.core.objects.exceptions import CommandTimeout
+from netman.core.objects.interface import Interface
+from netman.core.objects.port_modes import ACCESS, TRUNK
+from netman.core.objects.vlan_set import VlanSet
 import re
 
 
+_bang = regex.compile("^!.*")
+_not_indented = regex.compile("^[^\s].*")
+_any_port_mode = regex.compile("switchport mode \S+")
+_shutdown = regex.compile("shutdown")
+_access_vlan = regex.compile("switchport access vlan (\d+)")
+_native_vlan = regex.compile("switchport general pvid (\d+)")
+_mtu = regex.compile("mtu (\d+)")
+
+_transport_errors = (CommandTimeout, EnvironmentError, EOFError, paramiko.SSHException)
+
+
 class SubShell(object):
     debug = False
 
@@ -36,6 +53,8 @@ class SubShell(object):
         return self.ssh
 
     def __exit__(self, eType, eValue, eTrace):
+        if isinstance(eValue, _transport_errors):
+            self.ssh.failed = True
         if self.debug and eType is not None:
             logging.error("Subshell exception {}: {}\n{}"
                           .format(eType.__name__, eValue, "".join(traceback.format_tb(eTrace))))
@@ -53,7 +72,7 @@ def no_output(exc, *args):
 def split_on_bang(data):
     current_chunk = []
     for line in data:
-        if re.match("^!.*", line):
+        if _bang.match(line):
             if len(current_chunk) > 0:
                 yield current_chunk
                 current_chunk = []
@@ -64,7 +83,7 @@ def split_on_bang(data):
 def split_on_dedent(data):
     current_chunk = []
     for line in data:
-        if re.match("^[^\s].*", line) and len(current_chunk) > 0:
+        if _not_indented.match(line) and len(current_chunk) > 0:
             yield current_chunk
             current_chunk = [line]
         else:
@@ -73,6 +92,81 @@ def split_on_dedent(data):
     yield current_chunk
 
 
+def parse_vlan_ranges(all_ranges):
+    if all_ranges is None:
+        return VlanSet.from_range(1, 4093)
+    elif all_ranges == "none":
+        return VlanSet()
+    else:
+        return VlanSet.from_ranges(all_ranges)
+
+
+def parse_switchport_interface(interface_name, data, trunk_vlans):
+    """
+    Builds an interface from the lines of its "interface" section in a Dell running config
+
+    trunk_vlans matches the allowed vlan lines of the model, with the vlan ranges in its first group.
+    """
+    interface = Interface(name=interface_name, port_mode=ACCESS, shutdown=False)
+    for line in data:
+        if regex.match(_any_port_mode, line):
+            interface.port_mode = TRUNK
+        if regex.match(_shutdown, line):
+            interface.shutdown = True
+        if regex.match(_access_vlan, line):
+            interface.access_vlan = int(regex[0])
+        if regex.match(_native_vlan, line):
+            interface.trunk_native_vlan = int(regex[0])
+        if regex.match(trunk_vlans, line):
+            interface.trunk_vlans += parse_vlan_ranges(regex[0])
+        if regex.match(_mtu, line):
+            interface.mtu = int(regex[0])
+
+    return interface
+
+
+class LineClassifier(object):
+    """
+    Classifies lines against a table of patterns with a single compiled alternation
+
+    classifier = LineClassifier([
+        ("^ name (\S+)", set_name),
+        ("^ shutdown", shut_down),
+    ])
+    classifier.dispatch(line, vlan)  # calls set_name(vlan, "my-vlan") for " name my-vlan"
+
+    The first matching pattern wins, its handler gets the context followed by the groups of the pattern
+    and dispatch returns what the handler returned, or None when no pattern matched.
+    """
+    def __init__(self, rules):
+        self._handlers = {}
+        alternatives = []
+        group = 1
+        for index, (pattern, handler) in enumerate(rules):
+            name = "rule{}".format(index)
+            groups = regex.compile(pattern).groups
+            alternatives.append("(?P<{}>{})".format(name, pattern))
+            self._handlers[name] = (handler, group, group + groups)
+            group += groups + 1
+
+        self.pattern = regex.compile("|".join(alternatives))
+
+    def dispatch(self, line, *context):
+        match = self.pattern.match(line)
+        if match is None:
+            return None
+
+        handler, start, end = self._handlers[match.lastgroup]
+        return handler(*(context + match.groups()[start:end]))
+
+
+def result_pattern(pattern):
+    """
+    Compiles a pattern for ResultChecker.on_result_matching, where it is matched against the whole output
+    """
+    return regex.compile(pattern, re.DOTALL)
+
+
 class ResultChecker(object):
     def __init__(self, result=None):
         self.result = result
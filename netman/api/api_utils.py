@@ -22,6 +22,8 @@ from netman.api import NETMAN_API_VERSION
 
 from netman.core.objects.exceptions import UnknownResource, Conflict, InvalidValue
 
+logged_body_size = 4096
+
 
 def to_response(fn):
     @wraps(fn)
@@ -48,7 +50,8 @@ def to_response(fn):
             logging.exception(e)
             response = exception_to_response(e, 500)
 
-        self.logger.info("Responding {} : {}".format(response.status_code, response.data))
+        if self.logger.isEnabledFor(logging.INFO):
+            self.logger.info("Responding %s : %s", response.status_code, loggable_body(response))
         if 'Netman-Max-Version' in request.headers:
             response.headers['Netman-Version'] = min(
                 float(request.headers['Netman-Max-Version']),
@@ -58,6 +61,16 @@ def to_response(fn):
     return wrapper
 
 
+def loggable_body(response):
+    if response.is_streamed:
+        return "<<streamed>>"
+
+    data = response.get_data()
+    if logged_body_size is not None and len(data) > logged_body_size:
+        return "{}... ({} bytes)".format(data[:logged_body_size], len(data))
+    return data
+
+
 def exception_to_response(exception, code):
     data = {'error': str(exception)}
 
@@ -42,7 +42,7 @@ class V1(Serializer):
             port_mode=serialized_port_mode[base_interface.port_mode],
             access_vlan=base_interface.access_vlan,
             trunk_native_vlan=base_interface.trunk_native_vlan,
-            trunk_vlans=sorted(base_interface.trunk_vlans),
+            trunk_vlans=list(base_interface.trunk_vlans),
             mtu=base_interface.mtu
         )
 
@@ -204,6 +204,12 @@ class UnableToAcquireLock(UnavailableResource):
         super(UnableToAcquireLock, self).__init__("Unable to acquire a lock in a timely fashion")
 
 
+class NoConnectionAvailable(UnavailableResource):
+    def __init__(self, hostname=None):
+        super(NoConnectionAvailable, self).__init__("No connection to {} became available in a timely fashion"
+                                                    .format(hostname))
+
+
 class BadBondNumber(InvalidValue):
     def __init__(self):
         super(BadBondNumber, self).__init__("Bond number is invalid")
@@ -13,6 +13,7 @@
 # limitations under the License.
 
 from netman.core.objects import Model
+from netman.core.objects.vlan_set import VlanSet
 
 
 class BaseInterface(Model):
@@ -22,9 +23,17 @@ class BaseInterface(Model):
         self.port_mode = port_mode
         self.access_vlan = access_vlan
         self.trunk_native_vlan = trunk_native_vlan
-        self.trunk_vlans = trunk_vlans or []
+        self.trunk_vlans = trunk_vlans
         self.mtu = mtu
 
+    @property
+    def trunk_vlans(self):
+        return self.__dict__["trunk_vlans"]
+
+    @trunk_vlans.setter
+    def trunk_vlans(self, vlans):
+        self.__dict__["trunk_vlans"] = VlanSet(vlans or ())
+
 
 class Interface(BaseInterface):
     def __init__(self, name=None, bond_master=None, auto_negotiation=None, **interface):
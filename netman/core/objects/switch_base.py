@@ -217,6 +217,7 @@ class SwitchBase(SwitchOperations):
         self.logger = logging.getLogger("{module}.{hostname}".format(module=self.__module__, hostname=self.switch_descriptor.hostname))
         self.connected = False
         self.in_transaction = False
+        self.connection_pool = None
 
     def connect(self):
         self._connect()
@@ -258,6 +259,25 @@ class SwitchBase(SwitchOperations):
         """
         raise NotImplementedError()
 
+    def _borrow_connection(self, open_connection, close, probe=None):
+        if self.connection_pool is None:
+            return open_connection()
+        return self.connection_pool.borrow(self.switch_descriptor, open_connection, close=close, probe=probe)
+
+    def _release_connection(self, connection, close, reset=None):
+        if self.connection_pool is None:
+            close(connection)
+        else:
+            if reset is not None:
+                reset(connection)
+            self.connection_pool.give_back(self.switch_descriptor, connection)
+
+    def _discard_connection(self, connection, close):
+        if self.connection_pool is None:
+            close(connection)
+        else:
+            self.connection_pool.discard(self.switch_descriptor, connection)
+
     @contextmanager
     def transaction(self):
         self.start_transaction()
@@ -0,0 +1,156 @@
+# Copyright 2016 Internap.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+max_vlan = 4095
+
+
+class VlanSet(object):
+    """
+    A set of vlan numbers kept as a bitmap
+
+    VlanSet([1, 2, 3, 200]) or VlanSet.from_ranges("1-3,200")
+
+    Vlans iterate in increasing order and str() gives the compact ranges, "1-3,200".  It also behaves enough
+    like the lists it replaces (append, remove, +=, indexing, equality with a list of the same vlans in order)
+    for existing callers to keep working.
+    """
+    __slots__ = ("bits",)
+
+    def __init__(self, vlans=()):
+        if isinstance(vlans, VlanSet):
+            self.bits = vlans.bits
+        else:
+            self.bits = 0
+            for vlan in vlans:
+                self.bits |= _bit(vlan)
+
+    @classmethod
+    def from_range(cls, first, last):
+        vlans = cls()
+        first, last = _number(first), _number(last)
+        if last >= first:
+            vlans.bits = ((1 << (last - first + 1)) - 1) << first
+        return vlans
+
+    @classmethod
+    def from_ranges(cls, ranges):
+        vlans = cls()
+        for single_range in filter(None, ranges.split(",")):
+            first, _, last = single_range.partition("-")
+            vlans.bits |= cls.from_range(int(first), int(last or first)).bits
+        return vlans
+
+    def add(self, vlan):
+        self.bits |= _bit(vlan)
+
+    append = add
+
+    def discard(self, vlan):
+        if vlan in self:
+            self.bits ^= _bit(vlan)
+
+    def remove(self, vlan):
+        if vlan not in self:
+            raise ValueError("Vlan {} is not in the set".format(vlan))
+        self.bits ^= _bit(vlan)
+
+    def ranges(self):
+        first = last = None
+        for vlan in self:
+            if last is not None and vlan == last + 1:
+                last = vlan
+            else:
+                if first is not None:
+                    yield first, last
+                first = last = vlan
+        if first is not None:
+            yield first, last
+
+    def __contains__(self, vlan):
+        return isinstance(vlan, (int, long)) and vlan >= 0 and (self.bits >> vlan) & 1 == 1
+
+    def __iter__(self):
+        for vlan, bit in enumerate(reversed(bin(self.bits)[2:])):
+            if bit == "1":
+                yield vlan
+
+    def __len__(self):
+        return bin(self.bits).count("1")
+
+    def __nonzero__(self):
+        return self.bits != 0
+
+    def __getitem__(self, index):
+        if index == 0 and self.bits:
+            return (self.bits & -self.bits).bit_length() - 1
+        if index == -1 and self.bits:
+            return self.bits.bit_length() - 1
+        return list(self)[index]
+
+    def __or__(self, other):
+        vlans = VlanSet()
+        vlans.bits = self.bits | VlanSet(other).bits
+        return vlans
+
+    __add__ = __radd__ = __ror__ = __or__
+
+    def __ior__(self, other):
+        self.bits |= VlanSet(other).bits
+        return self
+
+    __iadd__ = __ior__
+
+    def __sub__(self, other):
+        vlans = VlanSet()
+        vlans.bits = self.bits & ~VlanSet(other).bits
+        return vlans
+
+    def __and__(self, other):
+        vlans = VlanSet()
+        vlans.bits = self.bits & VlanSet(other).bits
+        return vlans
+
+    __rand__ = __and__
+
+    def __eq__(self, other):
+        if isinstance(other, VlanSet):
+            return self.bits == other.bits
+        if isinstance(other, (list, tuple, xrange)):
+            return list(self) == list(other)
+        if isinstance(other, (set, frozenset)):
+            return self.bits == VlanSet(other).bits
+        return NotImplemented
+
+    def __ne__(self, other):
+        equal = self.__eq__(other)
+        return equal if equal is NotImplemented else not equal
+
+    __hash__ = None
+
+    def __str__(self):
+        return ",".join(str(first) if first == last else "{}-{}".format(first, last) for first, last in self.ranges())
+
+    def __repr__(self):
+        return "VlanSet({!r})".format(str(self))
+
+
+def _bit(vlan):
+    return 1 << _number(vlan)
+
+
+def _number(vlan):
+    vlan = int(vlan)
+    if not 0 <= vlan <= max_vlan:
+        raise ValueError("Invalid vlan number {}".format(vlan))
+    return vlan
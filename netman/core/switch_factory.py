@@ -35,6 +35,9 @@ factories = {
 
 class RealSwitchFactory(object):
 
+    def __init__(self, connection_pool=None):
+        self.connection_pool = connection_pool
+
     def get_switch(self, hostname):
         raise NotImplemented()
 
@@ -44,12 +47,15 @@ class RealSwitchFactory(object):
     def get_switch_by_descriptor(self, switch_descriptor):
         if switch_descriptor.netman_server:
             return RemoteSwitch(switch_descriptor)
-        return factories[switch_descriptor.model](switch_descriptor)
+        switch = factories[switch_descriptor.model](switch_descriptor)
+        switch.connection_pool = self.connection_pool
+        return switch
 
 
 class FlowControlSwitchFactory(RealSwitchFactory):
 
-    def __init__(self, switch_source, lock_factory):
+    def __init__(self, switch_source, lock_factory, connection_pool=None):
+        super(FlowControlSwitchFactory, self).__init__(connection_pool)
         self.switch_source = switch_source
         self.lock_factory = lock_factory
         self.locks = {}
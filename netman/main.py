@@ -20,7 +20,14 @@ from flask import request
 from flask.app import Flask
 
 from adapters.threading_lock_factory import ThreadingLockFactory
+from netman.adapters import shell
+from netman.adapters.connection_pool import ConnectionPool
 from netman.adapters.memory_storage import MemoryStorage
+from netman.adapters.shell.ssh import SharedTransports
+from netman.adapters.switches.juniper import base as juniper
+from netman.adapters.switches.juniper.inventory import PhysicalInterfaceInventory
+from netman.adapters.switches.juniper.running_config import RunningConfigCache
+from netman.api import api_utils
 from netman.api.api_utils import RegexConverter
 from netman.api.netman_api import NetmanApi
 from netman.api.switch_api import SwitchApi
@@ -49,10 +56,47 @@ SwitchApi(switch_factory, switch_session_manager).hook_to(app)
 SwitchSessionApi(real_switch_factory, switch_session_manager).hook_to(app)
 
 
-def load_app(session_inactivity_timeout=None):
+def load_app(session_inactivity_timeout=None, connection_pool_size=None, connection_pool_idle_timeout=None,
+             connection_pool_borrow_timeout=None, metrics_sink=None, share_ssh_transports=False, logged_body_size=None,
+             stream_juniper_replies=False, defer_juniper_edits=False, cache_juniper_running_config=False,
+             juniper_interface_inventory_ttl=None, juniper_interface_status_ttl=None):
     if session_inactivity_timeout:
         switch_session_manager.session_inactivity_timeout = session_inactivity_timeout
-    
+
+    if connection_pool_size:
+        pool_params = dict(max_per_switch=connection_pool_size)
+        if connection_pool_idle_timeout:
+            pool_params["idle_timeout"] = connection_pool_idle_timeout
+        if connection_pool_borrow_timeout:
+            pool_params["borrow_timeout"] = connection_pool_borrow_timeout
+        switch_factory.connection_pool = ConnectionPool(**pool_params)
+
+    if metrics_sink is not None:
+        shell.default_metrics_sink = metrics_sink
+
+    if share_ssh_transports:
+        shell.default_shared_transports = SharedTransports()
+
+    if logged_body_size is not None:
+        api_utils.logged_body_size = logged_body_size or None
+
+    if stream_juniper_replies:
+        juniper.default_streaming_replies = True
+
+    if defer_juniper_edits:
+        juniper.default_deferred_edits = True
+
+    if cache_juniper_running_config:
+        juniper.default_running_config_cache = RunningConfigCache()
+
+    if juniper_interface_inventory_ttl or juniper_interface_status_ttl:
+        inventory_params = {}
+        if juniper_interface_inventory_ttl:
+            inventory_params["names_ttl"] = juniper_interface_inventory_ttl
+        if juniper_interface_status_ttl:
+            inventory_params["status_ttl"] = juniper_interface_status_ttl
+        juniper.default_physical_interface_inventory = PhysicalInterfaceInventory(**inventory_params)
+
     return app
 
 
@@ -61,12 +105,42 @@ if __name__ == '__main__':
     parser.add_argument('--host', nargs='?', default="127.0.0.1")
     parser.add_argument('--port', type=int, nargs='?', default=5000)
     parser.add_argument('--session-inactivity-timeout', type=int, nargs='?')
+    parser.add_argument('--connection-pool-size', type=int, nargs='?')
+    parser.add_argument('--connection-pool-idle-timeout', type=int, nargs='?')
+    parser.add_argument('--connection-pool-borrow-timeout', type=int, nargs='?')
+    parser.add_argument('--share-ssh-transports', action='store_true')
+    parser.add_argument('--logged-body-size', type=int, nargs='?')
+    parser.add_argument('--stream-juniper-replies', action='store_true')
+    parser.add_argument('--defer-juniper-edits', action='store_true')
+    parser.add_argument('--cache-juniper-running-config', action='store_true')
+    parser.add_argument('--juniper-interface-inventory-ttl', type=int, nargs='?')
+    parser.add_argument('--juniper-interface-status-ttl', type=int, nargs='?')
     
     args = parser.parse_args()
 
     params = {}
     if args.session_inactivity_timeout:
         params["session_inactivity_timeout"] = args.session_inactivity_timeout
+    if args.connection_pool_size:
+        params["connection_pool_size"] = args.connection_pool_size
+    if args.connection_pool_idle_timeout:
+        params["connection_pool_idle_timeout"] = args.connection_pool_idle_timeout
+    if args.connection_pool_borrow_timeout:
+        params["connection_pool_borrow_timeout"] = args.connection_pool_borrow_timeout
+    if args.share_ssh_transports:
+        params["share_ssh_transports"] = True
+    if args.logged_body_size is not None:
+        params["logged_body_size"] = args.logged_body_size
+    if args.stream_juniper_replies:
+        params["stream_juniper_replies"] = True
+    if args.defer_juniper_edits:
+        params["defer_juniper_edits"] = True
+    if args.cache_juniper_running_config:
+        params["cache_juniper_running_config"] = True
+    if args.juniper_interface_inventory_ttl:
+        params["juniper_interface_inventory_ttl"] = args.juniper_interface_inventory_ttl
+    if args.juniper_interface_status_ttl:
+        params["juniper_interface_status_ttl"] = args.juniper_interface_status_ttl
 
     load_app(**params).run(host=args.host, port=args.port, threaded=True)
 
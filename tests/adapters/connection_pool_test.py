@@ -0,0 +1,127 @@
+# Copyright 2016 Internap.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import threading
+import unittest
+
+import mock
+from hamcrest import assert_that, is_, is_not
+
+from netman.adapters.connection_pool import ConnectionPool
+from netman.core.objects.exceptions import NoConnectionAvailable
+from netman.core.objects.switch_descriptor import SwitchDescriptor
+
+
+class ConnectionPoolTest(unittest.TestCase):
+
+    def setUp(self):
+        self.pool = ConnectionPool(max_per_switch=2, idle_timeout=300)
+        self.switch_descriptor = SwitchDescriptor(model="cisco", hostname="my.hostname", username="user",
+                                                  password="pass")
+        self.close = mock.Mock()
+
+    def test_a_connection_is_opened_when_none_is_idle(self):
+        connection = self.pool.borrow(self.switch_descriptor, lambda: "connection", close=self.close)
+
+        assert_that(connection, is_("connection"))
+
+    def test_a_given_back_connection_is_reused(self):
+        connection = self.pool.borrow(self.switch_descriptor, mock.Mock, close=self.close)
+        self.pool.give_back(self.switch_descriptor, connection)
+
+        assert_that(self.pool.borrow(self.switch_descriptor, mock.Mock, close=self.close), is_(connection))
+        assert_that(self.close.called, is_(False))
+
+    def test_connections_are_not_shared_between_switches(self):
+        connection = self.pool.borrow(self.switch_descriptor, mock.Mock, close=self.close)
+        self.pool.give_back(self.switch_descriptor, connection)
+
+        other_switch = SwitchDescriptor(model="cisco", hostname="other.hostname", username="user", password="pass")
+
+        assert_that(self.pool.borrow(other_switch, mock.Mock, close=self.close), is_not(connection))
+
+    def test_a_connection_failing_its_probe_is_closed_and_replaced(self):
+        connection = self.pool.borrow(self.switch_descriptor, mock.Mock, close=self.close)
+        self.pool.give_back(self.switch_descriptor, connection)
+
+        new_connection = self.pool.borrow(self.switch_descriptor, mock.Mock, close=self.close,
+                                          probe=mock.Mock(side_effect=EOFError))
+
+        assert_that(new_connection, is_not(connection))
+        self.close.assert_called_once_with(connection)
+
+    def test_borrowing_above_the_limit_waits_for_a_connection_to_be_given_back(self):
+        connections = [self.pool.borrow(self.switch_descriptor, mock.Mock, close=self.close) for _ in range(2)]
+        open_connection = mock.Mock()
+
+        giving_back = threading.Timer(0.1, self.pool.give_back, args=(self.switch_descriptor, connections[0]))
+        giving_back.start()
+
+        assert_that(self.pool.borrow(self.switch_descriptor, open_connection, close=self.close), is_(connections[0]))
+        assert_that(open_connection.called, is_(False))
+        giving_back.join()
+
+    def test_borrowing_above_the_limit_gives_up_after_the_borrow_timeout(self):
+        pool = ConnectionPool(max_per_switch=1, borrow_timeout=0.1)
+        pool.borrow(self.switch_descriptor, mock.Mock, close=self.close)
+
+        with self.assertRaises(NoConnectionAvailable):
+            pool.borrow(self.switch_descriptor, mock.Mock, close=self.close)
+
+    def test_a_connection_that_could_not_be_opened_frees_its_slot(self):
+        pool = ConnectionPool(max_per_switch=1, borrow_timeout=0)
+
+        with self.assertRaises(EOFError):
+            pool.borrow(self.switch_descriptor, mock.Mock(side_effect=EOFError), close=self.close)
+
+        assert_that(pool.borrow(self.switch_descriptor, lambda: "connection", close=self.close), is_("connection"))
+
+    def test_idle_connections_are_closed_after_the_idle_timeout(self):
+        connection = self.pool.borrow(self.switch_descriptor, mock.Mock, close=self.close)
+
+        with mock.patch("netman.adapters.connection_pool.time.time", return_value=1000):
+            self.pool.give_back(self.switch_descriptor, connection)
+
+        with mock.patch("netman.adapters.connection_pool.time.time", return_value=1301):
+            self.pool.evict_idle()
+
+        self.close.assert_called_once_with(connection)
+        assert_that(self.pool.borrow(self.switch_descriptor, mock.Mock, close=self.close), is_not(connection))
+
+    def test_expired_connections_are_closed_before_borrowing(self):
+        connection = self.pool.borrow(self.switch_descriptor, mock.Mock, close=self.close)
+
+        with mock.patch("netman.adapters.connection_pool.time.time", return_value=1000):
+            self.pool.give_back(self.switch_descriptor, connection)
+
+        with mock.patch("netman.adapters.connection_pool.time.time", return_value=1301):
+            new_connection = self.pool.borrow(self.switch_descriptor, mock.Mock, close=self.close)
+
+        self.close.assert_called_once_with(connection)
+        assert_that(new_connection, is_not(connection))
+
+    def test_a_discarded_connection_is_closed_and_never_reused(self):
+        connection = self.pool.borrow(self.switch_descriptor, mock.Mock, close=self.close)
+        self.pool.discard(self.switch_descriptor, connection)
+
+        self.close.assert_called_once_with(connection)
+        assert_that(self.pool.borrow(self.switch_descriptor, mock.Mock, close=self.close), is_not(connection))
+
+    def test_close_all_closes_every_idle_connection(self):
+        connection = self.pool.borrow(self.switch_descriptor, mock.Mock, close=self.close)
+        self.pool.give_back(self.switch_descriptor, connection)
+
+        self.pool.close_all()
+
+        self.close.assert_called_once_with(connection)
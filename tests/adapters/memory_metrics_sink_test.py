@@ -0,0 +1,64 @@
+# Copyright 2016 Internap.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from unittest import TestCase
+
+from hamcrest import assert_that, is_, none, equal_to
+
+from netman.adapters.memory_metrics_sink import MemoryMetricsSink
+from netman.adapters.shell.base import command_verb
+
+
+class MemoryMetricsSinkTest(TestCase):
+    def setUp(self):
+        self.sink = MemoryMetricsSink()
+
+    def test_values_are_summarized_per_name_and_tags(self):
+        self.sink.histogram("duration", 1, dict(model="cisco", command="show vlan"))
+        self.sink.histogram("duration", 3, dict(command="show vlan", model="cisco"))
+        self.sink.histogram("duration", 100, dict(model="dell", command="show vlan"))
+
+        histogram = self.sink.get("duration", model="cisco", command="show vlan")
+        assert_that(histogram.count, is_(2))
+        assert_that(histogram.min, is_(1))
+        assert_that(histogram.max, is_(3))
+        assert_that(histogram.mean, is_(2.0))
+
+    def test_values_are_counted_in_power_of_two_buckets(self):
+        for value in [0.3, 0.5, 3, 4, 5]:
+            self.sink.histogram("duration", value)
+
+        assert_that(self.sink.get("duration").buckets, equal_to({-1: 2, 2: 2, 3: 1}))
+
+    def test_unknown_histogram_is_none(self):
+        assert_that(self.sink.get("duration", model="cisco"), is_(none()))
+
+
+class CommandVerbTest(TestCase):
+    def test_arguments_are_stripped(self):
+        assert_that(command_verb("show running-config interface vlan 1234"), is_("show running-config"))
+        assert_that(command_verb("interface FastEthernet0/4"), is_("interface"))
+        assert_that(command_verb("ip address 1.1.1.1 255.255.255.0"), is_("ip address"))
+        assert_that(command_verb("show running-config | begin interface"), is_("show running-config"))
+        assert_that(command_verb("no ip address 1.1.1.1 255.255.255.0"), is_("no ip address"))
+
+    def test_free_form_operands_are_never_part_of_the_verb(self):
+        assert_that(command_verb("name my-vlan"), is_("name"))
+        assert_that(command_verb("description uplink to core"), is_("description"))
+        assert_that(command_verb("vrf forwarding customer-a"), is_("vrf forwarding"))
+        assert_that(command_verb("interface ve my-interface"), is_("interface"))
+
+    def test_commands_without_a_verb_are_grouped(self):
+        assert_that(command_verb(""), is_("<other>"))
+        assert_that(command_verb("1234"), is_("<other>"))
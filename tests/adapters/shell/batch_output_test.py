@@ -0,0 +1,51 @@
+# Copyright 2016 Internap.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import unittest
+
+from hamcrest import assert_that, is_
+
+from netman.adapters.shell.base import Prompt, BatchOutput
+
+
+class BatchOutputTest(unittest.TestCase):
+    def setUp(self):
+        self.prompt = Prompt("#")
+        self.prompt.learn("my_switch#")
+
+    def test_the_output_is_complete_once_every_command_was_echoed_and_a_prompt_ends_it(self):
+        batch = BatchOutput(["first", "second"], self.prompt)
+
+        assert_that(batch.feed("first\nFirst output\nmy_switch#"), is_(False))
+        assert_that(batch.feed("second\nSecond output\nmy_switch#"), is_(True))
+
+        assert_that(batch.split("first\nFirst output\nmy_switch#second\nSecond output\nmy_switch#"),
+                    is_([["First output"], ["Second output"]]))
+
+    def test_a_missing_echo_does_not_wait_past_the_prompt_following_the_last_command(self):
+        batch = BatchOutput(["first", "second", "third"], self.prompt)
+        output = "first\nmy_switch#sec\x08ond\nmy_switch#third\nThird output\nmy_switch#"
+
+        assert_that(batch.feed(output), is_(True))
+
+    def test_every_command_gets_the_whole_output_when_it_cannot_be_split(self):
+        batch = BatchOutput(["first", "second", "third"], self.prompt)
+        output = "first\nFirst error\nmy_switch#sec\x08ond\nmy_switch#third\nThird output\nmy_switch#"
+
+        assert_that(batch.split(output), is_([["First error", "Third output"]] * 3))
+
+    def test_an_earlier_command_repeated_last_does_not_end_the_output_early(self):
+        batch = BatchOutput(["interface 1", "exit", "interface 2", "exit"], self.prompt)
+
+        assert_that(batch.feed("interface 1\nmy_switch#exit\nmy_switch#interface 2\nmy_switch#"), is_(False))
@@ -0,0 +1,45 @@
+# Copyright 2016 Internap.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import unittest
+
+from hamcrest import assert_that, is_
+
+from netman.adapters.shell.base import Prompt
+
+
+class PromptTest(unittest.TestCase):
+
+    def test_any_line_ending_with_a_terminator_is_a_prompt_until_one_is_learned(self):
+        prompt = Prompt(('>', '#'))
+
+        assert_that(prompt.matches("whatever#"), is_(True))
+        assert_that(prompt.matches("whatever"), is_(False))
+
+    def test_a_learned_prompt_matches_only_its_hostname_in_any_mode(self):
+        prompt = Prompt(('>', '#'))
+        prompt.learn("SSH@my.switch>")
+
+        assert_that(prompt.matches("SSH@my.switch>"), is_(True))
+        assert_that(prompt.matches("SSH@my.switch#"), is_(True))
+        assert_that(prompt.matches("SSH@my.switch(config-if-e1000-1/1)#"), is_(True))
+        assert_that(prompt.matches("Port 1 #"), is_(False))
+        assert_that(prompt.matches("SSH@other>"), is_(False))
+
+    def test_the_mode_is_learned_out_of_the_hostname(self):
+        prompt = Prompt(('>', '#'))
+        prompt.learn("my_switch(config)#")
+
+        assert_that(prompt.matches("my_switch#"), is_(True))
+        assert_that(prompt.matches("my_switch(config-vlan)#"), is_(True))
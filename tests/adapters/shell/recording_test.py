@@ -0,0 +1,103 @@
+# Copyright 2016 Internap.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import functools
+import tempfile
+import unittest
+
+import mock
+from hamcrest import assert_that, equal_to, is_
+
+from netman.adapters.recording import ReplayMismatch
+from netman.adapters.shell.recording import TerminalRecording, ReplayClient
+from netman.adapters.switches.cisco import Cisco
+from netman.core.objects.switch_descriptor import SwitchDescriptor
+
+
+class ReplayClientTest(unittest.TestCase):
+
+    def setUp(self):
+        self.recording = TerminalRecording([
+            {"received": [[0.5, "\r\nmy_switch#"]]},
+            {"sent": "show running-config | begin interface\n", "received": [
+                [0.01, "show running-config | begin interface\r\n"],
+                [0.2, "interface FastEthernet0/1\r\n switchport mode access\r\n!\r\n"],
+                [0.1, "interface FastEthernet0/2\r\n shutdown\r\n!\r\nend\r\n\r\nmy_switch#"]
+            ]},
+            {"sent": "exit\n", "received": []}
+        ])
+
+    def test_a_switch_can_run_on_a_replayed_session(self):
+        switch = Cisco(SwitchDescriptor(model="cisco", hostname="my.hostname"))
+        switch.ssh = ReplayClient(self.recording)
+
+        interfaces = switch.get_interfaces()
+
+        assert_that([i.name for i in interfaces], equal_to(["FastEthernet0/1", "FastEthernet0/2"]))
+        assert_that(interfaces[1].shutdown, is_(True))
+
+    def test_a_switch_replays_a_session_through_its_shell_factory(self):
+        recording = TerminalRecording([
+            {"received": [[0, "\r\nmy_switch#"]]},
+            {"sent": "terminal length 0\nterminal width 0\n", "received": [
+                [0, "terminal length 0\r\nmy_switch#"],
+                [0, "terminal width 0\r\nmy_switch#"]
+            ]}
+        ] + self.recording.events[1:])
+        switch = Cisco(SwitchDescriptor(model="cisco", hostname="my.hostname"),
+                       shell_factory=functools.partial(ReplayClient, recording))
+
+        switch.connect()
+        interfaces = switch.get_interfaces()
+        switch.disconnect()
+
+        assert_that([i.name for i in interfaces], equal_to(["FastEthernet0/1", "FastEthernet0/2"]))
+
+    def test_a_switch_hands_its_recorder_to_the_shells_it_opens(self):
+        recording = TerminalRecording()
+        shell_factory = mock.Mock()
+        shell_factory.return_value.get_current_prompt.return_value = "my_switch#"
+        switch = Cisco(SwitchDescriptor(model="cisco", hostname="my.hostname", username="user", password="pass"),
+                       shell_factory=shell_factory, recorder=recording)
+
+        switch.connect()
+
+        assert_that(shell_factory.call_args[1]["recorder"], is_(recording))
+
+    def test_the_recorded_delays_can_be_replayed(self):
+        with mock.patch("netman.adapters.shell.recording.time.sleep") as sleep:
+            client = ReplayClient(self.recording, delays=True)
+            client.do("show running-config | begin interface")
+
+        assert_that([c[0][0] for c in sleep.call_args_list], equal_to([0.5, 0.01, 0.2, 0.1]))
+
+    def test_sending_something_else_than_what_was_recorded_fails(self):
+        client = ReplayClient(self.recording)
+
+        with self.assertRaises(ReplayMismatch):
+            client.do("show vlan")
+
+    def test_the_recording_can_be_saved_and_loaded(self):
+        recording_file = tempfile.mktemp()
+        self.recording.save(recording_file)
+
+        assert_that(TerminalRecording.load(recording_file).events, equal_to(self.recording.events))
+
+    def test_secrets_are_not_recorded(self):
+        recording = TerminalRecording()
+        recording.hide("the_password")
+        recording.sent("enable\n")
+        recording.sent("the_password\n")
+
+        assert_that([e["sent"] for e in recording.events], equal_to(["enable\n", None]))
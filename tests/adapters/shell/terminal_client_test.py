@@ -17,13 +17,16 @@ import textwrap
 import unittest
 
 import MockSSH
-from hamcrest import equal_to, assert_that, is_, starts_with
+import paramiko
+from hamcrest import equal_to, assert_that, is_, is_not, starts_with, has_length, ends_with, greater_than
 from mock import patch, Mock
 
 from twisted.internet.protocol import Factory
 
 from netman.adapters import shell
-from netman.adapters.shell.ssh import SshClient
+from netman.adapters.memory_metrics_sink import MemoryMetricsSink
+from netman.adapters.shell.recording import TerminalRecording, ReplayClient
+from netman.adapters.shell.ssh import SshClient, SharedTransports
 from netman.adapters.shell.telnet import TelnetClient
 from netman.core.objects.exceptions import CouldNotConnect, CommandTimeout, ConnectTimeout
 from tests.adapters.shell.mock_telnet import MockTelnet
@@ -43,6 +46,11 @@ command_hello = MockSSH.ArgumentValidatingCommand(
     success_callbacks=[lambda instance: instance.writeln("Bonjour")],
     failure_callbacks=[lambda instance: instance.writeln("Nope")])
 
+command_hashes = MockSSH.ArgumentValidatingCommand(
+    name='hashes',
+    success_callbacks=[lambda instance: instance.writeln("Step 1 #"), lambda instance: instance.writeln("Done!")],
+    failure_callbacks=[lambda instance: instance.writeln("Nope")])
+
 command_hang = HangingCommand(name='hang', hang_time=1.1)
 
 command_flush = MultiAsyncWriteCommand(name='flush', count=5, interval=0.1)
@@ -59,7 +67,7 @@ command_question = KeystrokeAnsweredCommand('keystroke')
 abiguous_command = AmbiguousCommand('ambiguous')
 
 commands = [command_passwd, command_hello, command_hang, command_flush,
-            command_skips, command_exit, command_question, abiguous_command]
+            command_skips, command_exit, command_question, abiguous_command, command_hashes]
 users = {'admin': '1234'}
 
 
@@ -118,6 +126,46 @@ class TerminalClientTest(unittest.TestCase):
             "Line 5",
             ]))
 
+    def test_batch_of_commands_returns_the_output_of_each_command(self):
+        client = self.client("127.0.0.1", "admin", "1234", self.port)
+        res = client.do_batch(['hello', 'skips', 'flush', 'hello'])
+        assert_that(res, equal_to([
+            ['Bonjour'],
+            ['5 lines skipped!'],
+            ['Line 1', 'Line 2', 'Line 3', 'Line 4', 'Line 5'],
+            ['Bonjour']
+        ]))
+
+        res = client.do('hello')
+        assert_that(res, equal_to(['Bonjour']))
+
+    def test_the_output_of_a_command_can_be_read_line_by_line(self):
+        client = self.client("127.0.0.1", "admin", "1234", self.port)
+        res = client.do_iter('flush')
+        assert_that(next(res), equal_to("Line 1"))
+        assert_that(list(res), equal_to(["Line 2", "Line 3", "Line 4", "Line 5"]))
+
+        assert_that(client.get_current_prompt(), equal_to("hostname>"))
+        assert_that(client.do('hello'), equal_to(['Bonjour']))
+
+    def test_a_line_by_line_read_abandoned_early_still_consumes_the_whole_output(self):
+        client = self.client("127.0.0.1", "admin", "1234", self.port)
+        res = client.do_iter('flush')
+        assert_that(next(res), equal_to("Line 1"))
+        res.close()
+
+        assert_that(client.do('hello'), equal_to(['Bonjour']))
+
+    def test_output_lines_ending_like_a_prompt_do_not_end_the_command(self):
+        client = self.client("127.0.0.1", "admin", "1234", self.port)
+        res = client.do('hashes')
+        assert_that(res, equal_to(['Step 1 #', 'Done!']))
+
+        client.do('passwd', wait_for="Password:")
+        client.do('1234')
+        res = client.do('hashes')
+        assert_that(res, equal_to(['Step 1 #', 'Done!']))
+
     def test_empty_lines_are_filtered_out(self):
         client = self.client("127.0.0.1", "admin", "1234", self.port)
         res = client.do('skips')
@@ -164,6 +212,68 @@ class TerminalClientTest(unittest.TestCase):
             Bonjour
             hostname#""")))
 
+    def test_the_conversation_log_only_keeps_the_most_recent_output(self):
+        client = self.client("127.0.0.1", "admin", "1234", self.port, transcript_size=12)
+        client.do('hello')
+
+        client.quit('exit')
+
+        assert_that(client.full_log, has_length(12))
+        assert_that(client.full_log, ends_with("\nhostname>"))
+
+    def test_the_complete_conversation_can_be_spilled_to_a_file(self):
+        transcript_file = tempfile.mktemp()
+        client = self.client("127.0.0.1", "admin", "1234", self.port, transcript_size=12,
+                             transcript_file=transcript_file)
+        client.do('hello')
+
+        client.quit('exit')
+
+        with open(transcript_file) as f:
+            assert_that(f.read().replace("\r\n", "\n"), equal_to(textwrap.dedent("""\
+                hostname>hello
+                Bonjour
+                hostname>""")))
+
+    def test_command_timings_are_reported_by_command_verb(self):
+        sink = MemoryMetricsSink()
+        client = self.client("127.0.0.1", "admin", "1234", self.port, metrics_sink=sink,
+                             metrics_tags=dict(model="test"))
+        client.do('passwd', wait_for="Password:")
+        client.do('1234')
+        client.do('hello')
+        client.do('hello')
+
+        timings = {(name, tags.get("command")): histogram for name, tags, histogram in sink.histograms()}
+        assert_that(timings[("shell.connect.duration", None)].count, is_(1))
+        assert_that(timings[("shell.command.duration", "hello")].count, is_(2))
+        assert_that(timings[("shell.command.time_to_first_byte", "hello")].count, is_(2))
+        assert_that(timings[("shell.command.bytes_received", "hello")].min, greater_than(0))
+        assert_that(timings[("shell.command.duration", "passwd")].count, is_(1))
+        assert_that(timings[("shell.command.duration", "<reply>")].count, is_(1))
+
+    def test_a_recorded_session_can_be_replayed(self):
+        recording = TerminalRecording()
+        client = self.client("127.0.0.1", "admin", "1234", self.port, recorder=recording)
+        client.do('passwd', wait_for="Password:")
+        client.do('1234')
+        recorded = [client.do('hello'), client.do_batch(['skips', 'hello']), list(client.do_iter('flush'))]
+        client.quit('exit')
+
+        recording_file = tempfile.mktemp()
+        recording.save(recording_file)
+
+        replay = ReplayClient(TerminalRecording.load(recording_file))
+        replay.do('passwd', wait_for="Password:")
+        replay.do('anything')
+        replayed = [replay.do('hello'), replay.do_batch(['skips', 'hello']), list(replay.do_iter('flush'))]
+        replay.quit('exit')
+
+        assert_that(replayed, equal_to(recorded))
+        assert_that(replay.get_current_prompt(), equal_to("hostname#"))
+        assert_that([event.get("sent") for event in recording.events if "sent" in event][:2],
+                    equal_to([self.newline.join(['passwd', '']), None]))
+
     def test_send_a_keystroke(self):
         client = self.client("127.0.0.1", "admin", "1234", port=self.port)
         res = client.do('keystroke', wait_for="?", include_last_line=True)
@@ -186,6 +296,31 @@ class TerminalClientTest(unittest.TestCase):
 
         assert_that(res, equal_to(['working -> done!']))
 
+    def test_a_client_where_a_command_timed_out_is_not_alive(self):
+        client = self.client("127.0.0.1", "admin", "1234", self.port, command_timeout=1)
+        client.do('passwd', wait_for="Password:")
+        client.do('1234')
+        with self.assertRaises(CommandTimeout):
+            client.do('hang')
+
+        assert_that(client.failed, is_(True))
+        assert_that(client.is_alive(), is_(False))
+
+    def test_probing_a_connection_does_not_wait_for_the_command_timeout(self):
+        client = self.client("127.0.0.1", "admin", "1234", self.port, command_timeout=300)
+        probed_with = []
+
+        def do(command):
+            probed_with.append(client.command_timeout)
+            raise CommandTimeout(client.prompt, "")
+
+        with patch.object(client, 'do', Mock(side_effect=do)):
+            with self.assertRaises(CommandTimeout):
+                client.is_alive(timeout=2)
+
+        assert_that(probed_with, equal_to([2]))
+        assert_that(client.command_timeout, is_(300))
+
     def _get_some_credentials(self):
         return {'host': "host.com", 'username': "user", 'password': "pass"}
 
@@ -195,6 +330,7 @@ class SshClientTest(TerminalClientTest):
 
     client = SshClient
     port = 10010
+    newline = "\n"
 
     @patch('netman.adapters.shell.ssh.SshClient._open_channel')
     def test_changing_default_connect_timeout(self, open_channel_method_mock):
@@ -220,12 +356,66 @@ class SshClientTest(TerminalClientTest):
         ssh2 = SshClient(**self._get_some_credentials())
         self.assertEqual(600, ssh2.command_timeout)
 
+    def test_a_responsive_connection_is_alive(self):
+        client = SshClient("127.0.0.1", "admin", "1234", self.port, command_timeout=300)
+
+        assert_that(client.is_alive(), is_(True))
+        assert_that(client.command_timeout, is_(300))
+
+    def test_a_client_away_from_its_exec_prompt_is_not_alive(self):
+        client = SshClient("127.0.0.1", "admin", "1234", self.port)
+        client.exec_prompt = "hostname(config)#"
+
+        assert_that(client.is_alive(), is_(False))
+
+    def test_output_lines_ending_like_a_prompt_do_not_end_the_command_when_read_byte_by_byte(self):
+        client = SshClient("127.0.0.1", "admin", "1234", self.port, reading_chunk_size=1)
+        res = client.do('hashes')
+        assert_that(res, equal_to(['Step 1 #', 'Done!']))
+
+    def test_shell_channels_can_share_one_authenticated_transport(self):
+        transports = SharedTransports()
+        first = SshClient("127.0.0.1", "admin", "1234", self.port, shared_transports=transports)
+        second = SshClient("127.0.0.1", "admin", "1234", self.port, shared_transports=transports)
+
+        assert_that(second.client, is_(first.client))
+        assert_that(first.do('hello'), equal_to(['Bonjour']))
+        assert_that(second.do('hello'), equal_to(['Bonjour']))
+
+        first.quit('exit')
+        assert_that(second.do('hello'), equal_to(['Bonjour']))
+        assert_that(second.client.get_transport().is_active(), is_(True))
+
+        second.quit('exit')
+        assert_that(second.client.get_transport(), is_(None))
+
+    def test_a_device_refusing_more_channels_gets_a_new_connection(self):
+        transports = SharedTransports()
+        first = SshClient("127.0.0.1", "admin", "1234", self.port, shared_transports=transports)
+
+        with patch.object(first.client, 'invoke_shell', Mock(side_effect=paramiko.ChannelException(1, "refused"))):
+            second = SshClient("127.0.0.1", "admin", "1234", self.port, shared_transports=transports)
+
+        assert_that(second.client, is_not(first.client))
+        assert_that(second.do('hello'), equal_to(['Bonjour']))
+
+    @patch('netman.adapters.shell.ssh.SshClient._open_channel', Mock())
+    def test_a_closed_channel_fails_without_waiting_for_the_command_timeout(self):
+        ssh = SshClient(**self._get_some_credentials())
+        ssh.channel = Mock(closed=True, eof_received=True)
+        ssh.channel.recv_ready.return_value = False
+        ssh.channel.recv.return_value = ''
+
+        with self.assertRaises(CommandTimeout):
+            ssh.do('hello')
+
 
 class TelnetClientTest(TerminalClientTest):
     __test__ = True
 
     client = TelnetClient
     port = 10011
+    newline = "\r\n"
 
     @patch('netman.adapters.shell.telnet._connect')
     @patch('netman.adapters.shell.telnet.TelnetClient._login', Mock())
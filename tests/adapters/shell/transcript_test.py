@@ -0,0 +1,38 @@
+# Copyright 2016 Internap.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import unittest
+
+from hamcrest import assert_that, is_
+
+from netman.adapters.shell.base import Transcript
+
+
+class TranscriptTest(unittest.TestCase):
+    def test_keeps_only_the_most_recent_output_within_its_size(self):
+        transcript = Transcript(max_size=10)
+
+        transcript.append("first ")
+        transcript.append("second")
+
+        assert_that(str(transcript), is_("rst second"))
+
+    def test_clear_forgets_everything_appended_so_far(self):
+        transcript = Transcript()
+        transcript.append("previous borrower output")
+
+        transcript.clear()
+        transcript.append("mine")
+
+        assert_that(str(transcript), is_("mine"))
@@ -108,7 +108,7 @@ class BrocadeTest(unittest.TestCase):
         assert_that(str(expect.exception), equal_to("Vlan 1234 not found"))
 
     def test_get_vlans(self):
-        self.shell_mock.should_receive("do").with_args("show running-config vlan | begin vlan").once().ordered().and_return([
+        self.shell_mock.should_receive("do_iter").with_args("show running-config vlan | begin vlan").once().ordered().and_return([
             "vlan 1 name DEFAULT-VLAN",
             ""
             " no untagged ethe 1/1 ethe 1/3 to 1/22",
@@ -126,7 +126,7 @@ class BrocadeTest(unittest.TestCase):
             "!"
         ])
 
-        self.shell_mock.should_receive("do").with_args("show running-config interface").once()\
+        self.shell_mock.should_receive("do_iter").with_args("show running-config interface").once()\
             .ordered().and_return([
                 'interface ve 428',
                 ' port-name "My Awesome Port Name"',
@@ -589,7 +589,7 @@ class BrocadeTest(unittest.TestCase):
         self.shell_mock.should_receive("do").with_args("show vlan ethernet 1/4").once().ordered().and_return([])
 
         self.shell_mock.should_receive("do").with_args("configure terminal").once().ordered().and_return([])
-        self.shell_mock.should_receive("do").with_args("no interface ethernet 1/4").once().ordered().and_return([])
+        self.shell_mock.should_receive("do").with_args("no interface ethernet 1/4").and_return([]).once().ordered()
         self.shell_mock.should_receive("do").with_args("exit").once().ordered()
 
         self.switch.reset_interface("ethernet 1/4")
@@ -621,13 +621,12 @@ class BrocadeTest(unittest.TestCase):
                                                                                              'VLAN: 1201  Tagged'])
 
         self.shell_mock.should_receive("do").with_args("configure terminal").once().ordered().and_return([])
-        self.shell_mock.should_receive("do").with_args("vlan 1200").once().ordered().and_return([])
-        self.shell_mock.should_receive("do").with_args("no untagged ethernet 1/4").once().ordered().and_return([])
-        self.shell_mock.should_receive("do").with_args("vlan 1201").once().ordered().and_return([])
-        self.shell_mock.should_receive("do").with_args("no tagged ethernet 1/4").once().ordered().and_return([])
+        self.shell_mock.should_receive("do").with_args("vlan 1200").and_return([]).once().ordered()
+        self.shell_mock.should_receive("do").with_args("no untagged ethernet 1/4").and_return([]).once().ordered()
+        self.shell_mock.should_receive("do").with_args("vlan 1201").and_return([]).once().ordered()
+        self.shell_mock.should_receive("do").with_args("no tagged ethernet 1/4").and_return([]).once().ordered()
         self.shell_mock.should_receive("do").with_args("exit").and_return([]).once().ordered()
-
-        self.shell_mock.should_receive("do").with_args("no interface ethernet 1/4").once().ordered().and_return([])
+        self.shell_mock.should_receive("do").with_args("no interface ethernet 1/4").and_return([]).once().ordered()
         self.shell_mock.should_receive("do").with_args("exit").and_return([]).once().ordered()
 
         self.switch.reset_interface("ethernet 1/4")
@@ -692,7 +691,8 @@ class BrocadeTest(unittest.TestCase):
         self.shell_mock.should_receive("do").with_args("no tagged ethernet 1/4").and_return([]).once().ordered()
         self.shell_mock.should_receive("do").with_args("vlan 300").and_return([]).once().ordered()
         self.shell_mock.should_receive("do").with_args("no untagged ethernet 1/4").and_return([]).once().ordered()
-        self.shell_mock.should_receive("do").with_args("exit").and_return([]).twice().ordered().ordered()
+        self.shell_mock.should_receive("do").with_args("exit").and_return([]).once().ordered()
+        self.shell_mock.should_receive("do").with_args("exit").and_return([]).once().ordered()
 
         self.switch.set_access_mode("ethernet 1/4")
 
@@ -1476,7 +1476,7 @@ class BrocadeTest(unittest.TestCase):
         assert_that(str(expect.exception), equal_to("Vlan 2500 not found"))
 
     def test_get_interfaces(self):
-        self.shell_mock.should_receive("do").with_args("show interfaces").once().ordered().and_return([
+        self.shell_mock.should_receive("do_iter").with_args("show interfaces").once().ordered().and_return([
             "GigabitEthernet1/1 is down, line protocol is down",
             "  Hardware is GigabitEthernet, address is 0000.0000.0000 (bia 0000.0000.0000,",
             "  Member of VLAN 1999 (untagged), port is in untagged mode, port state is Disabled",
@@ -1517,7 +1517,7 @@ class BrocadeTest(unittest.TestCase):
             "  Internet address is 108.163.134.4/32, IP MTU 1500 bytes, encapsulation LOOPBACK"
         ])
 
-        self.shell_mock.should_receive("do").with_args("show running-config vlan").once().ordered().and_return([
+        self.shell_mock.should_receive("do_iter").with_args("show running-config vlan").once().ordered().and_return([
             "spanning-tree",
             "!",
             "vlan 1 name DEFAULT-VLAN",
@@ -1583,29 +1583,13 @@ class BrocadeTest(unittest.TestCase):
             "  Port name is hello"
         ])
 
-        self.shell_mock.should_receive("do").with_args("show running-config vlan").once().ordered().and_return([
-            "spanning-tree",
-            "!",
-            "vlan 1 name DEFAULT-VLAN",
-            " no untagged ethe 1/3",
-            "!",
-            "vlan 100",
-            " tagged ethe 1/2 ethe 1/4 to 1/6",
-            "!",
-            "vlan 200",
-            " tagged ethe 1/2",
-            "!",
-            "vlan 300",
-            " tagged ethe 1/2",
-            "!",
-            "vlan 1999",
-            " untagged ethe 1/1",
-            "!",
-            "vlan 2999",
-            " untagged ethe 1/2",
-            "!",
-            "!"
+        self.shell_mock.should_receive("do").with_args("show vlan ethernet 1/2").once().ordered().and_return([
+            "VLAN: 100  Tagged",
+            "VLAN: 200  Tagged",
+            "VLAN: 300  Tagged",
+            "VLAN: 2999  Untagged",
         ])
+        self.shell_mock.should_receive("do_iter").with_args("show running-config vlan").never()
 
         interface = self.switch.get_interface("ethernet 1/2")
 
@@ -1616,13 +1600,64 @@ class BrocadeTest(unittest.TestCase):
         assert_that(interface.trunk_native_vlan, equal_to(2999))
         assert_that(interface.trunk_vlans, equal_to([100, 200, 300]))
 
+    def test_get_interface_in_the_default_vlan(self):
+        self.shell_mock.should_receive("do").with_args("show interfaces ethernet 1/3").once().ordered().and_return([
+            "GigabitEthernet1/3 is down, line protocol is down",
+            "  Hardware is GigabitEthernet, address is 0000.0000.0000 (bia 0000.0000.0000,",
+            "  Member of VLAN 1 (untagged), port is in untagged mode, port state is Disabled",
+        ])
+        self.shell_mock.should_receive("do").with_args("show vlan ethernet 1/3").once().ordered().and_return([
+            "VLAN: 1  Untagged",
+        ])
+
+        interface = self.switch.get_interface("ethernet 1/3")
+
+        assert_that(interface.port_mode, equal_to(ACCESS))
+        assert_that(interface.access_vlan, equal_to(None))
+        assert_that(interface.trunk_native_vlan, equal_to(None))
+        assert_that(interface.trunk_vlans, equal_to([]))
+
+    def test_get_interface_and_get_interfaces_agree_on_a_port_untagged_in_the_default_vlan(self):
+        self.shell_mock.should_receive("do").with_args("show interfaces ethernet 1/3").once().ordered().and_return([
+            "GigabitEthernet1/3 is down, line protocol is down",
+            "  Hardware is GigabitEthernet, address is 0000.0000.0000 (bia 0000.0000.0000,",
+            "  Member of VLAN 1 (untagged), 1 L2 VLANS (tagged), port is in dual mode, port state is Disabled",
+        ])
+        self.shell_mock.should_receive("do").with_args("show vlan ethernet 1/3").once().ordered().and_return([
+            "VLAN: 1  Untagged",
+            "VLAN: 100  Tagged",
+        ])
+        self.shell_mock.should_receive("do_iter").with_args("show interfaces").once().ordered().and_return([
+            "GigabitEthernet1/3 is down, line protocol is down",
+            "  Hardware is GigabitEthernet, address is 0000.0000.0000 (bia 0000.0000.0000,",
+            "  Member of VLAN 1 (untagged), 1 L2 VLANS (tagged), port is in dual mode, port state is Disabled",
+        ])
+        self.shell_mock.should_receive("do_iter").with_args("show running-config vlan").once().ordered().and_return([
+            "vlan 1 name DEFAULT-VLAN",
+            " untagged ethe 1/3",
+            "!",
+            "vlan 100",
+            " tagged ethe 1/3",
+            "!",
+            "!"
+        ])
+
+        interface = self.switch.get_interface("ethernet 1/3")
+        from_all_interfaces, = self.switch.get_interfaces()
+
+        for found in (interface, from_all_interfaces):
+            assert_that(found.port_mode, equal_to(TRUNK))
+            assert_that(found.access_vlan, equal_to(None))
+            assert_that(found.trunk_native_vlan, equal_to(None))
+            assert_that(found.trunk_vlans, equal_to([100]))
+
     def test_get_nonexistent_interface_raises(self):
         self.shell_mock.should_receive("do").with_args("show interfaces ethernet 1/1999").once().ordered().and_return([
             "Invalid input -> 1/1999",
             "Type ? for a list"
         ])
 
-        self.shell_mock.should_receive("do").with_args("show running-config vlan").never()
+        self.shell_mock.should_receive("do").with_args("show vlan ethernet 1/1999").never()
 
         with self.assertRaises(UnknownInterface) as expect:
             self.switch.get_interface("ethernet 1/1999")
@@ -2112,7 +2147,7 @@ class BrocadeTest(unittest.TestCase):
 
         self.shell_mock = flexmock()
         ssh_client_class_mock.return_value = self.shell_mock
-        self.shell_mock.should_receive("get_current_prompt").and_return("hostname>").once().ordered()
+        self.shell_mock.should_receive("get_current_prompt").and_return("hostname>").and_return("hostname#").twice()
         self.shell_mock.should_receive("do").with_args("enable", wait_for=":").and_return([]).once().ordered()
         self.shell_mock.should_receive("do").with_args("the_password").and_return([]).once().ordered()
         self.shell_mock.should_receive("do").with_args("skip-page-display").and_return([]).once().ordered()
@@ -2123,6 +2158,7 @@ class BrocadeTest(unittest.TestCase):
             host="my.hostname",
             username="the_user",
             password="the_password",
+            metrics_tags=dict(model="brocade"),
             port=22
         )
 
@@ -2133,7 +2169,7 @@ class BrocadeTest(unittest.TestCase):
 
         self.shell_mock = flexmock()
         telnet_client_class_mock.return_value = self.shell_mock
-        self.shell_mock.should_receive("get_current_prompt").and_return("hostname>").once().ordered()
+        self.shell_mock.should_receive("get_current_prompt").and_return("hostname>").and_return("hostname#").twice()
         self.shell_mock.should_receive("do").with_args("enable", wait_for=":").and_return([]).once().ordered()
         self.shell_mock.should_receive("do").with_args("the_password").and_return([]).once().ordered()
         self.shell_mock.should_receive("do").with_args("skip-page-display").and_return([]).once().ordered()
@@ -2143,7 +2179,8 @@ class BrocadeTest(unittest.TestCase):
         telnet_client_class_mock.assert_called_with(
             host="my.hostname",
             username="the_user",
-            password="the_password"
+            password="the_password",
+            metrics_tags=dict(model="brocade")
         )
 
     @mock.patch("netman.adapters.switches.brocade.SshClient")
@@ -2152,7 +2189,7 @@ class BrocadeTest(unittest.TestCase):
 
         self.shell_mock = flexmock()
         ssh_client_class_mock.return_value = self.shell_mock
-        self.shell_mock.should_receive("get_current_prompt").and_return("hostname#").once().ordered()
+        self.shell_mock.should_receive("get_current_prompt").and_return("hostname#").twice()
         self.shell_mock.should_receive("do").with_args("enable", wait_for=": ").never()
         self.shell_mock.should_receive("do").with_args("skip-page-display").and_return([]).once().ordered()
 
@@ -2162,6 +2199,7 @@ class BrocadeTest(unittest.TestCase):
             host="my.hostname",
             username="the_user",
             password="the_password",
+            metrics_tags=dict(model="brocade"),
             port=8000
         )
 
@@ -2170,10 +2208,11 @@ class BrocadeTest(unittest.TestCase):
         self.switch.logger = logger
         logger.should_receive("debug")
 
-
+        self.shell_mock.failed = False
         self.shell_mock.should_receive("quit").with_args("exit").once().ordered()
 
-        logger.should_receive("info").with_args("FULL TRANSACTION LOG").once()
+        logger.should_receive("debug").with_args("FULL TRANSACTION LOG").once()
+        logger.should_receive("info").never()
 
         self.switch.shell.full_log = "FULL TRANSACTION LOG"
         self.switch.disconnect()
@@ -0,0 +1,87 @@
+# Copyright 2016 Internap.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Compares the single pass running config parser with matching every line against each pattern in turn
+
+python -m tests.adapters.switches.cisco_running_config_benchmark [lines]
+"""
+
+import sys
+import timeit
+
+from netman import regex
+from netman.adapters.switches.cisco import parse_running_config
+from netman.adapters.switches.util import split_on_bang
+
+
+def synthetic_running_config(line_count):
+    lines = ["version 12.1", "!", "hostname my_switch", "!"]
+    number = 0
+    while len(lines) < line_count:
+        number += 1
+        lines += [
+            "vlan {}".format(number),
+            " name VLAN_{}".format(number),
+            "!",
+            "interface GigabitEthernet1/0/{}".format(number),
+            " description uplink {}".format(number),
+            " switchport trunk native vlan {}".format(number),
+            " switchport trunk allowed vlan 1-{}".format(number),
+            " switchport mode trunk",
+            "!",
+            "interface Vlan{}".format(number),
+            " ip address 10.{}.{}.1 255.255.255.0".format(number // 256 % 256, number % 256),
+            " ip access-group ACL-IN in",
+            " standby 1 ip 10.{}.{}.2".format(number // 256 % 256, number % 256),
+            " standby 1 priority 110",
+            " ip helper-address 10.10.10.1",
+            " no ip redirects",
+            "!",
+        ]
+    return lines + ["end"]
+
+
+def pattern_by_pattern(lines):
+    interfaces = vlans = 0
+    for section in split_on_bang(lines):
+        for line in section:
+            if regex.match("interface (\w*Ethernet[^\s]*)", line) or regex.match("interface (Port-channel[^\s]*)", line):
+                interfaces += 1
+            elif regex.match("^vlan (\d+)", line):
+                vlans += 1
+            regex.match(" switchport mode (.*)", line)
+            regex.match(" switchport access vlan (\d*)", line)
+            regex.match(" switchport trunk native vlan (\d*)", line)
+            regex.match(" switchport trunk allowed vlan (.*)", line)
+            regex.match(" shutdown", line)
+            regex.match("^ name ([^\s]*)", line)
+            (regex.match("^ ip address ([^\s]*) ([^\s]*)(.*)", line)
+             or regex.match("^ ip access-group ([^\s]*) ([^\s]*).*", line)
+             or regex.match("^ ip vrf forwarding ([^\s]*).*", line)
+             or regex.match("^ standby ([^\s]*)(.*)", line)
+             or regex.match("^ ip helper-address ([^\s]*)", line)
+             or regex.match("^ no ip redirects", line))
+    return interfaces, vlans
+
+
+def main(line_count=10000, repeat=5):
+    lines = synthetic_running_config(line_count)
+    for name, parse in [("pattern by pattern", pattern_by_pattern), ("single pass", parse_running_config)]:
+        best = min(timeit.repeat(lambda: parse(lines), number=1, repeat=repeat))
+        print("{:<20} {:>8.1f} ms for {} lines".format(name, best * 1000, len(lines)))
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
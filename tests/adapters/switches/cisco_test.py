@@ -20,11 +20,12 @@ from hamcrest import assert_that, has_length, equal_to, is_, instance_of, none,
 from netaddr import IPNetwork
 from netaddr.ip import IPAddress
 
+from netman.adapters.connection_pool import ConnectionPool
 from netman.adapters.switches import cisco
-from netman.adapters.switches.cisco import Cisco, parse_vlan_ranges
+from netman.adapters.switches.cisco import Cisco, parse_vlan_ranges, parse_running_config
 from netman.adapters.switches.util import SubShell
 from netman.core.objects.access_groups import IN, OUT
-from netman.core.objects.exceptions import IPNotAvailable, UnknownVlan, UnknownIP, UnknownAccessGroup, BadVlanNumber, \
+from netman.core.objects.exceptions import CommandTimeout, IPNotAvailable, UnknownVlan, UnknownIP, UnknownAccessGroup, BadVlanNumber, \
     BadVlanName, UnknownInterface, UnknownVrf, VlanVrfNotSet, IPAlreadySet, BadVrrpGroupNumber, \
     BadVrrpPriorityNumber, VrrpDoesNotExistForVlan, VrrpAlreadyExistsForVlan, BadVrrpTimers, \
     BadVrrpTracking, DhcpRelayServerAlreadyExists, UnknownDhcpRelayServer, VlanAlreadyExist, \
@@ -66,52 +67,40 @@ class CiscoTest(unittest.TestCase):
         assert_that(self.switch.logger.name, is_(Cisco.__module__ + ".my.hostname"))
 
     def test_get_vlans(self):
-        self.mocked_ssh_client.should_receive("do").with_args("show vlan brief").once().ordered().and_return([
-            "VLAN Name                             Status    Ports",
-            "---- -------------------------------- --------- -------------------------------",
-            "1    default                          active    Fa0/2, Fa0/3, Fa0/4",
-            "2222 your-name-is-way-too-long-for-th active",
-            "2500 no-ip                            active",
-            "2998 VLAN2998                         active    Fa0/1",
-            "3333 some-name                        active",
-        ])
-
-        self.mocked_ssh_client.should_receive("do").with_args("show ip interface").once().ordered().and_return([
-            "Vlan2222 is down, line protocol is down",
-            "  Internet protocol processing disabled",
-            "Vlan2500 is down, line protocol is down",
-            "  Internet protocol processing disabled",
-            "Vlan2723 is down, line protocol is down",
-            "  Internet protocol processing disabled",
-            "Vlan2998 is down, line protocol is down",
-            "  Internet protocol processing disabled",
-            "GigabitEthernet1/0/1 is up, line protocol is up",
-            "  Inbound  access list is not set"
-        ])
-
-        self.mocked_ssh_client.should_receive("do").with_args("show running-config interface vlan 2222").once().ordered().and_return([
+        self.mocked_ssh_client.should_receive("do_iter").with_args("show running-config").once().ordered().and_return([
             "Building configuration...",
-            "Current configuration : 41 bytes",
+            "",
+            "Current configuration : 2123 bytes",
+            "!",
+            "version 12.2",
+            "!",
+            "hostname my_switch",
+            "!",
+            "vlan 2222",
+            " name your-name-is-way-too-long-for-this-switch",
+            "!",
+            "vlan 2500",
+            " name no-ip",
+            "!",
+            "vlan 2998",
+            "!",
+            "vlan 3333",
+            " name some-name",
+            "!",
+            "interface FastEthernet0/1",
+            " switchport access vlan 2998",
+            " switchport mode access",
             "!",
             "interface Vlan2222",
             " no ip address",
-            "end"
-        ])
-
-        self.mocked_ssh_client.should_receive("do").with_args("show running-config interface vlan 2500").once().ordered().and_return([
-            "Building configuration...",
-            "Current configuration : 41 bytes",
             "!",
             "interface Vlan2500",
             " ip access-group SHIZZLE in",
             " ip access-group WHIZZLE out",
             " ip vrf forwarding BLAH",
-            "end"
-        ])
-
-        self.mocked_ssh_client.should_receive("do").with_args("show running-config interface vlan 2998").once().ordered().and_return([
-            "Building configuration...",
-            "Current configuration : 41 bytes",
+            "!",
+            "interface Vlan2723",
+            " no ip address",
             "!",
             "interface Vlan2998",
             " ip vrf forwarding patate",
@@ -129,19 +118,31 @@ class CiscoTest(unittest.TestCase):
             " standby 1 track 101 decrement 50",
             " ip helper-address 10.10.10.1",
             " ip helper-address 10.10.10.2",
+            "!",
+            "line con 0",
             "end"
         ])
+        self.mocked_ssh_client.should_receive("do").with_args("show vlan brief").once().ordered().and_return([
+            "VLAN Name                             Status    Ports",
+            "---- -------------------------------- --------- -------------------------------",
+            "1    default                          active    Fa0/2, Fa0/3, Fa0/4",
+            "2222 your-name-is-way-too-long-for-th active",
+            "2500 no-ip                            active",
+            "2998 VLAN2998                         active    Fa0/1",
+            "3333 some-name                        active",
+            "3500 learned-from-vtp                 active",
+        ])
 
         vlan_list = self.switch.get_vlans()
         vlan_list = sorted(vlan_list, key=lambda x: x.number)
 
-        assert_that(vlan_list, has_length(5))
+        assert_that(vlan_list, has_length(6))
         assert_that(vlan_list[0].number, equal_to(1))
         assert_that(vlan_list[0].name, equal_to("default"))
         assert_that(len(vlan_list[0].ips), equal_to(0))
 
         assert_that(vlan_list[1].number, equal_to(2222))
-        assert_that(vlan_list[1].name, equal_to("your-name-is-way-too-long-for-th"))
+        assert_that(vlan_list[1].name, equal_to("your-name-is-way-too-long-for-this-switch"))
         assert_that(vlan_list[1].vrf_forwarding, equal_to(None))
         assert_that(vlan_list[1].access_groups[IN], equal_to(None))
         assert_that(vlan_list[1].access_groups[OUT], equal_to(None))
@@ -191,6 +192,9 @@ class CiscoTest(unittest.TestCase):
         assert_that(vlan_list[4].access_groups[IN], equal_to(None))
         assert_that(vlan_list[4].access_groups[OUT], equal_to(None))
 
+        assert_that(vlan_list[5].number, equal_to(3500))
+        assert_that(vlan_list[5].name, equal_to("learned-from-vtp"))
+
     def test_get_vlan_with_no_interface(self):
         self.mocked_ssh_client.should_receive("do").with_args("show running-config vlan 1750 | begin vlan").and_return([
             "vlan 1750",
@@ -311,7 +315,7 @@ class CiscoTest(unittest.TestCase):
             "% Invalid input detected at '^' marker."
         ])
 
-        self.mocked_ssh_client.should_receive("do").with_args("show running-config | begin interface").and_return([
+        self.mocked_ssh_client.should_receive("do_iter").with_args("show running-config | begin interface").and_return([
             "interface FastEthernet0/16",
             " switchport access vlan 900",
             " switchport mode access",
@@ -429,8 +433,13 @@ class CiscoTest(unittest.TestCase):
             "Enter configuration commands, one per line.  End with CNTL/Z."
         ])
 
-        self.mocked_ssh_client.should_receive("do").with_args("no interface vlan 2999").and_return([]).once().ordered()
-        self.mocked_ssh_client.should_receive("do").with_args("no vlan 2999").and_return([]).once().ordered()
+        self.mocked_ssh_client.should_receive("do_batch").with_args([
+            "no interface vlan 2999",
+            "no vlan 2999"
+        ]).and_return([
+            [],
+            []
+        ]).once().ordered()
         self.mocked_ssh_client.should_receive("do").with_args("exit").and_return([]).once().ordered()
 
         self.switch.remove_vlan(2999)
@@ -451,11 +460,16 @@ class CiscoTest(unittest.TestCase):
         self.mocked_ssh_client.should_receive("do").with_args("configure terminal").once().ordered().and_return([
             "Enter configuration commands, one per line.  End with CNTL/Z."
         ])
-        self.mocked_ssh_client.should_receive("do").with_args("no interface vlan 2999").once().ordered().and_return([
-            "                                     ^",
-            "% Invalid input detected at '^' marker."
-        ])
-        self.mocked_ssh_client.should_receive("do").with_args("no vlan 2999").and_return([]).once().ordered()
+        self.mocked_ssh_client.should_receive("do_batch").with_args([
+            "no interface vlan 2999",
+            "no vlan 2999"
+        ]).and_return([
+            [
+                "                                     ^",
+                "% Invalid input detected at '^' marker."
+            ],
+            []
+        ]).once().ordered()
         self.mocked_ssh_client.should_receive("do").with_args("exit").and_return([]).once().ordered()
 
         self.switch.remove_vlan(2999)
@@ -491,7 +505,7 @@ class CiscoTest(unittest.TestCase):
         assert_that(str(expect.exception), equal_to("Unknown interface SlowEthernet42/9999"))
 
     def test_get_interfaces(self):
-        self.mocked_ssh_client.should_receive("do").with_args("show running-config | begin interface").once().ordered().and_return([
+        self.mocked_ssh_client.should_receive("do_iter").with_args("show running-config | begin interface").once().ordered().and_return([
             "interface FastEthernet0/1",
             "!",
             "interface FastEthernet0/2",
@@ -1852,11 +1866,16 @@ class CiscoTest(unittest.TestCase):
 
         self.mocked_ssh_client = flexmock()
         ssh_client_class_mock.return_value = self.mocked_ssh_client
-        self.mocked_ssh_client.should_receive("get_current_prompt").and_return("hostname>").once().ordered()
+        self.mocked_ssh_client.should_receive("get_current_prompt").and_return("hostname>").and_return("hostname#").twice()
         self.mocked_ssh_client.should_receive("do").with_args("enable", wait_for=": ").and_return([]).once().ordered()
         self.mocked_ssh_client.should_receive("do").with_args("the_password").and_return([]).once().ordered()
-        self.mocked_ssh_client.should_receive("do").with_args("terminal length 0").and_return([]).once().ordered()
-        self.mocked_ssh_client.should_receive("do").with_args("terminal width 0").and_return([]).once().ordered()
+        self.mocked_ssh_client.should_receive("do_batch").with_args([
+            "terminal length 0",
+            "terminal width 0"
+        ]).and_return([
+            [],
+            []
+        ]).once().ordered()
 
         self.switch.connect()
 
@@ -1864,6 +1883,7 @@ class CiscoTest(unittest.TestCase):
             host="my.hostname",
             username="the_user",
             password="the_password",
+            metrics_tags=dict(model="cisco"),
             port=22
         )
 
@@ -1873,18 +1893,24 @@ class CiscoTest(unittest.TestCase):
 
         self.mocked_ssh_client = flexmock()
         ssh_client_class_mock.return_value = self.mocked_ssh_client
-        self.mocked_ssh_client.should_receive("get_current_prompt").and_return("hostname>").once().ordered()
+        self.mocked_ssh_client.should_receive("get_current_prompt").and_return("hostname>").and_return("hostname#").twice()
         self.mocked_ssh_client.should_receive("do").with_args("enable", wait_for=": ").and_return([]).once().ordered()
         self.mocked_ssh_client.should_receive("do").with_args("the_password").and_return([]).once().ordered()
-        self.mocked_ssh_client.should_receive("do").with_args("terminal length 0").and_return([]).once().ordered()
-        self.mocked_ssh_client.should_receive("do").with_args("terminal width 0").and_return([]).once().ordered()
+        self.mocked_ssh_client.should_receive("do_batch").with_args([
+            "terminal length 0",
+            "terminal width 0"
+        ]).and_return([
+            [],
+            []
+        ]).once().ordered()
 
         self.switch.connect()
 
         ssh_client_class_mock.assert_called_with(
             host="my.hostname",
             username="the_user",
-            password="the_password"
+            password="the_password",
+            metrics_tags=dict(model="cisco")
         )
 
     @mock.patch("netman.adapters.switches.cisco.SshClient")
@@ -1893,10 +1919,15 @@ class CiscoTest(unittest.TestCase):
 
         self.mocked_ssh_client = flexmock()
         ssh_client_class_mock.return_value = self.mocked_ssh_client
-        self.mocked_ssh_client.should_receive("get_current_prompt").and_return("hostname#").once().ordered()
+        self.mocked_ssh_client.should_receive("get_current_prompt").and_return("hostname#").twice()
         self.mocked_ssh_client.should_receive("do").with_args("enable", wait_for=": ").never()
-        self.mocked_ssh_client.should_receive("do").with_args("terminal length 0").and_return([]).once().ordered()
-        self.mocked_ssh_client.should_receive("do").with_args("terminal width 0").and_return([]).once().ordered()
+        self.mocked_ssh_client.should_receive("do_batch").with_args([
+            "terminal length 0",
+            "terminal width 0"
+        ]).and_return([
+            [],
+            []
+        ]).once().ordered()
 
         self.switch.connect()
 
@@ -1904,19 +1935,95 @@ class CiscoTest(unittest.TestCase):
             host="my.hostname",
             username="the_user",
             password="the_password",
+            metrics_tags=dict(model="cisco"),
             port=8000
         )
 
+    @mock.patch("netman.adapters.switches.cisco.SshClient")
+    def test_connect_and_disconnect_with_a_connection_pool_reuses_the_logged_in_client(self, ssh_client_class_mock):
+        self.switch = Cisco(SwitchDescriptor(hostname="my.hostname", username="the_user", password="the_password", model="cisco"))
+        self.switch.connection_pool = ConnectionPool()
+
+        self.mocked_ssh_client = flexmock(failed=False)
+        ssh_client_class_mock.return_value = self.mocked_ssh_client
+        self.mocked_ssh_client.should_receive("get_current_prompt").and_return("hostname#").twice()
+        self.mocked_ssh_client.should_receive("do_batch").with_args([
+            "terminal length 0",
+            "terminal width 0"
+        ]).and_return([
+            [],
+            []
+        ]).once().ordered()
+
+        self.switch.connect()
+        self.mocked_ssh_client.full_log = "FULL TRANSACTION LOG"
+        self.mocked_ssh_client.should_receive("reset_transcript").once()
+        self.mocked_ssh_client.should_receive("quit").never()
+        self.switch.disconnect()
+
+        self.mocked_ssh_client.should_receive("is_alive").and_return(True).once().ordered()
+        self.mocked_ssh_client.should_receive("quit").never()
+
+        self.switch.connect()
+
+        assert_that(self.switch.ssh, is_(self.mocked_ssh_client))
+        assert_that(ssh_client_class_mock.call_count, is_(1))
+
+    @mock.patch("netman.adapters.switches.cisco.SshClient")
+    def test_a_pooled_session_where_a_command_timed_out_is_replaced(self, ssh_client_class_mock):
+        self.switch = Cisco(SwitchDescriptor(hostname="my.hostname", username="the_user", password="the_password", model="cisco"))
+        self.switch.connection_pool = ConnectionPool()
+
+        timed_out_client = flexmock(failed=False)
+        fresh_client = flexmock(failed=False)
+        ssh_client_class_mock.side_effect = [timed_out_client, fresh_client]
+        for client in (timed_out_client, fresh_client):
+            client.should_receive("get_current_prompt").and_return("hostname#")
+            client.should_receive("do_batch").with_args(["terminal length 0", "terminal width 0"]).and_return([[], []])
+
+        def time_out(command):
+            timed_out_client.failed = True
+            raise CommandTimeout(("#",), "")
+
+        self.switch.connect()
+        timed_out_client.should_receive("do_iter").with_args("show running-config | begin interface").replace_with(time_out)
+        with self.assertRaises(CommandTimeout):
+            self.switch.get_interfaces()
+
+        timed_out_client.should_receive("quit").with_args("exit").once()
+        timed_out_client.full_log = ""
+        self.switch.disconnect()
+
+        self.switch.connect()
+
+        assert_that(self.switch.ssh, is_(fresh_client))
+
+    def test_disconnect_with_a_connection_pool_logs_and_resets_the_transcript_before_giving_back(self):
+        logger = flexmock()
+        self.switch.logger = logger
+        self.switch.connection_pool = ConnectionPool()
+
+        mocked_ssh_client = flexmock(failed=False, full_log="FULL TRANSACTION LOG")
+        self.switch.ssh = self.switch.connection_pool.borrow(self.switch.switch_descriptor,
+                                                             open_connection=lambda: mocked_ssh_client,
+                                                             close=lambda ssh: None)
+        logger.should_receive("debug").with_args("FULL TRANSACTION LOG").once().ordered()
+        mocked_ssh_client.should_receive("reset_transcript").once().ordered()
+        mocked_ssh_client.should_receive("quit").never()
+
+        self.switch.disconnect()
+
     def test_disconnect(self):
         logger = flexmock()
         self.switch.logger = logger
         logger.should_receive("debug")
 
-        mocked_ssh_client = flexmock()
+        mocked_ssh_client = flexmock(failed=False)
         self.switch.ssh = mocked_ssh_client
         mocked_ssh_client.should_receive("quit").with_args("exit").once().ordered()
 
-        logger.should_receive("info").with_args("FULL TRANSACTION LOG").once()
+        logger.should_receive("debug").with_args("FULL TRANSACTION LOG").once()
+        logger.should_receive("info").never()
 
         self.switch.ssh.full_log = "FULL TRANSACTION LOG"
         self.switch.disconnect()
@@ -2287,7 +2394,7 @@ class CiscoTest(unittest.TestCase):
 
     def test_get_vlan_interfaces(self):
 
-        self.mocked_ssh_client.should_receive("do").with_args("show running-config | begin interface").and_return([
+        self.mocked_ssh_client.should_receive("do_iter").with_args("show running-config").and_return([
             "interface FastEthernet0/16",
             " switchport access vlan 2222",
             " switchport mode access",
@@ -2320,7 +2427,7 @@ class CiscoTest(unittest.TestCase):
         assert_that(vlan_interfaces, is_(['FastEthernet0/16', 'FastEthernet0/17', 'FastEthernet0/18', 'FastEthernet0/20']))
 
     def test_get_vlan_interfaces_unknown_vlan_raises(self):
-        self.mocked_ssh_client.should_receive("do").with_args("show running-config | begin interface").and_return([
+        self.mocked_ssh_client.should_receive("do_iter").with_args("show running-config").and_return([
             "interface FastEthernet0/16",
             " switchport access vlan 2222",
             " switchport mode access",
@@ -2348,8 +2455,11 @@ class CiscoTest(unittest.TestCase):
             "line con 0",
             "transport input ssh"
         ])
-
-        self.mocked_ssh_client.should_receive("do").with_args("show running-config vlan 1111 | begin vlan").once().ordered().and_return([
+        self.mocked_ssh_client.should_receive("do").with_args("show vlan brief").once().ordered().and_return([
+            "VLAN Name                             Status    Ports",
+            "---- -------------------------------- --------- -------------------------------",
+            "1    default                          active    Fa0/2, Fa0/3, Fa0/4",
+            "2222 VLAN2222                         active",
         ])
 
         with self.assertRaises(UnknownVlan) as expect:
@@ -2357,6 +2467,36 @@ class CiscoTest(unittest.TestCase):
 
         assert_that(str(expect.exception), equal_to("Vlan 1111 not found"))
 
+    def test_get_vlan_interfaces_of_a_vlan_without_interfaces(self):
+        self.mocked_ssh_client.should_receive("do_iter").with_args("show running-config").and_return([
+            "vlan 1111",
+            "!",
+            "interface FastEthernet0/16",
+            " switchport access vlan 2222",
+            " switchport mode access",
+            "!",
+            "end"
+        ])
+
+        assert_that(self.switch.get_vlan_interfaces(1111), is_([]))
+
+    def test_get_vlan_interfaces_of_a_vlan_known_only_to_show_vlan_brief(self):
+        self.mocked_ssh_client.should_receive("do_iter").with_args("show running-config").and_return([
+            "interface FastEthernet0/16",
+            " switchport access vlan 2222",
+            " switchport mode access",
+            "!",
+            "end"
+        ])
+        self.mocked_ssh_client.should_receive("do").with_args("show vlan brief").once().ordered().and_return([
+            "VLAN Name                             Status    Ports",
+            "---- -------------------------------- --------- -------------------------------",
+            "1    default                          active    Fa0/2, Fa0/3, Fa0/4",
+            "3500 learned-from-vtp                 active",
+        ])
+
+        assert_that(self.switch.get_vlan_interfaces(3500), is_([]))
+
     def test_set_vlan_icmp_redirects_state_enable(self):
         self.mocked_ssh_client.should_receive("do").with_args("show running-config interface vlan 1234").once().ordered().and_return([
             "Building configuration...",
@@ -2538,3 +2678,73 @@ class CiscoTest(unittest.TestCase):
             self.switch.reset_interface("WrongInterfaceName0/4")
 
         assert_that(str(expect.exception), equal_to("Unknown interface WrongInterfaceName0/4"))
+
+
+class CiscoRunningConfigTest(unittest.TestCase):
+
+    def test_interfaces_and_vlans_are_built_in_one_pass(self):
+        config = parse_running_config([
+            "version 12.1",
+            "!",
+            "hostname my_switch",
+            "!",
+            "vlan 100",
+            " name SHIZZLE",
+            "!",
+            "vlan 200-201",
+            "!",
+            "interface FastEthernet0/1",
+            " switchport access vlan 100",
+            " switchport mode access",
+            "!",
+            "interface Port-channel1",
+            " switchport trunk allowed vlan 200,201",
+            " switchport mode trunk",
+            " shutdown",
+            "!",
+            "interface Vlan100",
+            " ip address 2.1.1.1 255.255.255.0 secondary",
+            " ip address 1.1.1.1 255.255.255.0",
+            " ip access-group ACL-IN in",
+            " ip vrf forwarding DEFAULT-LAN",
+            " standby 1 ip 1.1.1.2",
+            " standby 1 priority 110",
+            " ip helper-address 10.10.10.1",
+            " no ip redirects",
+            "!",
+            "end",
+        ])
+
+        if1, if2 = config.interfaces
+        assert_that(if1.name, equal_to("FastEthernet0/1"))
+        assert_that(if1.port_mode, equal_to(ACCESS))
+        assert_that(if1.access_vlan, equal_to(100))
+        assert_that(if2.name, equal_to("Port-channel1"))
+        assert_that(if2.port_mode, equal_to(TRUNK))
+        assert_that(if2.trunk_vlans, equal_to([200, 201]))
+        assert_that(if2.shutdown, equal_to(True))
+
+        assert_that(sorted(config.vlans), equal_to([100, 200, 201]))
+        vlan100 = config.vlans[100]
+        assert_that(vlan100.name, equal_to("SHIZZLE"))
+        assert_that(vlan100.ips, equal_to([IPNetwork("1.1.1.1/24"), IPNetwork("2.1.1.1/24")]))
+        assert_that(vlan100.access_groups[IN], equal_to("ACL-IN"))
+        assert_that(vlan100.vrf_forwarding, equal_to("DEFAULT-LAN"))
+        assert_that(vlan100.vrrp_groups[0].ips, equal_to([IPAddress("1.1.1.2")]))
+        assert_that(vlan100.vrrp_groups[0].priority, equal_to(110))
+        assert_that(vlan100.dhcp_relay_servers, equal_to([IPAddress("10.10.10.1")]))
+        assert_that(vlan100.icmp_redirects, equal_to(False))
+        assert_that(config.vlans[200].name, none())
+
+    def test_lines_outside_known_sections_are_ignored(self):
+        config = parse_running_config([
+            "line vty 0 4",
+            " shutdown",
+            "interface FastEthernet0/1",
+            "router ospf 1",
+            " switchport mode trunk",
+        ])
+
+        interface, = config.interfaces
+        assert_that(interface.port_mode, equal_to(DYNAMIC))
+        assert_that(interface.shutdown, equal_to(False))
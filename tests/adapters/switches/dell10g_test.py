@@ -80,6 +80,8 @@ class Dell10GTest(unittest.TestCase):
             shell_factory=ssh_client_class_mock)
 
         self.mocked_ssh_client = flexmock()
+
+        self.mocked_ssh_client.should_receive("get_current_prompt").and_return("hostname#").once()
         ssh_client_class_mock.return_value = self.mocked_ssh_client
         self.mocked_ssh_client.should_receive("do").with_args("enable", wait_for=":").and_return([]).once().ordered()
         self.mocked_ssh_client.should_receive("do").with_args("the_password").and_return([]).once().ordered()
@@ -91,6 +93,7 @@ class Dell10GTest(unittest.TestCase):
             host="my.hostname",
             username="the_user",
             password="the_password",
+            metrics_tags=dict(model="dell"),
             port=22
         )
 
@@ -101,6 +104,8 @@ class Dell10GTest(unittest.TestCase):
             shell_factory=ssh_client_class_mock)
 
         self.mocked_ssh_client = flexmock()
+
+        self.mocked_ssh_client.should_receive("get_current_prompt").and_return("hostname#").once()
         ssh_client_class_mock.return_value = self.mocked_ssh_client
         self.mocked_ssh_client.should_receive("do").with_args("enable", wait_for=":").and_return([]).once().ordered()
         self.mocked_ssh_client.should_receive("do").with_args("the_password").and_return([]).once().ordered()
@@ -111,7 +116,8 @@ class Dell10GTest(unittest.TestCase):
         ssh_client_class_mock.assert_called_with(
             host="my.hostname",
             username="the_user",
-            password="the_password"
+            password="the_password",
+            metrics_tags=dict(model="dell")
         )
 
     def test_disconnect(self):
@@ -119,11 +125,12 @@ class Dell10GTest(unittest.TestCase):
         self.switch.logger = logger
         logger.should_receive("debug")
 
-        mocked_ssh_client = flexmock()
+        mocked_ssh_client = flexmock(failed=False)
         self.switch.shell = mocked_ssh_client
         mocked_ssh_client.should_receive("quit").with_args("quit").once().ordered()
 
-        logger.should_receive("info").with_args("FULL TRANSACTION LOG").once()
+        logger.should_receive("debug").with_args("FULL TRANSACTION LOG").once()
+        logger.should_receive("info").never()
 
         self.switch.shell.full_log = "FULL TRANSACTION LOG"
         self.switch.disconnect()
@@ -342,21 +349,30 @@ class Dell10GTest(unittest.TestCase):
             "Po43                                   trnk  Up",
         ])
 
-        self.mocked_ssh_client.should_receive("do").with_args("show running-config interface tengigabitethernet 0/0/1").and_return([])
-        self.mocked_ssh_client.should_receive("do").with_args("show running-config interface tengigabitethernet 0/0/12").and_return([
-            "switchport access vlan 1234"
-        ])
-        self.mocked_ssh_client.should_receive("do").with_args("show running-config interface tengigabitethernet 1/0/1").and_return([
+        self.mocked_ssh_client.should_receive("do_iter").with_args("show running-config").and_return([
+            "!Current Configuration:",
+            "!",
+            "configure",
+            "vlan 900,1000-1001,1003-1005,1234,1500",
+            "exit",
+            "interface Te0/0/12",
+            "switchport access vlan 1234",
+            "exit",
+            "!",
+            "interface tengigabitethernet 1/0/1",
             "shutdown",
             "switchport mode trunk",
             "switchport trunk allowed vlan 900,1000-1001,1003-1005",
-        ])
-        self.mocked_ssh_client.should_receive("do").with_args("show running-config interface tengigabitethernet 1/0/2").and_return([
+            "exit",
+            "!",
+            "interface Te1/0/2",
             "switchport mode general",
             "switchport general allowed vlan add 900,1000-1001,1003-1005",
             "switchport general pvid 1500",
+            "exit",
+            "!",
+            "exit",
         ])
-        self.mocked_ssh_client.should_receive("do").with_args("show running-config interface port-channel 43").and_return([])
 
         i1_1, i1_12, i2_x1, i2_x2, po43 = self.switch.get_interfaces()
 
@@ -624,7 +640,7 @@ class Dell10GTest(unittest.TestCase):
 
         with self.configuring_and_committing():
             self.mocked_ssh_client.should_receive("do").with_args("interface tengigabitethernet 1/0/10").once().ordered().and_return([])
-            self.mocked_ssh_client.should_receive("do").with_args("switchport general pvid 1000").once().ordered().and_return([])
+            self.mocked_ssh_client.should_receive("do").with_args("switchport general pvid 1000").and_return([]).once().ordered()
             self.mocked_ssh_client.should_receive("do").with_args("exit").once().ordered().and_return([])
 
         self.switch.set_interface_native_vlan("tengigabitethernet 1/0/10", 1000)
@@ -648,9 +664,9 @@ class Dell10GTest(unittest.TestCase):
 
         with self.configuring():
             self.mocked_ssh_client.should_receive("do").with_args("interface tengigabitethernet 1/0/10").once().ordered().and_return([])
-            self.mocked_ssh_client.should_receive("do").with_args("switchport general pvid 1000").once().ordered().and_return([
+            self.mocked_ssh_client.should_receive("do").with_args("switchport general pvid 1000").and_return([
                 "Could not configure pvid."
-            ])
+            ]).once().ordered()
             self.mocked_ssh_client.should_receive("do").with_args("exit").once().ordered().and_return([])
 
         with self.assertRaises(UnknownVlan) as expect:
@@ -664,8 +680,8 @@ class Dell10GTest(unittest.TestCase):
 
         with self.configuring_and_committing():
             self.mocked_ssh_client.should_receive("do").with_args("interface tengigabitethernet 1/0/10").once().ordered().and_return([])
-            self.mocked_ssh_client.should_receive("do").with_args("switchport mode general").once().ordered().and_return([])
-            self.mocked_ssh_client.should_receive("do").with_args("switchport general pvid 1000").once().ordered().and_return([])
+            self.mocked_ssh_client.should_receive("do").with_args("switchport mode general").and_return([]).once().ordered()
+            self.mocked_ssh_client.should_receive("do").with_args("switchport general pvid 1000").and_return([]).once().ordered()
             self.mocked_ssh_client.should_receive("do").with_args("exit").once().ordered().and_return([])
 
         self.switch.set_interface_native_vlan("tengigabitethernet 1/0/10", 1000)
@@ -689,8 +705,8 @@ class Dell10GTest(unittest.TestCase):
 
         with self.configuring_and_committing():
             self.mocked_ssh_client.should_receive("do").with_args("interface tengigabitethernet 1/0/10").once().ordered().and_return([])
-            self.mocked_ssh_client.should_receive("do").with_args("switchport mode general").once().ordered().and_return([])
-            self.mocked_ssh_client.should_receive("do").with_args("switchport general pvid 1000").once().ordered().and_return([])
+            self.mocked_ssh_client.should_receive("do").with_args("switchport mode general").and_return([]).once().ordered()
+            self.mocked_ssh_client.should_receive("do").with_args("switchport general pvid 1000").and_return([]).once().ordered()
             self.mocked_ssh_client.should_receive("do").with_args("exit").once().ordered().and_return([])
 
         self.switch.set_interface_native_vlan("tengigabitethernet 1/0/10", 1000)
@@ -703,9 +719,9 @@ class Dell10GTest(unittest.TestCase):
 
         with self.configuring_and_committing():
             self.mocked_ssh_client.should_receive("do").with_args("interface tengigabitethernet 1/0/10").once().ordered().and_return([])
-            self.mocked_ssh_client.should_receive("do").with_args("switchport mode general").once().ordered().and_return([])
-            self.mocked_ssh_client.should_receive("do").with_args("switchport general allowed vlan 1201-1203,1205").once().ordered().and_return([])
-            self.mocked_ssh_client.should_receive("do").with_args("switchport general pvid 1000").once().ordered().and_return([])
+            self.mocked_ssh_client.should_receive("do").with_args("switchport mode general").and_return([]).once().ordered()
+            self.mocked_ssh_client.should_receive("do").with_args("switchport general allowed vlan 1201-1203,1205").and_return([]).once().ordered()
+            self.mocked_ssh_client.should_receive("do").with_args("switchport general pvid 1000").and_return([]).once().ordered()
             self.mocked_ssh_client.should_receive("do").with_args("exit").once().ordered().and_return([])
 
         self.switch.set_interface_native_vlan("tengigabitethernet 1/0/10", 1000)
@@ -718,7 +734,7 @@ class Dell10GTest(unittest.TestCase):
 
         with self.configuring_and_committing():
             self.mocked_ssh_client.should_receive("do").with_args("interface tengigabitethernet 1/0/10").once().ordered().and_return([])
-            self.mocked_ssh_client.should_receive("do").with_args("switchport mode trunk").once().ordered().and_return([])
+            self.mocked_ssh_client.should_receive("do").with_args("switchport mode trunk").and_return([]).once().ordered()
             self.mocked_ssh_client.should_receive("do").with_args("exit").once().ordered().and_return([])
 
         self.switch.unset_interface_native_vlan("tengigabitethernet 1/0/10")
@@ -732,8 +748,8 @@ class Dell10GTest(unittest.TestCase):
 
         with self.configuring_and_committing():
             self.mocked_ssh_client.should_receive("do").with_args("interface tengigabitethernet 1/0/10").once().ordered().and_return([])
-            self.mocked_ssh_client.should_receive("do").with_args("switchport mode trunk").once().ordered().and_return([])
-            self.mocked_ssh_client.should_receive("do").with_args("switchport trunk allowed vlan add 1201-1203,1205").once().ordered().and_return([])
+            self.mocked_ssh_client.should_receive("do").with_args("switchport mode trunk").and_return([]).once().ordered()
+            self.mocked_ssh_client.should_receive("do").with_args("switchport trunk allowed vlan add 1201-1203,1205").and_return([]).once().ordered()
             self.mocked_ssh_client.should_receive("do").with_args("exit").once().ordered().and_return([])
 
         self.switch.unset_interface_native_vlan("tengigabitethernet 1/0/10")
@@ -80,6 +80,8 @@ class DellTest(unittest.TestCase):
             shell_factory=ssh_client_class_mock)
 
         self.mocked_ssh_client = flexmock()
+
+        self.mocked_ssh_client.should_receive("get_current_prompt").and_return("hostname#").once()
         ssh_client_class_mock.return_value = self.mocked_ssh_client
         self.mocked_ssh_client.should_receive("do").with_args("enable", wait_for=":").and_return([]).once().ordered()
         self.mocked_ssh_client.should_receive("do").with_args("the_password").and_return([]).once().ordered()
@@ -90,6 +92,7 @@ class DellTest(unittest.TestCase):
             host="my.hostname",
             username="the_user",
             password="the_password",
+            metrics_tags=dict(model="dell"),
             port=22
         )
 
@@ -100,6 +103,8 @@ class DellTest(unittest.TestCase):
             shell_factory=telnet_client_class_mock)
 
         self.mocked_ssh_client = flexmock()
+
+        self.mocked_ssh_client.should_receive("get_current_prompt").and_return("hostname#").once()
         telnet_client_class_mock.return_value = self.mocked_ssh_client
         self.mocked_ssh_client.should_receive("do").with_args("enable", wait_for=":").and_return([]).once().ordered()
         self.mocked_ssh_client.should_receive("do").with_args("the_password").and_return([]).once().ordered()
@@ -109,7 +114,8 @@ class DellTest(unittest.TestCase):
         telnet_client_class_mock.assert_called_with(
             host="my.hostname",
             username="the_user",
-            password="the_password"
+            password="the_password",
+            metrics_tags=dict(model="dell")
         )
 
     def test_disconnect(self):
@@ -117,11 +123,12 @@ class DellTest(unittest.TestCase):
         self.switch.logger = logger
         logger.should_receive("debug")
 
-        mocked_ssh_client = flexmock()
+        mocked_ssh_client = flexmock(failed=False)
         self.switch.shell = mocked_ssh_client
         mocked_ssh_client.should_receive("quit").with_args("quit").once().ordered()
 
-        logger.should_receive("info").with_args("FULL TRANSACTION LOG").once()
+        logger.should_receive("debug").with_args("FULL TRANSACTION LOG").once()
+        logger.should_receive("info").never()
 
         self.switch.shell.full_log = "FULL TRANSACTION LOG"
         self.switch.disconnect()
@@ -417,24 +424,35 @@ class DellTest(unittest.TestCase):
             "ch10 Link Aggregate                  Down",
         ])
 
-        self.mocked_ssh_client.should_receive("do").with_args("show running-config interface ethernet 1/g1").and_return([])
-        self.mocked_ssh_client.should_receive("do").with_args("show running-config interface ethernet 1/g12").and_return([
-            "switchport access vlan 1234"
-        ])
-        self.mocked_ssh_client.should_receive("do").with_args("show running-config interface ethernet 2/xg1").and_return([
+        self.mocked_ssh_client.should_receive("do").with_args("show running-config", wait_for=("--More-- or (q)uit", "#"), include_last_line=True).and_return([
+            "!Current Configuration:",
+            "!System Description \"PowerConnect 6224P, 3.3.7.3, VxWorks 6.5\"",
+            "!",
+            "configure",
+            "vlan database",
+            "vlan 900,1000-1001,1003-1005,1234,1500",
+            "exit",
+            "interface ethernet 1/g12",
+            "switchport access vlan 1234",
+            "exit",
+            "!",
+            "interface ethernet 2/xg1",
             "shutdown",
             "switchport mode trunk",
             "switchport trunk allowed vlan add 900,1000-1001",
             "switchport trunk allowed vlan add 1003-1005",
-        ])
-        self.mocked_ssh_client.should_receive("do").with_args("show running-config interface ethernet 2/xg2").and_return([
+            "exit",
+            "!",
+            "interface ethernet 2/xg2",
             "switchport mode general",
             "switchport general allowed vlan add 900,1000-1001,1003-1005",
             "switchport general pvid 1500",
-            "mtu 5000"
+            "mtu 5000",
+            "exit",
+            "!",
+            "exit",
+            "my_switch#",
         ])
-        self.mocked_ssh_client.should_receive("do").with_args("show running-config interface port-channel 1").and_return([])
-        self.mocked_ssh_client.should_receive("do").with_args("show running-config interface port-channel 10").and_return([])
 
         i1_1, i1_12, i2_x1, i2_x2, ch1, ch10 = self.switch.get_interfaces()
 
@@ -499,16 +517,29 @@ class DellTest(unittest.TestCase):
             "ch3  Link Aggregate                  Down",
         ])
 
-        self.mocked_ssh_client.should_receive("do").with_args("show running-config interface ethernet 1/g1").ordered().and_return([])
-        self.mocked_ssh_client.should_receive("do").with_args("show running-config interface ethernet 1/g2").ordered().and_return([])
-        self.mocked_ssh_client.should_receive("do").with_args("show running-config interface ethernet 1/g3").ordered().and_return([])
-        self.mocked_ssh_client.should_receive("do").with_args("show running-config interface ethernet 1/g4").ordered().and_return([])
-        self.mocked_ssh_client.should_receive("do").with_args("show running-config interface ethernet 1/g5").ordered().and_return([])
-        self.mocked_ssh_client.should_receive("do").with_args("show running-config interface port-channel 1").ordered().and_return([])
-        self.mocked_ssh_client.should_receive("do").with_args("show running-config interface port-channel 2").ordered().and_return([])
-        self.mocked_ssh_client.should_receive("do").with_args("show running-config interface port-channel 3").ordered().and_return([])
+        self.mocked_ssh_client.should_receive("do").with_args("show running-config", wait_for=("--More-- or (q)uit", "#"), include_last_line=True).once().ordered().and_return([
+            "!Current Configuration:",
+            "configure",
+            "interface ethernet 1/g2",
+            "shutdown",
+            "--More-- or (q)uit",
+        ])
+        self.mocked_ssh_client.should_receive("send_key").with_args("m", wait_for=("--More-- or (q)uit", "#"), include_last_line=True).once().ordered().and_return([
+            "\r                     ",
+            "switchport access vlan 1234",
+            "exit",
+            "!",
+            "exit",
+            "my_switch#",
+        ])
+
+        interfaces = self.switch.get_interfaces()
 
-        assert_that(self.switch.get_interfaces(), has_length(8))
+        assert_that(interfaces, has_length(8))
+        assert_that(interfaces[1].name, is_("ethernet 1/g2"))
+        assert_that(interfaces[1].shutdown, is_(True))
+        assert_that(interfaces[1].access_vlan, is_(1234))
+        assert_that(interfaces[2].access_vlan, is_(none()))
 
     def test_add_vlan(self):
         self.mocked_ssh_client.should_receive("do").with_args("show vlan id 1000").and_return([
@@ -821,7 +852,7 @@ class DellTest(unittest.TestCase):
 
         with self.configuring_and_committing():
             self.mocked_ssh_client.should_receive("do").with_args("interface ethernet 1/g10").once().ordered().and_return([])
-            self.mocked_ssh_client.should_receive("do").with_args("switchport general pvid 1000").once().ordered().and_return([])
+            self.mocked_ssh_client.should_receive("do").with_args("switchport general pvid 1000").and_return([]).once().ordered()
             self.mocked_ssh_client.should_receive("do").with_args("exit").once().ordered().and_return([])
 
         self.switch.set_interface_native_vlan("ethernet 1/g10", 1000)
@@ -845,9 +876,9 @@ class DellTest(unittest.TestCase):
 
         with self.configuring():
             self.mocked_ssh_client.should_receive("do").with_args("interface ethernet 1/g10").once().ordered().and_return([])
-            self.mocked_ssh_client.should_receive("do").with_args("switchport general pvid 1000").once().ordered().and_return([
+            self.mocked_ssh_client.should_receive("do").with_args("switchport general pvid 1000").and_return([
                 "Could not configure pvid."
-            ])
+            ]).once().ordered()
             self.mocked_ssh_client.should_receive("do").with_args("exit").once().ordered().and_return([])
 
         with self.assertRaises(UnknownVlan) as expect:
@@ -861,8 +892,8 @@ class DellTest(unittest.TestCase):
 
         with self.configuring_and_committing():
             self.mocked_ssh_client.should_receive("do").with_args("interface ethernet 1/g10").once().ordered().and_return([])
-            self.mocked_ssh_client.should_receive("do").with_args("switchport mode general").once().ordered().and_return([])
-            self.mocked_ssh_client.should_receive("do").with_args("switchport general pvid 1000").once().ordered().and_return([])
+            self.mocked_ssh_client.should_receive("do").with_args("switchport mode general").and_return([]).once().ordered()
+            self.mocked_ssh_client.should_receive("do").with_args("switchport general pvid 1000").and_return([]).once().ordered()
             self.mocked_ssh_client.should_receive("do").with_args("exit").once().ordered().and_return([])
 
         self.switch.set_interface_native_vlan("ethernet 1/g10", 1000)
@@ -886,8 +917,8 @@ class DellTest(unittest.TestCase):
 
         with self.configuring_and_committing():
             self.mocked_ssh_client.should_receive("do").with_args("interface ethernet 1/g10").once().ordered().and_return([])
-            self.mocked_ssh_client.should_receive("do").with_args("switchport mode general").once().ordered().and_return([])
-            self.mocked_ssh_client.should_receive("do").with_args("switchport general pvid 1000").once().ordered().and_return([])
+            self.mocked_ssh_client.should_receive("do").with_args("switchport mode general").and_return([]).once().ordered()
+            self.mocked_ssh_client.should_receive("do").with_args("switchport general pvid 1000").and_return([]).once().ordered()
             self.mocked_ssh_client.should_receive("do").with_args("exit").once().ordered().and_return([])
 
         self.switch.set_interface_native_vlan("ethernet 1/g10", 1000)
@@ -900,9 +931,9 @@ class DellTest(unittest.TestCase):
 
         with self.configuring_and_committing():
             self.mocked_ssh_client.should_receive("do").with_args("interface ethernet 1/g10").once().ordered().and_return([])
-            self.mocked_ssh_client.should_receive("do").with_args("switchport mode general").once().ordered().and_return([])
-            self.mocked_ssh_client.should_receive("do").with_args("switchport general allowed vlan add 1201-1203,1205").once().ordered().and_return([])
-            self.mocked_ssh_client.should_receive("do").with_args("switchport general pvid 1000").once().ordered().and_return([])
+            self.mocked_ssh_client.should_receive("do").with_args("switchport mode general").and_return([]).once().ordered()
+            self.mocked_ssh_client.should_receive("do").with_args("switchport general allowed vlan add 1201-1203,1205").and_return([]).once().ordered()
+            self.mocked_ssh_client.should_receive("do").with_args("switchport general pvid 1000").and_return([]).once().ordered()
             self.mocked_ssh_client.should_receive("do").with_args("exit").once().ordered().and_return([])
 
         self.switch.set_interface_native_vlan("ethernet 1/g10", 1000)
@@ -915,7 +946,7 @@ class DellTest(unittest.TestCase):
 
         with self.configuring_and_committing():
             self.mocked_ssh_client.should_receive("do").with_args("interface ethernet 1/g10").once().ordered().and_return([])
-            self.mocked_ssh_client.should_receive("do").with_args("switchport mode trunk").once().ordered().and_return([])
+            self.mocked_ssh_client.should_receive("do").with_args("switchport mode trunk").and_return([]).once().ordered()
             self.mocked_ssh_client.should_receive("do").with_args("exit").once().ordered().and_return([])
 
         self.switch.unset_interface_native_vlan("ethernet 1/g10")
@@ -929,8 +960,8 @@ class DellTest(unittest.TestCase):
 
         with self.configuring_and_committing():
             self.mocked_ssh_client.should_receive("do").with_args("interface ethernet 1/g10").once().ordered().and_return([])
-            self.mocked_ssh_client.should_receive("do").with_args("switchport mode trunk").once().ordered().and_return([])
-            self.mocked_ssh_client.should_receive("do").with_args("switchport trunk allowed vlan add 1201-1203,1205").once().ordered().and_return([])
+            self.mocked_ssh_client.should_receive("do").with_args("switchport mode trunk").and_return([]).once().ordered()
+            self.mocked_ssh_client.should_receive("do").with_args("switchport trunk allowed vlan add 1201-1203,1205").and_return([]).once().ordered()
             self.mocked_ssh_client.should_receive("do").with_args("exit").once().ordered().and_return([])
 
         self.switch.unset_interface_native_vlan("ethernet 1/g10")
@@ -967,7 +998,7 @@ class DellTest(unittest.TestCase):
 
         with self.configuring_and_committing():
             self.mocked_ssh_client.should_receive("do").with_args("interface port-channel 10").once().ordered().and_return([])
-            self.mocked_ssh_client.should_receive("do").with_args("switchport mode trunk").once().ordered().and_return([])
+            self.mocked_ssh_client.should_receive("do").with_args("switchport mode trunk").and_return([]).once().ordered()
             self.mocked_ssh_client.should_receive("do").with_args("exit").once().ordered().and_return([])
 
         self.switch.unset_bond_native_vlan(10)
@@ -981,8 +1012,8 @@ class DellTest(unittest.TestCase):
 
         with self.configuring_and_committing():
             self.mocked_ssh_client.should_receive("do").with_args("interface port-channel 10").once().ordered().and_return([])
-            self.mocked_ssh_client.should_receive("do").with_args("switchport mode trunk").once().ordered().and_return([])
-            self.mocked_ssh_client.should_receive("do").with_args("switchport trunk allowed vlan add 1201-1203,1205").once().ordered().and_return([])
+            self.mocked_ssh_client.should_receive("do").with_args("switchport mode trunk").and_return([]).once().ordered()
+            self.mocked_ssh_client.should_receive("do").with_args("switchport trunk allowed vlan add 1201-1203,1205").and_return([]).once().ordered()
             self.mocked_ssh_client.should_receive("do").with_args("exit").once().ordered().and_return([])
 
         self.switch.unset_bond_native_vlan(10)
@@ -1018,7 +1049,7 @@ class DellTest(unittest.TestCase):
 
         with self.configuring_and_committing():
             self.mocked_ssh_client.should_receive("do").with_args("interface port-channel 10").once().ordered().and_return([])
-            self.mocked_ssh_client.should_receive("do").with_args("switchport general pvid 1000").once().ordered().and_return([])
+            self.mocked_ssh_client.should_receive("do").with_args("switchport general pvid 1000").and_return([]).once().ordered()
             self.mocked_ssh_client.should_receive("do").with_args("exit").once().ordered().and_return([])
 
         self.switch.set_bond_native_vlan(10, 1000)
@@ -1043,9 +1074,9 @@ class DellTest(unittest.TestCase):
 
         with self.configuring():
             self.mocked_ssh_client.should_receive("do").with_args("interface port-channel 10").once().ordered().and_return([])
-            self.mocked_ssh_client.should_receive("do").with_args("switchport general pvid 1000").once().ordered().and_return([
+            self.mocked_ssh_client.should_receive("do").with_args("switchport general pvid 1000").and_return([
                 "Could not configure pvid."
-            ])
+            ]).once().ordered()
             self.mocked_ssh_client.should_receive("do").with_args("exit").once().ordered().and_return([])
 
         with self.assertRaises(UnknownVlan) as expect:
@@ -1059,8 +1090,8 @@ class DellTest(unittest.TestCase):
 
         with self.configuring_and_committing():
             self.mocked_ssh_client.should_receive("do").with_args("interface port-channel 10").once().ordered().and_return([])
-            self.mocked_ssh_client.should_receive("do").with_args("switchport mode general").once().ordered().and_return([])
-            self.mocked_ssh_client.should_receive("do").with_args("switchport general pvid 1000").once().ordered().and_return([])
+            self.mocked_ssh_client.should_receive("do").with_args("switchport mode general").and_return([]).once().ordered()
+            self.mocked_ssh_client.should_receive("do").with_args("switchport general pvid 1000").and_return([]).once().ordered()
             self.mocked_ssh_client.should_receive("do").with_args("exit").once().ordered().and_return([])
 
         self.switch.set_bond_native_vlan(10, 1000)
@@ -1084,8 +1115,8 @@ class DellTest(unittest.TestCase):
 
         with self.configuring_and_committing():
             self.mocked_ssh_client.should_receive("do").with_args("interface port-channel 10").once().ordered().and_return([])
-            self.mocked_ssh_client.should_receive("do").with_args("switchport mode general").once().ordered().and_return([])
-            self.mocked_ssh_client.should_receive("do").with_args("switchport general pvid 1000").once().ordered().and_return([])
+            self.mocked_ssh_client.should_receive("do").with_args("switchport mode general").and_return([]).once().ordered()
+            self.mocked_ssh_client.should_receive("do").with_args("switchport general pvid 1000").and_return([]).once().ordered()
             self.mocked_ssh_client.should_receive("do").with_args("exit").once().ordered().and_return([])
 
         self.switch.set_bond_native_vlan(10, 1000)
@@ -1098,9 +1129,9 @@ class DellTest(unittest.TestCase):
 
         with self.configuring_and_committing():
             self.mocked_ssh_client.should_receive("do").with_args("interface port-channel 10").once().ordered().and_return([])
-            self.mocked_ssh_client.should_receive("do").with_args("switchport mode general").once().ordered().and_return([])
-            self.mocked_ssh_client.should_receive("do").with_args("switchport general allowed vlan add 1201-1203,1205").once().ordered().and_return([])
-            self.mocked_ssh_client.should_receive("do").with_args("switchport general pvid 1000").once().ordered().and_return([])
+            self.mocked_ssh_client.should_receive("do").with_args("switchport mode general").and_return([]).once().ordered()
+            self.mocked_ssh_client.should_receive("do").with_args("switchport general allowed vlan add 1201-1203,1205").and_return([]).once().ordered()
+            self.mocked_ssh_client.should_receive("do").with_args("switchport general pvid 1000").and_return([]).once().ordered()
             self.mocked_ssh_client.should_receive("do").with_args("exit").once().ordered().and_return([])
 
         self.switch.set_bond_native_vlan(10, 1000)
@@ -0,0 +1,256 @@
+# Copyright 2016 Internap.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import unittest
+
+from flexmock import flexmock, flexmock_teardown
+from hamcrest import assert_that, is_, none, contains
+from ncclient.operations import RPCError
+from ncclient.xml_ import to_ele
+
+from netman.adapters.switches import juniper
+from netman.adapters.switches.juniper.base import configuration_filter, all_vlans, all_interfaces, one_interface, \
+    one_vlan_by_vlan_id, rstp_protocol_interfaces, Update, vlan_update, interface_removal
+from netman.adapters.switches.juniper.candidate import CandidateSnapshot
+from netman.core.objects.switch_descriptor import SwitchDescriptor
+from tests.adapters.switches.juniper_test import an_ok_response, is_xml, a_configuration
+
+
+class CandidateSnapshotTest(unittest.TestCase):
+
+    def setUp(self):
+        self.snapshot = CandidateSnapshot()
+
+    def test_nothing_is_answered_before_being_fetched(self):
+        assert_that(self.snapshot.answer(configuration_filter(all_vlans)), is_(none()))
+        assert_that(self.snapshot.answer(configuration_filter(one_interface("ge-0/0/1"))), is_(none()))
+
+    def test_a_fetched_section_is_answered_locally(self):
+        self.snapshot.absorb(configuration_filter(all_vlans), a_configuration("""
+            <vlans>
+              <vlan>
+                <name>VLAN1000</name>
+                <vlan-id>1000</vlan-id>
+              </vlan>
+            </vlans>
+        """))
+
+        reply = self.snapshot.answer(configuration_filter(all_vlans))
+
+        assert_that(names(reply, "vlans/vlan"), contains("VLAN1000"))
+        assert_that(names(self.snapshot.answer(configuration_filter(one_vlan_by_vlan_id(1000))), "vlans/vlan"),
+                    contains("VLAN1000"))
+
+    def test_only_the_fetched_entries_of_a_section_are_known(self):
+        self.snapshot.absorb(configuration_filter(one_interface("ge-0/0/1")), a_configuration())
+
+        reply = self.snapshot.answer(configuration_filter(one_interface("ge-0/0/1")))
+
+        assert_that(names(reply, "interfaces/interface"), is_([]))
+        assert_that(self.snapshot.answer(configuration_filter(one_interface("ge-0/0/2"))), is_(none()))
+        assert_that(self.snapshot.answer(configuration_filter(all_interfaces)), is_(none()))
+
+    def test_sections_that_are_not_kept_are_never_answered(self):
+        self.snapshot.absorb(configuration_filter(all_vlans), a_configuration())
+
+        assert_that(self.snapshot.answer(configuration_filter(all_vlans, rstp_protocol_interfaces)), is_(none()))
+
+    def test_pushed_updates_are_applied(self):
+        self.snapshot.absorb(configuration_filter(all_vlans), a_configuration("""
+            <vlans>
+              <vlan>
+                <name>VLAN1000</name>
+                <vlan-id>1000</vlan-id>
+              </vlan>
+            </vlans>
+        """))
+
+        update = Update()
+        update.add_vlan(vlan_update(2000, "two thousand"))
+        update.add_vlan(to_ele("""
+            <vlan operation="delete">
+              <name>VLAN1000</name>
+            </vlan>
+        """))
+        self.snapshot.apply(update.root)
+
+        reply = self.snapshot.answer(configuration_filter(all_vlans))
+        assert_that(names(reply, "vlans/vlan"), contains("VLAN2000"))
+        assert_that(reply.xpath("data/configuration/vlans/vlan/description")[0].text, is_("two thousand"))
+
+    def test_leaf_list_members_are_added_and_deleted_individually(self):
+        self.snapshot.absorb(configuration_filter(one_interface("ge-0/0/1")), a_configuration("""
+            <interfaces>
+              <interface>
+                <name>ge-0/0/1</name>
+                <unit>
+                  <name>0</name>
+                  <family>
+                    <ethernet-switching>
+                      <vlan>
+                        <members>1000</members>
+                        <members>1001</members>
+                      </vlan>
+                    </ethernet-switching>
+                  </family>
+                </unit>
+              </interface>
+            </interfaces>
+        """))
+
+        update = Update()
+        update.add_interface(to_ele("""
+            <interface>
+              <name>ge-0/0/1</name>
+              <unit>
+                <name>0</name>
+                <family>
+                  <ethernet-switching>
+                    <vlan>
+                      <members operation="delete">1000</members>
+                      <members>1002</members>
+                    </vlan>
+                  </ethernet-switching>
+                </family>
+              </unit>
+            </interface>
+        """))
+        self.snapshot.apply(update.root)
+
+        reply = self.snapshot.answer(configuration_filter(one_interface("ge-0/0/1")))
+        members = reply.xpath("data/configuration/interfaces/interface/unit/family/ethernet-switching/vlan/members")
+        assert_that([member.text for member in members], contains("1001", "1002"))
+
+    def test_a_removed_interface_is_known_to_be_absent(self):
+        self.snapshot.absorb(configuration_filter(one_interface("ge-0/0/1")), a_configuration("""
+            <interfaces>
+              <interface>
+                <name>ge-0/0/1</name>
+                <disable />
+              </interface>
+            </interfaces>
+        """))
+
+        update = Update()
+        update.add_interface(interface_removal("ge-0/0/1"))
+        self.snapshot.apply(update.root)
+
+        reply = self.snapshot.answer(configuration_filter(one_interface("ge-0/0/1")))
+        assert_that(names(reply, "interfaces/interface"), is_([]))
+
+    def test_an_entry_is_fetched_again_when_a_deletion_does_not_match_it(self):
+        self.snapshot.absorb(configuration_filter(all_interfaces), a_configuration("""
+            <interfaces>
+              <interface>
+                <name>ge-0/0/1</name>
+                <native-vlan-id>1000</native-vlan-id>
+              </interface>
+              <interface>
+                <name>ge-0/0/2</name>
+              </interface>
+            </interfaces>
+        """))
+
+        update = Update()
+        update.add_interface(to_ele("""
+            <interface>
+              <name>ge-0/0/1</name>
+              <unit>
+                <name>0</name>
+                <family>
+                  <ethernet-switching>
+                    <native-vlan-id operation="delete" />
+                  </ethernet-switching>
+                </family>
+              </unit>
+            </interface>
+        """))
+        self.snapshot.apply(update.root)
+
+        assert_that(self.snapshot.answer(configuration_filter(one_interface("ge-0/0/1"))), is_(none()))
+        assert_that(self.snapshot.answer(configuration_filter(all_interfaces)), is_(none()))
+        assert_that(names(self.snapshot.answer(configuration_filter(one_interface("ge-0/0/2"))),
+                          "interfaces/interface"), contains("ge-0/0/2"))
+
+
+class JuniperCandidateSnapshotTest(unittest.TestCase):
+
+    def setUp(self):
+        self.switch = juniper.standard.netconf(SwitchDescriptor(model='juniper', hostname="toto"))
+
+        self.netconf_mock = flexmock()
+        self.switch.netconf = self.netconf_mock
+
+        self.netconf_mock.should_receive("lock").with_args(target="candidate").once().ordered()
+        self.switch.start_transaction()
+
+    def tearDown(self):
+        flexmock_teardown()
+
+    def test_the_candidate_is_fetched_once_per_transaction(self):
+        self.netconf_mock.should_receive("get_config").with_args(source="candidate", filter=is_xml("""
+            <filter>
+              <configuration>
+                <vlans />
+              </configuration>
+            </filter>
+        """)).once().ordered().and_return(a_configuration())
+
+        self.netconf_mock.should_receive("edit_config").twice().and_return(an_ok_response())
+
+        self.switch.add_vlan(1000)
+        self.switch.add_vlan(1001)
+
+        assert_that(names(self.switch.query(all_vlans), "vlans/vlan"), contains("VLAN1000", "VLAN1001"))
+
+    def test_the_candidate_is_fetched_again_after_a_refused_edit(self):
+        self.netconf_mock.should_receive("get_config").with_args(source="candidate", filter=is_xml("""
+            <filter>
+              <configuration>
+                <vlans />
+              </configuration>
+            </filter>
+        """)).twice().and_return(a_configuration())
+
+        self.netconf_mock.should_receive("edit_config").and_raise(RPCError(to_ele("""
+            <rpc-error xmlns="urn:ietf:params:xml:ns:netconf:base:1.0">
+              <error-severity>error</error-severity>
+              <error-message>something went wrong</error-message>
+            </rpc-error>
+        """)))
+
+        with self.assertRaises(RPCError):
+            self.switch.add_vlan(1000)
+
+        with self.assertRaises(RPCError):
+            self.switch.add_vlan(1000)
+
+    def test_the_snapshot_is_dropped_with_the_transaction(self):
+        self.netconf_mock.should_receive("unlock").with_args(target="candidate").once()
+        self.switch.end_transaction()
+
+        self.netconf_mock.should_receive("get_config").with_args(source="running", filter=is_xml("""
+            <filter>
+              <configuration>
+                <vlans />
+              </configuration>
+            </filter>
+        """)).twice().and_return(a_configuration())
+
+        self.switch.query(all_vlans)
+        self.switch.query(all_vlans)
+
+
+def names(reply, path):
+    return [node.text for node in reply.xpath("data/configuration/{}/name".format(path))]
@@ -0,0 +1,179 @@
+# Copyright 2016 Internap.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import unittest
+
+from flexmock import flexmock, flexmock_teardown
+from hamcrest import assert_that, has_length
+from ncclient.operations import RPCError
+from ncclient.xml_ import to_ele
+
+from netman.adapters.switches import juniper
+from netman.core.objects.exceptions import VlanAlreadyExist
+from netman.core.objects.switch_descriptor import SwitchDescriptor
+from tests.adapters.switches.juniper_test import an_ok_response, is_xml, a_configuration
+
+
+class JuniperDeferredEditsTest(unittest.TestCase):
+
+    def setUp(self):
+        self.switch = juniper.standard.netconf(SwitchDescriptor(model='juniper', hostname="toto"))
+        self.switch.deferred_edits = True
+
+        self.netconf_mock = flexmock()
+        self.switch.netconf = self.netconf_mock
+
+        self.netconf_mock.should_receive("lock").with_args(target="candidate").once().ordered()
+        self.switch.start_transaction()
+
+        self.netconf_mock.should_receive("get_config").with_args(source="candidate", filter=is_xml("""
+            <filter>
+              <configuration>
+                <vlans />
+              </configuration>
+            </filter>
+        """)).once().ordered().and_return(a_configuration())
+
+    def tearDown(self):
+        flexmock_teardown()
+
+    def test_the_edits_of_a_transaction_are_sent_together_before_the_commit(self):
+        self.netconf_mock.should_receive("edit_config").once().ordered().with_args(target="candidate", config=is_xml("""
+            <config>
+              <configuration>
+                <vlans>
+                  <vlan>
+                    <name>VLAN1000</name>
+                    <vlan-id>1000</vlan-id>
+                  </vlan>
+                  <vlan>
+                    <name>VLAN1001</name>
+                    <vlan-id>1001</vlan-id>
+                  </vlan>
+                </vlans>
+              </configuration>
+            </config>
+        """)).and_return(an_ok_response())
+        self.netconf_mock.should_receive("commit").once().ordered()
+
+        self.switch.add_vlan(1000)
+        self.switch.add_vlan(1001)
+        self.switch.commit_transaction()
+
+    def test_a_refused_edit_is_sent_again_one_update_at_a_time_to_report_the_failing_operation(self):
+        self.netconf_mock.should_receive("edit_config").once().ordered().with_args(target="candidate", config=is_xml("""
+            <config>
+              <configuration>
+                <vlans>
+                  <vlan>
+                    <name>VLAN1000</name>
+                    <vlan-id>1000</vlan-id>
+                  </vlan>
+                  <vlan>
+                    <name>VLAN1001</name>
+                    <vlan-id>1001</vlan-id>
+                  </vlan>
+                </vlans>
+              </configuration>
+            </config>
+        """)).and_raise(an_rpc_error("Value 1001 is being used by VLAN2"))
+        self.netconf_mock.should_receive("discard_changes").once().ordered()
+        self.netconf_mock.should_receive("edit_config").once().ordered().with_args(target="candidate", config=is_xml("""
+            <config>
+              <configuration>
+                <vlans>
+                  <vlan>
+                    <name>VLAN1000</name>
+                    <vlan-id>1000</vlan-id>
+                  </vlan>
+                </vlans>
+              </configuration>
+            </config>
+        """)).and_return(an_ok_response())
+        self.netconf_mock.should_receive("edit_config").once().ordered().with_args(target="candidate", config=is_xml("""
+            <config>
+              <configuration>
+                <vlans>
+                  <vlan>
+                    <name>VLAN1001</name>
+                    <vlan-id>1001</vlan-id>
+                  </vlan>
+                </vlans>
+              </configuration>
+            </config>
+        """)).and_raise(an_rpc_error("Value 1001 is being used by VLAN2"))
+        self.netconf_mock.should_receive("commit").never()
+
+        self.switch.add_vlan(1000)
+        self.switch.add_vlan(1001)
+
+        with self.assertRaises(VlanAlreadyExist):
+            self.switch.commit_transaction()
+
+    def test_a_refused_edit_stays_pending_so_a_retried_commit_never_commits_part_of_the_transaction(self):
+        self.netconf_mock.should_receive("edit_config").and_raise(an_rpc_error("Value 1001 is being used by VLAN2"))
+        self.netconf_mock.should_receive("discard_changes").twice()
+        self.netconf_mock.should_receive("commit").never()
+
+        self.switch.add_vlan(1000)
+        self.switch.add_vlan(1001)
+
+        with self.assertRaises(VlanAlreadyExist):
+            self.switch.commit_transaction()
+        with self.assertRaises(VlanAlreadyExist):
+            self.switch.commit_transaction()
+
+        assert_that(self.switch.pending_edits, has_length(2))
+
+    def test_the_pending_edits_are_sent_before_querying_the_switch(self):
+        self.netconf_mock.should_receive("edit_config").once().ordered().and_return(an_ok_response())
+        self.netconf_mock.should_receive("get_config").with_args(source="candidate", filter=is_xml("""
+            <filter>
+              <configuration>
+                <interfaces>
+                  <interface>
+                    <name>ge-0/0/1</name>
+                  </interface>
+                </interfaces>
+                <protocols>
+                  <rstp>
+                    <interface>
+                      <name>ge-0/0/1</name>
+                    </interface>
+                  </rstp>
+                </protocols>
+              </configuration>
+            </filter>
+        """)).once().ordered().and_return(a_configuration())
+
+        self.switch.add_vlan(1000)
+        self.switch.edit_interface_spanning_tree("ge-0/0/1")
+
+    def test_a_rollback_drops_the_pending_edits(self):
+        self.netconf_mock.should_receive("discard_changes").once().ordered()
+        self.netconf_mock.should_receive("edit_config").never()
+        self.netconf_mock.should_receive("commit").once().ordered()
+
+        self.switch.add_vlan(1000)
+        self.switch.rollback_transaction()
+        self.switch.commit_transaction()
+
+
+def an_rpc_error(message):
+    return RPCError(to_ele("""
+        <rpc-error xmlns="urn:ietf:params:xml:ns:netconf:base:1.0">
+          <error-severity>error</error-severity>
+          <error-message>{}</error-message>
+        </rpc-error>
+    """.format(message)))
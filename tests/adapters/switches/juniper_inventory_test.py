@@ -0,0 +1,183 @@
+# Copyright 2016 Internap.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import unittest
+
+import mock
+from flexmock import flexmock, flexmock_teardown
+from hamcrest import assert_that, is_, none, contains
+from ncclient.operations import RPCError
+from ncclient.xml_ import to_ele
+
+from netman.adapters.switches import juniper
+from netman.adapters.switches.juniper.inventory import PhysicalInterfaceInventory
+from netman.core.objects.exceptions import UnknownInterface
+from netman.core.objects.switch_descriptor import SwitchDescriptor
+from tests.adapters.switches.juniper_test import is_xml, a_configuration, an_rpc_response, an_ok_response
+
+
+class PhysicalInterfaceInventoryTest(unittest.TestCase):
+
+    def setUp(self):
+        self.inventory = PhysicalInterfaceInventory(names_ttl=3600, status_ttl=60)
+        self.switch_descriptor = SwitchDescriptor(model="juniper", hostname="my.hostname")
+
+        with at_time(1000):
+            self.inventory.store(self.switch_descriptor, [("ge-0/0/1", False), ("ge-0/0/2", True)])
+
+    def test_stored_interfaces_are_known(self):
+        with at_time(1001):
+            assert_that(self.inventory.interfaces(self.switch_descriptor),
+                        contains(("ge-0/0/1", False), ("ge-0/0/2", True)))
+            assert_that(self.inventory.exists(self.switch_descriptor, "ge-0/0/1"), is_(True))
+            assert_that(self.inventory.exists(self.switch_descriptor, "ge-0/0/3"), is_(False))
+            assert_that(self.inventory.shutdown(self.switch_descriptor, "ge-0/0/2"), is_(True))
+
+    def test_statuses_expire_before_the_names(self):
+        with at_time(1061):
+            assert_that(self.inventory.interfaces(self.switch_descriptor), is_(none()))
+            assert_that(self.inventory.shutdown(self.switch_descriptor, "ge-0/0/2"), is_(none()))
+            assert_that(self.inventory.exists(self.switch_descriptor, "ge-0/0/1"), is_(True))
+
+        with at_time(4601):
+            assert_that(self.inventory.exists(self.switch_descriptor, "ge-0/0/1"), is_(none()))
+
+    def test_a_status_can_be_refreshed_alone(self):
+        with at_time(1061):
+            self.inventory.store_status(self.switch_descriptor, "ge-0/0/2", False)
+
+            assert_that(self.inventory.shutdown(self.switch_descriptor, "ge-0/0/2"), is_(False))
+            assert_that(self.inventory.interfaces(self.switch_descriptor), is_(none()))
+
+    def test_interfaces_are_kept_per_user(self):
+        other_user = SwitchDescriptor(model="juniper", hostname="my.hostname", username="other")
+
+        with at_time(1001):
+            assert_that(self.inventory.exists(other_user, "ge-0/0/1"), is_(none()))
+
+    def test_invalidating_forgets_the_switch(self):
+        self.inventory.invalidate(self.switch_descriptor)
+
+        with at_time(1001):
+            assert_that(self.inventory.exists(self.switch_descriptor, "ge-0/0/1"), is_(none()))
+
+
+class JuniperPhysicalInterfaceInventoryTest(unittest.TestCase):
+
+    def setUp(self):
+        self.switch = juniper.standard.netconf(SwitchDescriptor(model='juniper', hostname="toto"))
+        self.switch.physical_interface_inventory = PhysicalInterfaceInventory(names_ttl=3600, status_ttl=60)
+
+        self.netconf_mock = flexmock()
+        self.switch.netconf = self.netconf_mock
+
+    def tearDown(self):
+        flexmock_teardown()
+
+    def test_the_terse_interfaces_are_listed_once(self):
+        self.netconf_mock.should_receive("rpc").with_args(is_xml(TERSE)).once().and_return(a_terse_reply())
+        self.netconf_mock.should_receive("get_config").and_return(a_configuration())
+
+        for _ in range(2):
+            assert_that([i.name for i in self.switch.get_interfaces()], contains("ge-0/0/1", "ge-0/0/2"))
+
+    def test_an_expired_status_is_fetched_for_the_interface_alone(self):
+        self.netconf_mock.should_receive("get_config").and_return(a_configuration())
+        with at_time(1000):
+            self.netconf_mock.should_receive("rpc").with_args(is_xml(TERSE)).once().and_return(a_terse_reply())
+            self.switch.get_interfaces()
+
+        with at_time(1061):
+            self.netconf_mock.should_receive("rpc").with_args(is_xml("""
+                <get-interface-information>
+                  <terse/>
+                  <interface-name>ge-0/0/2</interface-name>
+                </get-interface-information>
+            """)).once().and_return(a_terse_reply(("ge-0/0/2", "up")))
+
+            assert_that(self.switch.get_interface("ge-0/0/2").shutdown, is_(False))
+
+    def test_the_whole_list_is_fetched_when_the_status_of_one_interface_is_refused(self):
+        requests = []
+
+        def rpc(request):
+            requests.append([child.tag for child in request])
+            if request.find("interface-name") is not None:
+                raise RPCError(to_ele("""
+                    <rpc-error xmlns="urn:ietf:params:xml:ns:netconf:base:1.0">
+                      <error-severity>error</error-severity>
+                      <error-message>syntax error</error-message>
+                    </rpc-error>
+                """))
+            return a_terse_reply()
+
+        self.netconf_mock.should_receive("rpc").replace_with(rpc)
+        self.netconf_mock.should_receive("get_config").and_return(a_configuration())
+
+        with at_time(1000):
+            self.switch.get_interfaces()
+
+        with at_time(1061):
+            assert_that(self.switch.get_interface("ge-0/0/2").shutdown, is_(True))
+
+        assert_that(requests, contains(["terse"], ["terse", "interface-name"], ["terse"]))
+
+    def test_an_unknown_interface_is_reported_from_the_inventory(self):
+        self.netconf_mock.should_receive("rpc").with_args(is_xml(TERSE)).once().and_return(a_terse_reply())
+        self.netconf_mock.should_receive("get_config").and_return(a_configuration())
+
+        self.switch.get_interfaces()
+
+        with self.assertRaises(UnknownInterface):
+            self.switch.unset_interface_auto_negotiation_state("ge-0/0/3")
+
+    def test_the_inventory_is_refreshed_after_committing_a_reset_interface(self):
+        self.netconf_mock.should_receive("rpc").with_args(is_xml(TERSE)).twice().and_return(a_terse_reply())
+        self.netconf_mock.should_receive("get_config").and_return(a_configuration())
+        self.netconf_mock.should_receive("edit_config").and_return(an_ok_response())
+        self.netconf_mock.should_receive("commit").once()
+
+        self.switch.get_interfaces()
+
+        self.switch.in_transaction = True
+        self.switch.reset_interface("ge-0/0/1")
+        self.switch.commit_transaction()
+        self.switch.in_transaction = False
+
+        self.switch.get_interfaces()
+
+
+TERSE = """
+    <get-interface-information>
+      <terse/>
+    </get-interface-information>
+"""
+
+
+def a_terse_reply(*interfaces):
+    return an_rpc_response("""
+        <interface-information style="terse">
+          {}
+        </interface-information>
+    """.format("".join("""
+          <physical-interface>
+            <name>{}</name>
+            <admin-status>{}</admin-status>
+            <oper-status>down</oper-status>
+          </physical-interface>
+    """.format(name, status) for name, status in interfaces or [("ge-0/0/1", "up"), ("ge-0/0/2", "down")])))
+
+
+def at_time(seconds):
+    return mock.patch("netman.adapters.switches.juniper.inventory.time.time", return_value=seconds)
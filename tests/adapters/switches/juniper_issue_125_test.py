@@ -14,7 +14,7 @@
 import signal
 import unittest
 
-from netman.adapters.switches.juniper.base import all_vlans
+from netman.adapters.switches.juniper.base import all_vlans, configuration_filter
 from netman.adapters.switches.juniper.standard import netconf
 from tests import available_models
 
@@ -40,15 +40,15 @@ class JuniperIssue125Test(unittest.TestCase):
     def test_juniper_does_not_break_with_after_reading_a_4096_chunk(self):
         self._setup_vlan_list_to_be_the_exact_problematic_size(4097)
 
-        self.switch.query(all_vlans)
+        self._fetch_all_vlans()
         with Timeout(seconds=1, error_message="ssh reading is stuck"):
-            self.switch.query(all_vlans)
+            self._fetch_all_vlans()
 
     def _setup_vlan_list_to_be_the_exact_problematic_size(self, problematic_size):
         self.switch.add_vlan(1000, name="a")
-        result_with_one_vlan = self.switch.query(all_vlans).data_xml
+        result_with_one_vlan = self._fetch_all_vlans().data_xml
         self.switch.add_vlan(1001, name="a")
-        result_with_two_vlan = self.switch.query(all_vlans).data_xml
+        result_with_two_vlan = self._fetch_all_vlans().data_xml
 
         vlan_with_no_name_size = len(result_with_two_vlan) - len(result_with_one_vlan) - 1
 
@@ -66,6 +66,9 @@ class JuniperIssue125Test(unittest.TestCase):
 
         self.switch.add_vlan(1002, name="x" * (target_xml_size - remaining_size_to_add - vlan_with_no_name_size))
 
+    def _fetch_all_vlans(self):
+        return self.switch.netconf.get_config(source="candidate", filter=configuration_filter(all_vlans))
+
 
 class Timeout:
     def __init__(self, seconds=1, error_message='Timeout'):
@@ -61,12 +61,11 @@ class JuniperTest(unittest.TestCase):
         self.netconf_mock.should_receive("get_config").with_args(source="running", filter=is_xml("""
                 <filter>
                   <configuration>
-                     <interfaces>
-                       <interface>
-                          <name>ge-0/0/1</name>
-                        </interface>
-                      </interfaces>
-                    <vlans />
+                    <interfaces>
+                      <interface>
+                        <name>ge-0/0/1</name>
+                      </interface>
+                    </interfaces>
                   </configuration>
                 </filter>
             """)).and_return(a_configuration("""
@@ -115,12 +114,11 @@ class JuniperTest(unittest.TestCase):
         self.netconf_mock.should_receive("get_config").with_args(source="running", filter=is_xml("""
                     <filter>
                       <configuration>
-                          <interfaces>
-                            <interface>
-                              <name>ge-0/0/INEXISTENT</name>
-                            </interface>
-                          </interfaces>
-                        <vlans />
+                        <interfaces>
+                          <interface>
+                            <name>ge-0/0/INEXISTENT</name>
+                          </interface>
+                        </interfaces>
                       </configuration>
                     </filter>
                 """)).and_return(a_configuration("""
@@ -428,12 +426,11 @@ class JuniperTest(unittest.TestCase):
         self.netconf_mock.should_receive("get_config").with_args(source="running", filter=is_xml("""
                 <filter>
                   <configuration>
-                     <interfaces>
-                       <interface>
-                          <name>ge-0/0/1</name>
-                        </interface>
-                      </interfaces>
-                    <vlans />
+                    <interfaces>
+                      <interface>
+                        <name>ge-0/0/1</name>
+                      </interface>
+                    </interfaces>
                   </configuration>
                 </filter>
             """)).and_return(a_configuration("""
@@ -462,8 +459,11 @@ class JuniperTest(unittest.TestCase):
         self.netconf_mock.should_receive("get_config").with_args(source="candidate", filter=is_xml("""
             <filter>
               <configuration>
-                <interfaces/>
-                <vlans/>
+                <interfaces>
+                  <interface>
+                    <name>ge-0/0/6</name>
+                  </interface>
+                </interfaces>
               </configuration>
             </filter>
         """)).and_return(a_configuration("""
@@ -0,0 +1,102 @@
+# Copyright 2016 Internap.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import textwrap
+import unittest
+
+from flexmock import flexmock
+from hamcrest import assert_that, equal_to
+from ncclient.devices.junos import JunosDeviceHandler
+from ncclient.operations import RPCError
+from ncclient.xml_ import NCElement, to_ele
+
+from netman.adapters.recording import ReplayMismatch
+from netman.adapters.switches import juniper
+from netman.adapters.switches.juniper.records import ConfigurationReply
+from netman.adapters.switches.juniper.recording import NetconfRecording, RecordingNetconf, ReplayNetconf
+from netman.core.objects.switch_descriptor import SwitchDescriptor
+
+
+class JuniperRecordingTest(unittest.TestCase):
+
+    def setUp(self):
+        self.recording = NetconfRecording()
+        netconf = flexmock()
+        netconf.should_receive("get_config").and_return(NCElement(textwrap.dedent("""
+            <rpc-reply>
+              <data>
+                <configuration>
+                  <vlans>
+                    <vlan>
+                      <name>STANDARD</name>
+                      <vlan-id>10</vlan-id>
+                    </vlan>
+                  </vlans>
+                </configuration>
+              </data>
+            </rpc-reply>"""), JunosDeviceHandler(None).transform_reply()))
+        netconf.should_receive("lock").and_raise(RPCError(to_ele(textwrap.dedent("""
+            <rpc-error xmlns="urn:ietf:params:xml:ns:netconf:base:1.0">
+              <error-severity>error</error-severity>
+              <error-message>Configuration database is already open</error-message>
+            </rpc-error>"""))))
+
+        self.switch = juniper.standard.netconf(SwitchDescriptor(model='juniper', hostname="toto"))
+        self.switch.netconf = RecordingNetconf(netconf, self.recording)
+
+    def test_a_recorded_session_can_be_replayed(self):
+        vlans = self.switch.get_vlans()
+        with self.assertRaises(RPCError):
+            self.switch.netconf.lock(target="candidate")
+
+        self.switch.netconf = ReplayNetconf(self.recording)
+
+        assert_that([(v.number, v.name) for v in self.switch.get_vlans()], equal_to([(v.number, v.name) for v in vlans]))
+        with self.assertRaises(RPCError) as expect:
+            self.switch.netconf.lock(target="candidate")
+        assert_that(expect.exception.message, equal_to("Configuration database is already open"))
+
+    def test_replaying_operations_out_of_order_fails(self):
+        self.switch.get_vlans()
+
+        self.switch.netconf = ReplayNetconf(self.recording)
+
+        with self.assertRaises(ReplayMismatch):
+            self.switch.netconf.commit()
+
+    def test_a_streamed_reply_can_be_replayed(self):
+        reply = ConfigurationReply(textwrap.dedent("""
+            <rpc-reply xmlns="urn:ietf:params:xml:ns:netconf:base:1.0">
+              <data>
+                <configuration>
+                  <vlans>
+                    <vlan>
+                      <name>STANDARD</name>
+                      <vlan-id>10</vlan-id>
+                    </vlan>
+                  </vlans>
+                </configuration>
+              </data>
+            </rpc-reply>"""))
+        reply.parse()
+        netconf = flexmock()
+        netconf.should_receive("execute").and_return(reply)
+        self.switch.netconf = RecordingNetconf(netconf, self.recording)
+        self.switch.streaming_replies = True
+
+        vlans = self.switch.get_vlans()
+
+        self.switch.netconf = ReplayNetconf(self.recording)
+
+        assert_that([(v.number, v.name) for v in self.switch.get_vlans()], equal_to([(v.number, v.name) for v in vlans]))
@@ -0,0 +1,386 @@
+# Copyright 2016 Internap.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import textwrap
+import unittest
+from io import BytesIO
+
+from flexmock import flexmock, flexmock_teardown
+from hamcrest import assert_that, is_
+from netaddr import IPNetwork
+
+from netman.adapters.switches import juniper
+from netman.adapters.switches.juniper.base import configuration_filter, all_vlans, all_interfaces
+from netman.adapters.switches.juniper.records import read_configuration, ConfigurationReply, GetConfigurationRecords, \
+    ConfigurationRecords
+from netman.core.objects.access_groups import IN, OUT
+from netman.core.objects.port_modes import ACCESS, TRUNK, BOND_MEMBER
+from netman.core.objects.switch_descriptor import SwitchDescriptor
+from tests.adapters.switches import juniper_test, juniper_qfx_copper_test
+
+
+CONFIGURATION_REPLY = textwrap.dedent("""
+    <rpc-reply xmlns="urn:ietf:params:xml:ns:netconf:base:1.0" xmlns:junos="http://xml.juniper.net/junos/11.4R1/junos">
+      <data>
+        <configuration junos:commit-seconds="1" junos:commit-localtime="1970-01-01 00:00:01 UTC" junos:commit-user="me">
+          <interfaces>
+            <interface>
+              <name>ge-0/0/1</name>
+              <mtu>5000</mtu>
+              <disable />
+              <unit>
+                <name>0</name>
+                <family>
+                  <ethernet-switching>
+                    <port-mode>trunk</port-mode>
+                    <vlan>
+                      <members>VLAN1000</members>
+                      <members>1-3</members>
+                    </vlan>
+                    <native-vlan-id>2</native-vlan-id>
+                  </ethernet-switching>
+                </family>
+              </unit>
+            </interface>
+            <interface>
+              <name>ge-0/0/2</name>
+              <ether-options>
+                <no-auto-negotiation />
+                <ieee-802.3ad>
+                  <bundle>ae10</bundle>
+                </ieee-802.3ad>
+              </ether-options>
+            </interface>
+            <interface>
+              <name>ge-0/0/3</name>
+              <unit>
+                <name>0</name>
+                <family>
+                  <ethernet-switching>
+                    <vlan>
+                      <members>VLAN1000</members>
+                    </vlan>
+                  </ethernet-switching>
+                </family>
+              </unit>
+            </interface>
+            <interface>
+              <name>vlan</name>
+              <unit>
+                <name>1000</name>
+                <family>
+                  <inet>
+                    <filter>
+                      <input>
+                        <filter-name>AC-IN</filter-name>
+                      </input>
+                      <output>
+                        <filter-name>AC-OUT</filter-name>
+                      </output>
+                    </filter>
+                    <address>
+                      <name>3.3.3.2/27</name>
+                    </address>
+                    <address>
+                      <name>1.1.1.1/24</name>
+                    </address>
+                  </inet>
+                </family>
+              </unit>
+            </interface>
+          </interfaces>
+          <protocols>
+            <rstp>
+              <interface>
+                <name>ge-0/0/1</name>
+                <edge />
+                <no-root-port />
+              </interface>
+            </rstp>
+            <lldp>
+              <interface>
+                <name>ge-0/0/2</name>
+                <disable />
+              </interface>
+            </lldp>
+          </protocols>
+          <vlans>
+            <vlan>
+              <name>VLAN1000</name>
+              <vlan-id>1000</vlan-id>
+              <description>Shizzle</description>
+              <l3-interface>vlan.1000</l3-interface>
+            </vlan>
+            <vlan>
+              <name>VLAN2000</name>
+              <vlan-id>2000</vlan-id>
+            </vlan>
+            <vlan>
+              <name>default</name>
+            </vlan>
+          </vlans>
+        </configuration>
+      </data>
+    </rpc-reply>
+""")
+
+
+class ReadConfigurationTest(unittest.TestCase):
+
+    def setUp(self):
+        self.records, self.errors = read_configuration(BytesIO(CONFIGURATION_REPLY))
+
+    def test_vlans_are_decoded(self):
+        assert_that([(v.name, v.number, v.description, v.l3_interface) for v in self.records.vlans], is_([
+            ("VLAN1000", 1000, "Shizzle", "vlan.1000"),
+            ("VLAN2000", 2000, None, None),
+            ("default", None, None, None),
+        ]))
+
+    def test_vlan_numbers_are_indexed_by_name(self):
+        assert_that(self.records.vlan_ids_by_name, is_({"VLAN1000": 1000, "VLAN2000": 2000}))
+
+    def test_interfaces_are_decoded(self):
+        assert_that(self.records.interfaces.keys(), is_(["ge-0/0/1", "ge-0/0/2", "ge-0/0/3", "vlan"]))
+
+        trunk = self.records.interfaces["ge-0/0/1"]
+        assert_that((trunk.mtu, trunk.disabled, trunk.bundle), is_((5000, True, None)))
+        unit = trunk.units["0"]
+        assert_that((unit.port_mode, unit.members, unit.native_vlan), is_(("trunk", ["VLAN1000", "1-3"], 2)))
+
+        member = self.records.interfaces["ge-0/0/2"]
+        assert_that((member.bundle, member.auto_negotiation, member.disabled), is_(("ae10", False, False)))
+
+        l3_unit = self.records.interfaces["vlan"].units["1000"]
+        assert_that(l3_unit.ips, is_(["3.3.3.2/27", "1.1.1.1/24"]))
+        assert_that((l3_unit.input_filter, l3_unit.output_filter), is_(("AC-IN", "AC-OUT")))
+
+    def test_protocol_interfaces_are_decoded(self):
+        rstp = self.records.protocols["rstp"]["ge-0/0/1"]
+        assert_that((rstp.edge, rstp.no_root_port, rstp.disabled), is_((True, True, False)))
+
+        assert_that(self.records.protocols["lldp"]["ge-0/0/2"].disabled, is_(True))
+
+    def test_no_errors_are_reported(self):
+        assert_that(self.errors, is_([]))
+
+
+class ConfigurationReplyTest(unittest.TestCase):
+
+    def test_the_configuration_is_decoded_when_parsed(self):
+        reply = ConfigurationReply(CONFIGURATION_REPLY)
+        reply.parse()
+
+        assert_that(reply.ok, is_(True))
+        assert_that(len(reply.configuration.vlans), is_(3))
+
+    def test_rpc_errors_are_reported(self):
+        reply = ConfigurationReply(textwrap.dedent("""
+            <rpc-reply xmlns="urn:ietf:params:xml:ns:netconf:base:1.0">
+              <rpc-error>
+                <error-type>protocol</error-type>
+                <error-tag>operation-failed</error-tag>
+                <error-severity>error</error-severity>
+                <error-message>syntax error</error-message>
+              </rpc-error>
+            </rpc-reply>
+        """))
+
+        assert_that(reply.ok, is_(False))
+        assert_that(reply.error.message, is_("syntax error"))
+
+    def test_a_reply_received_as_text_is_decoded_across_chunks(self):
+        description = u"caf\xe9 " * 20000
+        reply = ConfigurationReply(CONFIGURATION_REPLY.decode("utf-8").replace(u"Shizzle", description))
+        reply.parse()
+
+        assert_that(reply.configuration.vlans[0].description, is_(description))
+
+
+class JuniperStreamingRepliesTest(unittest.TestCase):
+
+    def setUp(self):
+        self.switch = juniper.standard.netconf(SwitchDescriptor(model='juniper', hostname="toto"),
+                                               streaming_replies=True)
+
+        self.netconf_mock = flexmock()
+        self.switch.netconf = self.netconf_mock
+
+        reply = ConfigurationReply(CONFIGURATION_REPLY)
+        reply.parse()
+        self.configuration = reply.configuration
+
+    def tearDown(self):
+        flexmock_teardown()
+
+    def test_get_vlans_decodes_a_streamed_reply(self):
+        self.netconf_mock.should_receive("execute").with_args(
+            GetConfigurationRecords, source="running", filter=is_filter(all_vlans, all_interfaces)
+        ).and_return(flexmock(configuration=self.configuration)).once()
+
+        vlan1000, vlan2000 = self.switch.get_vlans()
+
+        assert_that((vlan1000.number, vlan1000.name), is_((1000, "Shizzle")))
+        assert_that(vlan1000.ips, is_([IPNetwork("1.1.1.1/24"), IPNetwork("3.3.3.2/27")]))
+        assert_that(vlan1000.access_groups[IN], is_("AC-IN"))
+        assert_that(vlan1000.access_groups[OUT], is_("AC-OUT"))
+
+        assert_that((vlan2000.number, vlan2000.name, vlan2000.ips), is_((2000, None, [])))
+
+    def test_get_interfaces_decodes_a_streamed_reply(self):
+        self.switch.in_transaction = True
+        self.netconf_mock.should_receive("rpc").and_return(physical_interfaces(
+            "ge-0/0/1", "ge-0/0/2", "ge-0/0/3", "ge-0/0/4", "ae10"))
+        self.netconf_mock.should_receive("execute").with_args(
+            GetConfigurationRecords, source="candidate", filter=is_filter(all_interfaces, all_vlans)
+        ).and_return(flexmock(configuration=self.configuration)).once()
+
+        trunk, member, access, unconfigured = self.switch.get_interfaces()
+
+        assert_that(trunk.name, is_("ge-0/0/1"))
+        assert_that(trunk.port_mode, is_(TRUNK))
+        assert_that(list(trunk.trunk_vlans), is_([1, 2, 3, 1000]))
+        assert_that(trunk.trunk_native_vlan, is_(2))
+        assert_that((trunk.shutdown, trunk.mtu, trunk.bond_master), is_((True, 5000, None)))
+
+        assert_that((member.port_mode, member.bond_master, member.auto_negotiation), is_((BOND_MEMBER, 10, False)))
+
+        assert_that((access.port_mode, access.access_vlan), is_((ACCESS, 1000)))
+
+        assert_that((unconfigured.name, unconfigured.port_mode, unconfigured.shutdown), is_(("ge-0/0/4", ACCESS, False)))
+
+    def test_streaming_is_off_by_default(self):
+        switch = juniper.standard.netconf(SwitchDescriptor(model='juniper', hostname="toto"))
+
+        assert_that(switch.streaming_replies, is_(False))
+
+
+class StandardJuniperStreamingRepliesTest(unittest.TestCase):
+    """
+    The JuniperTest cases of get_vlans and get_interfaces, with their replies streamed
+    """
+    def setUp(self):
+        self.switch = juniper.standard.netconf(SwitchDescriptor(model='juniper', hostname="toto"),
+                                               streaming_replies=True)
+
+        self.netconf_mock = flexmock()
+        self.switch.netconf = self.netconf_mock
+        self.switch.in_transaction = True
+        answer_records_with_get_config(self.netconf_mock)
+
+    def tearDown(self):
+        flexmock_teardown()
+
+    test_get_vlans = vars(juniper_test.JuniperTest)["test_get_vlans"]
+    test_get_vlans_where_vlan_interfaces_can_also_be_called_irb = \
+        vars(juniper_test.JuniperTest)["test_get_vlans_where_vlan_interfaces_can_also_be_called_irb"]
+    test_get_interfaces = vars(juniper_test.JuniperTest)["test_get_interfaces"]
+    test_get_interfaces_lists_configuration_less_interfaces = \
+        vars(juniper_test.JuniperTest)["test_get_interfaces_lists_configuration_less_interfaces"]
+    test_get_interfaces_supports_named_vlans = \
+        vars(juniper_test.JuniperTest)["test_get_interfaces_supports_named_vlans"]
+
+    def test_interface_mode_and_an_interface_native_vlan_are_not_standard(self):
+        interface = self.switch.record_to_interface(a_single_interface_record("""
+            <native-vlan-id>2000</native-vlan-id>
+            <unit>
+              <name>0</name>
+              <family>
+                <ethernet-switching>
+                  <interface-mode>trunk</interface-mode>
+                </ethernet-switching>
+              </family>
+            </unit>
+        """), ConfigurationRecords())
+
+        assert_that((interface.port_mode, interface.trunk_native_vlan), is_((ACCESS, None)))
+
+
+class QfxCopperJuniperStreamingRepliesTest(unittest.TestCase):
+    """
+    The QFX copper JuniperTest cases of get_interfaces, with their replies streamed
+    """
+    def setUp(self):
+        self.switch = juniper.qfx_copper.netconf(SwitchDescriptor(model='juniper', hostname="toto"))
+        self.switch.streaming_replies = True
+
+        self.netconf_mock = flexmock()
+        self.switch.netconf = self.netconf_mock
+        self.switch.in_transaction = True
+        answer_records_with_get_config(self.netconf_mock)
+
+    def tearDown(self):
+        flexmock_teardown()
+
+    test_get_interfaces = vars(juniper_qfx_copper_test.JuniperTest)["test_get_interfaces"]
+
+    def test_port_mode_and_a_unit_native_vlan_are_not_qfx_copper(self):
+        interface = self.switch.record_to_interface(a_single_interface_record("""
+            <unit>
+              <name>0</name>
+              <family>
+                <ethernet-switching>
+                  <port-mode>trunk</port-mode>
+                  <native-vlan-id>2000</native-vlan-id>
+                </ethernet-switching>
+              </family>
+            </unit>
+        """), ConfigurationRecords())
+
+        assert_that((interface.port_mode, interface.trunk_native_vlan), is_((ACCESS, None)))
+
+
+def a_single_interface_record(inner_data):
+    records, _ = read_configuration(BytesIO("""
+        <rpc-reply>
+          <data>
+            <configuration>
+              <interfaces>
+                <interface>
+                  <name>ge-0/0/1</name>
+                  {}
+                </interface>
+              </interfaces>
+            </configuration>
+          </data>
+        </rpc-reply>
+    """.format(inner_data)))
+    return records.interfaces["ge-0/0/1"]
+
+
+def answer_records_with_get_config(netconf_mock):
+    def execute(operation, source, filter):
+        reply = operation.REPLY_CLS(str(netconf_mock.get_config(source=source, filter=filter)))
+        reply.parse()
+        return reply
+
+    netconf_mock.should_receive("execute").replace_with(execute)
+
+
+def physical_interfaces(*names):
+    return flexmock(xpath=lambda _: [
+        flexmock(xpath=lambda field, name=name: [flexmock(text=name if field == "name" else "up")]) for name in names
+    ])
+
+
+def is_filter(*sections):
+    return IsFilter(configuration_filter(*sections))
+
+
+class IsFilter(object):
+    def __init__(self, expected):
+        self.expected = expected
+
+    def __eq__(self, other):
+        return [child.tag for child in other.iter()] == [child.tag for child in self.expected.iter()]
@@ -0,0 +1,238 @@
+# Copyright 2016 Internap.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import time
+import unittest
+
+from flexmock import flexmock, flexmock_teardown
+from hamcrest import assert_that, is_, is_not, none, contains
+from ncclient.operations import RPCError
+from ncclient.xml_ import to_ele
+
+from netman.adapters.switches import juniper
+from netman.adapters.switches.juniper.base import all_vlans, vlan_index
+from netman.adapters.switches.juniper.running_config import RunningConfigCache
+from netman.core.objects.exceptions import OperationNotCompleted
+from netman.core.objects.switch_descriptor import SwitchDescriptor
+from tests.adapters.switches.juniper_test import is_xml, a_configuration, an_rpc_response
+
+
+class RunningConfigCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.cache = RunningConfigCache(max_entries_per_switch=2)
+        self.switch_descriptor = SwitchDescriptor(model="juniper", hostname="my.hostname")
+
+    def test_a_reply_is_served_for_the_commit_it_was_fetched_at(self):
+        self.cache.put(self.switch_descriptor, "commit 1", "vlans", "config")
+
+        assert_that(self.cache.get(self.switch_descriptor, "commit 1", "vlans"), is_("config"))
+        assert_that(self.cache.get(self.switch_descriptor, "commit 2", "vlans"), is_(none()))
+
+    def test_replies_of_an_older_commit_are_dropped(self):
+        self.cache.put(self.switch_descriptor, "commit 1", "vlans", "config")
+        self.cache.put(self.switch_descriptor, "commit 2", "interfaces", "other config")
+
+        assert_that(self.cache.get(self.switch_descriptor, "commit 1", "vlans"), is_(none()))
+        assert_that(self.cache.get(self.switch_descriptor, "commit 2", "vlans"), is_(none()))
+
+    def test_replies_are_kept_per_switch(self):
+        self.cache.put(self.switch_descriptor, "commit 1", "vlans", "config")
+
+        other_switch = SwitchDescriptor(model="juniper", hostname="other.hostname")
+        assert_that(self.cache.get(other_switch, "commit 1", "vlans"), is_(none()))
+
+    def test_replies_are_kept_per_user(self):
+        self.cache.put(self.switch_descriptor, "commit 1", "vlans", "config")
+
+        other_user = SwitchDescriptor(model="juniper", hostname="my.hostname", username="other")
+        assert_that(self.cache.get(other_user, "commit 1", "vlans"), is_(none()))
+
+    def test_the_least_recently_used_replies_are_dropped_past_the_limit(self):
+        self.cache.put(self.switch_descriptor, "commit 1", "vlans", "vlans config")
+        self.cache.put(self.switch_descriptor, "commit 1", "interfaces", "interfaces config")
+        self.cache.get(self.switch_descriptor, "commit 1", "vlans")
+        self.cache.put(self.switch_descriptor, "commit 1", "bonds", "bonds config")
+
+        assert_that(self.cache.get(self.switch_descriptor, "commit 1", "vlans"), is_("vlans config"))
+        assert_that(self.cache.get(self.switch_descriptor, "commit 1", "interfaces"), is_(none()))
+
+
+class JuniperRunningConfigCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.cache = RunningConfigCache()
+        self.netconf_mock = flexmock()
+
+    def tearDown(self):
+        flexmock_teardown()
+
+    def test_the_running_config_is_fetched_again_only_after_a_new_commit(self):
+        self.netconf_mock.should_receive("rpc").with_args(is_xml("<get-commit-information/>")).times(3)\
+            .and_return(a_commit_history("2016-01-01 00:00:00 UTC"))\
+            .and_return(a_commit_history("2016-01-01 00:00:00 UTC"))\
+            .and_return(a_commit_history("2016-01-02 00:00:00 UTC"))
+
+        self.netconf_mock.should_receive("get_config").with_args(source="running", filter=is_xml("""
+            <filter>
+              <configuration>
+                <vlans />
+                <interfaces />
+              </configuration>
+            </filter>
+        """)).twice().and_return(a_configuration("""
+            <vlans>
+              <vlan>
+                <name>VLAN1000</name>
+                <vlan-id>1000</vlan-id>
+              </vlan>
+            </vlans>
+        """))
+
+        for _ in range(3):
+            assert_that([vlan.number for vlan in self.a_switch().get_vlans()], contains(1000))
+
+    def test_the_latest_commit_is_asked_once_per_connection(self):
+        self.netconf_mock.should_receive("rpc").with_args(is_xml("<get-commit-information/>")).once()\
+            .and_return(a_commit_history("2016-01-01 00:00:00 UTC"))
+        self.netconf_mock.should_receive("get_config").twice().and_return(a_configuration())
+
+        switch = self.a_switch()
+        switch.get_vlans()
+        switch.get_vlans()
+        switch.get_bonds()
+
+    def test_the_candidate_is_never_cached(self):
+        self.netconf_mock.should_receive("rpc").never()
+        self.netconf_mock.should_receive("get_config").with_args(source="candidate", filter=object).twice()\
+            .and_return(a_configuration())
+
+        for _ in range(2):
+            switch = self.a_switch()
+            switch.in_transaction = True
+            switch.get_vlans()
+
+    def test_nothing_is_cached_if_the_latest_commit_is_unavailable(self):
+        self.netconf_mock.should_receive("rpc").with_args(is_xml("<get-commit-information/>")).once()\
+            .and_raise(RPCError(to_ele("""
+                <rpc-error xmlns="urn:ietf:params:xml:ns:netconf:base:1.0">
+                  <error-severity>error</error-severity>
+                  <error-message>syntax error</error-message>
+                </rpc-error>
+            """)))
+        self.netconf_mock.should_receive("get_config").twice().and_return(a_configuration())
+
+        switch = self.a_switch()
+        switch.get_vlans()
+        switch.get_vlans()
+
+        assert_that(switch.running_config_cache, is_(self.cache))
+
+    def test_an_unavailable_latest_commit_is_asked_again_on_the_next_connection(self):
+        self.netconf_mock.should_receive("rpc").with_args(is_xml("<get-commit-information/>")).twice()\
+            .and_raise(RPCError(to_ele("""
+                <rpc-error xmlns="urn:ietf:params:xml:ns:netconf:base:1.0">
+                  <error-severity>error</error-severity>
+                  <error-message>syntax error</error-message>
+                </rpc-error>
+            """)))\
+            .and_return(a_commit_history("2016-01-01 00:00:00 UTC"))
+        self.netconf_mock.should_receive("get_config").twice().and_return(a_configuration())
+
+        self.a_switch().get_vlans()
+
+        switch = self.a_switch()
+        switch.get_vlans()
+        switch.get_vlans()
+
+    def test_nothing_is_cached_for_a_commit_that_could_still_be_followed_within_the_same_second(self):
+        self.netconf_mock.should_receive("rpc").with_args(is_xml("<get-commit-information/>")).once()\
+            .and_return(a_commit_history("2016-01-01 00:00:00 UTC", seconds=int(time.time())))
+        self.netconf_mock.should_receive("get_config").twice().and_return(a_configuration())
+
+        switch = self.a_switch()
+        switch.get_vlans()
+        switch.get_vlans()
+
+    def test_the_commit_time_is_read_from_its_text_without_the_seconds_attribute(self):
+        self.netconf_mock.should_receive("rpc").with_args(is_xml("<get-commit-information/>")).twice()\
+            .and_return(a_commit_history(time.strftime("%Y-%m-%d %H:%M:%S UTC", time.gmtime())))\
+            .and_return(a_commit_history("2016-01-01 00:00:00 UTC"))
+        self.netconf_mock.should_receive("get_config").twice().and_return(a_configuration())
+
+        self.a_switch().get_vlans()
+
+        switch = self.a_switch()
+        switch.get_vlans()
+        switch.get_vlans()
+
+    def test_every_commit_attempt_drops_the_cached_replies(self):
+        self.netconf_mock.should_receive("rpc").with_args(is_xml("<get-commit-information/>"))\
+            .and_return(a_commit_history("2016-01-01 00:00:00 UTC"))
+        self.netconf_mock.should_receive("get_config").and_return(a_configuration())
+        self.netconf_mock.should_receive("commit").and_raise(RPCError(to_ele("""
+            <rpc-error xmlns="urn:ietf:params:xml:ns:netconf:base:1.0">
+              <error-severity>error</error-severity>
+              <error-message>commit failed</error-message>
+            </rpc-error>
+        """)))
+
+        switch = self.a_switch()
+        switch.get_vlans()
+        commit = switch.latest_commit
+
+        with self.assertRaises(OperationNotCompleted):
+            switch.commit_transaction()
+
+        assert_that(self.cache.get(switch.switch_descriptor, commit, "vlans"), is_(none()))
+        assert_that(self.cache._switches, is_({}))
+
+    def test_each_caller_indexes_a_cached_reply_on_its_own(self):
+        self.netconf_mock.should_receive("rpc").with_args(is_xml("<get-commit-information/>"))\
+            .and_return(a_commit_history("2016-01-01 00:00:00 UTC"))
+        self.netconf_mock.should_receive("get_config").once().and_return(a_configuration())
+
+        first_reply = self.a_switch().query(all_vlans)
+        second_reply = self.a_switch().query(all_vlans)
+
+        assert_that(first_reply.reply, is_(second_reply.reply))
+        assert_that(vlan_index(first_reply), is_not(vlan_index(second_reply)))
+        assert_that(hasattr(first_reply.reply, "_vlan_index"), is_(False))
+
+    def a_switch(self):
+        switch = juniper.standard.netconf(SwitchDescriptor(model='juniper', hostname="toto"))
+        switch.running_config_cache = self.cache
+        switch.netconf = self.netconf_mock
+        return switch
+
+
+def a_commit_history(date_time, seconds=None):
+    seconds_attribute = ' xmlns:junos="http://xml.juniper.net/junos/15.1R7/junos" junos:seconds="{}"'.format(seconds) \
+        if seconds is not None else ""
+    return an_rpc_response("""
+        <commit-information>
+          <commit-history>
+            <sequence-number>0</sequence-number>
+            <user>admin</user>
+            <client>netconf</client>
+            <date-time{}>{}</date-time>
+          </commit-history>
+          <commit-history>
+            <sequence-number>1</sequence-number>
+            <user>admin</user>
+            <client>cli</client>
+            <date-time>2015-01-01 00:00:00 UTC</date-time>
+          </commit-history>
+        </commit-information>
+    """.format(seconds_attribute, date_time))
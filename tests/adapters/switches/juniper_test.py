@@ -23,10 +23,14 @@ from hamcrest import assert_that, has_length, equal_to, contains_string, has_key
     is_, instance_of
 from ncclient.devices.junos import JunosDeviceHandler
 from ncclient.operations import RPCError, TimeoutExpiredError
+from ncclient.transport import TransportError
 from ncclient.xml_ import NCElement, to_ele, to_xml
 
+from netman.adapters.connection_pool import ConnectionPool
 from netman.adapters.switches import juniper
 from netman.adapters.switches.juniper import Juniper
+from netman.adapters.switches.juniper.base import interface_index, list_vlan_members, value_of, \
+    vlan_index, configuration_filter, one_interface, one_vlan_by_vlan_id, one_vlan, all_vlans
 from netman.adapters.switches.juniper.standard import JuniperCustomStrategies
 from netman.core.objects.access_groups import OUT, IN
 from netman.core.objects.exceptions import LockedSwitch, VlanAlreadyExist, BadVlanNumber, BadVlanName, UnknownVlan, \
@@ -793,11 +797,10 @@ class JuniperTest(unittest.TestCase):
             <filter>
               <configuration>
                 <interfaces>
-                    <interface>
-                        <name>ge-0/0/1</name>
-                    </interface>
+                  <interface>
+                    <name>ge-0/0/1</name>
+                  </interface>
                 </interfaces>
-                <vlans />
               </configuration>
             </filter>
         """)).and_return(a_configuration("""
@@ -827,17 +830,73 @@ class JuniperTest(unittest.TestCase):
         assert_that(interface.auto_negotiation, equal_to(None))
         assert_that(interface.mtu, equal_to(None))
 
+    def test_get_interface_resolves_vlan_names_starting_with_digits(self):
+        self.switch.in_transaction = False
+        self.netconf_mock.should_receive("get_config").with_args(source="running", filter=is_xml("""
+            <filter>
+              <configuration>
+                <interfaces>
+                  <interface>
+                    <name>ge-0/0/1</name>
+                  </interface>
+                </interfaces>
+              </configuration>
+            </filter>
+        """)).and_return(a_configuration("""
+            <interfaces>
+              <interface>
+                <name>ge-0/0/1</name>
+                <unit>
+                  <name>0</name>
+                  <family>
+                    <ethernet-switching>
+                      <port-mode>trunk</port-mode>
+                      <vlan>
+                        <members>100-servers</members>
+                        <members>200-202</members>
+                        <members>300</members>
+                      </vlan>
+                    </ethernet-switching>
+                  </family>
+                </unit>
+              </interface>
+            </interfaces>
+        """))
+
+        self.netconf_mock.should_receive("get_config").with_args(source="running", filter=is_xml("""
+            <filter>
+              <configuration>
+                <vlans>
+                  <vlan>
+                    <name>100-servers</name>
+                  </vlan>
+                </vlans>
+              </configuration>
+            </filter>
+        """)).and_return(a_configuration("""
+            <vlans>
+              <vlan>
+                <name>100-servers</name>
+                <vlan-id>150</vlan-id>
+              </vlan>
+            </vlans>
+        """)).once()
+
+        interface = self.switch.get_interface('ge-0/0/1')
+
+        assert_that(interface.port_mode, equal_to(TRUNK))
+        assert_that(list(interface.trunk_vlans), equal_to([150, 200, 201, 202, 300]))
+
     def test_get_unconfigured_but_existing_interface_returns_an_empty_interface(self):
         self.switch.in_transaction = False
         self.netconf_mock.should_receive("get_config").with_args(source="running", filter=is_xml("""
                     <filter>
                       <configuration>
-                          <interfaces>
-                            <interface>
-                              <name>ge-0/0/27</name>
-                            </interface>
-                          </interfaces>
-                        <vlans />
+                        <interfaces>
+                          <interface>
+                            <name>ge-0/0/27</name>
+                          </interface>
+                        </interfaces>
                       </configuration>
                     </filter>
                 """)).and_return(a_configuration("""
@@ -878,12 +937,11 @@ class JuniperTest(unittest.TestCase):
         self.netconf_mock.should_receive("get_config").with_args(source="running", filter=is_xml("""
                     <filter>
                       <configuration>
-                          <interfaces>
-                            <interface>
-                              <name>ge-0/0/27</name>
-                            </interface>
-                          </interfaces>
-                        <vlans />
+                        <interfaces>
+                          <interface>
+                            <name>ge-0/0/27</name>
+                          </interface>
+                        </interfaces>
                       </configuration>
                     </filter>
                 """)).and_return(a_configuration("""
@@ -917,12 +975,11 @@ class JuniperTest(unittest.TestCase):
         self.netconf_mock.should_receive("get_config").with_args(source="running", filter=is_xml("""
                     <filter>
                       <configuration>
-                          <interfaces>
-                            <interface>
-                              <name>ge-0/0/INEXISTENT</name>
-                            </interface>
-                          </interfaces>
-                        <vlans />
+                        <interfaces>
+                          <interface>
+                            <name>ge-0/0/INEXISTENT</name>
+                          </interface>
+                        </interfaces>
                       </configuration>
                     </filter>
                 """)).and_return(a_configuration("""
@@ -1894,8 +1951,11 @@ class JuniperTest(unittest.TestCase):
         self.netconf_mock.should_receive("get_config").with_args(source="candidate", filter=is_xml("""
             <filter>
               <configuration>
-                <interfaces/>
-                <vlans/>
+                <interfaces>
+                  <interface>
+                    <name>ge-0/0/6</name>
+                  </interface>
+                </interfaces>
               </configuration>
             </filter>
         """)).and_return(a_configuration("""
@@ -1941,8 +2001,11 @@ class JuniperTest(unittest.TestCase):
         self.netconf_mock.should_receive("get_config").with_args(source="candidate", filter=is_xml("""
             <filter>
               <configuration>
-                <interfaces/>
-                <vlans/>
+                <interfaces>
+                  <interface>
+                    <name>ge-0/0/6</name>
+                  </interface>
+                </interfaces>
               </configuration>
             </filter>
         """)).and_return(a_configuration("""
@@ -1991,8 +2054,11 @@ class JuniperTest(unittest.TestCase):
         self.netconf_mock.should_receive("get_config").with_args(source="candidate", filter=is_xml("""
             <filter>
               <configuration>
-                <interfaces/>
-                <vlans/>
+                <interfaces>
+                  <interface>
+                    <name>ge-0/0/6</name>
+                  </interface>
+                </interfaces>
               </configuration>
             </filter>
         """)).and_return(a_configuration("""
@@ -2038,12 +2104,91 @@ class JuniperTest(unittest.TestCase):
 
         self.switch.set_access_mode("ge-0/0/6")
 
+    def test_port_mode_access_fetches_the_vlans_referenced_by_name(self):
+        self.netconf_mock.should_receive("get_config").with_args(source="candidate", filter=is_xml("""
+            <filter>
+              <configuration>
+                <interfaces>
+                  <interface>
+                    <name>ge-0/0/6</name>
+                  </interface>
+                </interfaces>
+              </configuration>
+            </filter>
+        """)).and_return(a_configuration("""
+            <interfaces>
+              <interface>
+                <name>ge-0/0/6</name>
+                <unit>
+                  <name>0</name>
+                  <family>
+                    <ethernet-switching>
+                      <port-mode>trunk</port-mode>
+                      <vlan>
+                        <members>VLAN2998</members>
+                        <members>VLAN2999</members>
+                      </vlan>
+                    </ethernet-switching>
+                  </family>
+                </unit>
+              </interface>
+            </interfaces>
+        """))
+
+        self.netconf_mock.should_receive("get_config").with_args(source="candidate", filter=is_xml("""
+            <filter>
+              <configuration>
+                <vlans>
+                  <vlan>
+                    <name>VLAN2998</name>
+                  </vlan>
+                  <vlan>
+                    <name>VLAN2999</name>
+                  </vlan>
+                </vlans>
+              </configuration>
+            </filter>
+        """)).and_return(a_configuration("""
+            <vlans>
+              <vlan>
+                <name>VLAN2998</name>
+                <vlan-id>2998</vlan-id>
+              </vlan>
+            </vlans>
+        """)).once()
+
+        self.netconf_mock.should_receive("edit_config").once().with_args(target="candidate", config=is_xml("""
+            <config>
+              <configuration>
+                <interfaces>
+                  <interface>
+                    <name>ge-0/0/6</name>
+                    <unit>
+                      <name>0</name>
+                      <family>
+                        <ethernet-switching>
+                          <port-mode>access</port-mode>
+                          <vlan operation="delete" />
+                        </ethernet-switching>
+                      </family>
+                    </unit>
+                  </interface>
+                </interfaces>
+              </configuration>
+            </config>
+        """)).and_return(an_ok_response())
+
+        self.switch.set_access_mode("ge-0/0/6")
+
     def test_port_mode_access_with_trunk_mode_and_no_attributes_just_sets_mode(self):
         self.netconf_mock.should_receive("get_config").with_args(source="candidate", filter=is_xml("""
             <filter>
               <configuration>
-                <interfaces/>
-                <vlans/>
+                <interfaces>
+                  <interface>
+                    <name>ge-0/0/6</name>
+                  </interface>
+                </interfaces>
               </configuration>
             </filter>
         """)).and_return(a_configuration("""
@@ -2089,8 +2234,11 @@ class JuniperTest(unittest.TestCase):
         self.netconf_mock.should_receive("get_config").with_args(source="candidate", filter=is_xml("""
             <filter>
               <configuration>
-                <interfaces/>
-                <vlans/>
+                <interfaces>
+                  <interface>
+                    <name>ge-0/0/6</name>
+                  </interface>
+                </interfaces>
               </configuration>
             </filter>
         """)).and_return(a_configuration("""
@@ -2118,8 +2266,11 @@ class JuniperTest(unittest.TestCase):
         self.netconf_mock.should_receive("get_config").with_args(source="candidate", filter=is_xml("""
             <filter>
               <configuration>
-                <interfaces/>
-                <vlans/>
+                <interfaces>
+                  <interface>
+                    <name>ge-0/0/99</name>
+                  </interface>
+                </interfaces>
               </configuration>
             </filter>
         """)).and_return(a_configuration("""
@@ -2162,8 +2313,11 @@ class JuniperTest(unittest.TestCase):
         self.netconf_mock.should_receive("get_config").with_args(source="candidate", filter=is_xml("""
             <filter>
               <configuration>
-                <interfaces/>
-                <vlans/>
+                <interfaces>
+                  <interface>
+                    <name>ge-0/0/6</name>
+                  </interface>
+                </interfaces>
               </configuration>
             </filter>
         """)).and_return(a_configuration("""
@@ -2197,8 +2351,11 @@ class JuniperTest(unittest.TestCase):
         self.netconf_mock.should_receive("get_config").with_args(source="candidate", filter=is_xml("""
             <filter>
               <configuration>
-                <interfaces/>
-                <vlans/>
+                <interfaces>
+                  <interface>
+                    <name>ge-0/0/6</name>
+                  </interface>
+                </interfaces>
               </configuration>
             </filter>
         """)).and_return(a_configuration("""
@@ -2256,7 +2413,6 @@ class JuniperTest(unittest.TestCase):
                     <name>ge-0/0/6</name>
                   </interface>
                 </interfaces>
-                <vlans/>
               </configuration>
             </filter>
         """)).and_return(a_configuration("""
@@ -2306,7 +2462,6 @@ class JuniperTest(unittest.TestCase):
                     <name>ge-0/0/6</name>
                   </interface>
                 </interfaces>
-                <vlans/>
               </configuration>
             </filter>
         """)).and_return(a_configuration("""
@@ -2360,7 +2515,6 @@ class JuniperTest(unittest.TestCase):
                     <name>ge-0/0/6</name>
                   </interface>
                 </interfaces>
-                <vlans/>
               </configuration>
             </filter>
         """)).and_return(a_configuration("""
@@ -2415,7 +2569,6 @@ class JuniperTest(unittest.TestCase):
                     <name>ge-0/0/6</name>
                   </interface>
                 </interfaces>
-                <vlans/>
               </configuration>
             </filter>
         """)).and_return(a_configuration("""
@@ -2452,7 +2605,6 @@ class JuniperTest(unittest.TestCase):
                     <name>ge-0/0/99</name>
                   </interface>
                 </interfaces>
-                <vlans/>
               </configuration>
             </filter>
         """)).and_return(a_configuration())
@@ -2491,7 +2643,6 @@ class JuniperTest(unittest.TestCase):
                     <name>ge-0/0/6</name>
                   </interface>
                 </interfaces>
-                <vlans/>
               </configuration>
             </filter>
         """)).and_return(a_configuration())
@@ -2522,8 +2673,16 @@ class JuniperTest(unittest.TestCase):
         self.netconf_mock.should_receive("get_config").with_args(source="candidate", filter=is_xml("""
             <filter>
               <configuration>
-                <interfaces/>
-                <vlans/>
+                <interfaces>
+                  <interface>
+                    <name>ge-0/0/6</name>
+                  </interface>
+                </interfaces>
+                <vlans>
+                  <vlan>
+                    <vlan-id>1000</vlan-id>
+                  </vlan>
+                </vlans>
               </configuration>
             </filter>
         """)).and_return(a_configuration("""
@@ -2576,8 +2735,16 @@ class JuniperTest(unittest.TestCase):
         self.netconf_mock.should_receive("get_config").with_args(source="candidate", filter=is_xml("""
             <filter>
               <configuration>
-                <interfaces/>
-                <vlans/>
+                <interfaces>
+                  <interface>
+                    <name>ge-0/0/6</name>
+                  </interface>
+                </interfaces>
+                <vlans>
+                  <vlan>
+                    <vlan-id>1000</vlan-id>
+                  </vlan>
+                </vlans>
               </configuration>
             </filter>
         """)).and_return(a_configuration("""
@@ -2613,8 +2780,16 @@ class JuniperTest(unittest.TestCase):
         self.netconf_mock.should_receive("get_config").with_args(source="candidate", filter=is_xml("""
             <filter>
               <configuration>
-                <interfaces/>
-                <vlans/>
+                <interfaces>
+                  <interface>
+                    <name>ge-0/0/6</name>
+                  </interface>
+                </interfaces>
+                <vlans>
+                  <vlan>
+                    <vlan-id>1000</vlan-id>
+                  </vlan>
+                </vlans>
               </configuration>
             </filter>
         """)).and_return(a_configuration("""
@@ -2667,8 +2842,16 @@ class JuniperTest(unittest.TestCase):
         self.netconf_mock.should_receive("get_config").with_args(source="candidate", filter=is_xml("""
             <filter>
               <configuration>
-                <interfaces/>
-                <vlans/>
+                <interfaces>
+                  <interface>
+                    <name>ge-0/0/6</name>
+                  </interface>
+                </interfaces>
+                <vlans>
+                  <vlan>
+                    <vlan-id>1000</vlan-id>
+                  </vlan>
+                </vlans>
               </configuration>
             </filter>
         """)).and_return(a_configuration("""
@@ -2731,8 +2914,16 @@ class JuniperTest(unittest.TestCase):
         self.netconf_mock.should_receive("get_config").with_args(source="candidate", filter=is_xml("""
             <filter>
               <configuration>
-                <interfaces/>
-                <vlans/>
+                <interfaces>
+                  <interface>
+                    <name>ge-0/0/6</name>
+                  </interface>
+                </interfaces>
+                <vlans>
+                  <vlan>
+                    <vlan-id>1000</vlan-id>
+                  </vlan>
+                </vlans>
               </configuration>
             </filter>
         """)).and_return(a_configuration("""
@@ -2768,8 +2959,16 @@ class JuniperTest(unittest.TestCase):
         self.netconf_mock.should_receive("get_config").with_args(source="candidate", filter=is_xml("""
             <filter>
               <configuration>
-                <interfaces/>
-                <vlans/>
+                <interfaces>
+                  <interface>
+                    <name>ge-0/0/6</name>
+                  </interface>
+                </interfaces>
+                <vlans>
+                  <vlan>
+                    <vlan-id>1000</vlan-id>
+                  </vlan>
+                </vlans>
               </configuration>
             </filter>
         """)).and_return(a_configuration("""
@@ -2805,8 +3004,16 @@ class JuniperTest(unittest.TestCase):
         self.netconf_mock.should_receive("get_config").with_args(source="candidate", filter=is_xml("""
             <filter>
               <configuration>
-                <interfaces/>
-                <vlans/>
+                <interfaces>
+                  <interface>
+                    <name>ge-0/0/6</name>
+                  </interface>
+                </interfaces>
+                <vlans>
+                  <vlan>
+                    <vlan-id>1000</vlan-id>
+                  </vlan>
+                </vlans>
               </configuration>
             </filter>
         """)).and_return(a_configuration("""
@@ -2847,8 +3054,16 @@ class JuniperTest(unittest.TestCase):
         self.netconf_mock.should_receive("get_config").with_args(source="candidate", filter=is_xml("""
             <filter>
               <configuration>
-                <interfaces/>
-                <vlans/>
+                <interfaces>
+                  <interface>
+                    <name>ge-0/0/99</name>
+                  </interface>
+                </interfaces>
+                <vlans>
+                  <vlan>
+                    <vlan-id>1000</vlan-id>
+                  </vlan>
+                </vlans>
               </configuration>
             </filter>
         """)).and_return(a_configuration("""
@@ -2982,7 +3197,6 @@ class JuniperTest(unittest.TestCase):
                     <name>ge-0/0/6</name>
                   </interface>
                 </interfaces>
-                <vlans/>
               </configuration>
             </filter>
         """)).and_return(a_configuration("""
@@ -3036,7 +3250,6 @@ class JuniperTest(unittest.TestCase):
                     <name>ge-0/0/6</name>
                   </interface>
                 </interfaces>
-                <vlans/>
               </configuration>
             </filter>
         """)).and_return(a_configuration("""
@@ -3071,7 +3284,6 @@ class JuniperTest(unittest.TestCase):
                     <name>ge-0/0/6</name>
                   </interface>
                 </interfaces>
-                <vlans/>
               </configuration>
             </filter>
         """)).and_return(a_configuration("""
@@ -3110,7 +3322,6 @@ class JuniperTest(unittest.TestCase):
                     <name>ge-0/0/6</name>
                   </interface>
                 </interfaces>
-                <vlans/>
               </configuration>
             </filter>
         """)).and_return(a_configuration(""))
@@ -3124,8 +3335,16 @@ class JuniperTest(unittest.TestCase):
         self.netconf_mock.should_receive("get_config").with_args(source="candidate", filter=is_xml("""
             <filter>
               <configuration>
-                <interfaces/>
-                <vlans/>
+                <interfaces>
+                  <interface>
+                    <name>ge-0/0/6</name>
+                  </interface>
+                </interfaces>
+                <vlans>
+                  <vlan>
+                    <vlan-id>1000</vlan-id>
+                  </vlan>
+                </vlans>
               </configuration>
             </filter>
         """)).and_return(a_configuration("""
@@ -3176,8 +3395,16 @@ class JuniperTest(unittest.TestCase):
         self.netconf_mock.should_receive("get_config").with_args(source="candidate", filter=is_xml("""
             <filter>
               <configuration>
-                <interfaces/>
-                <vlans/>
+                <interfaces>
+                  <interface>
+                    <name>ge-0/0/6</name>
+                  </interface>
+                </interfaces>
+                <vlans>
+                  <vlan>
+                    <vlan-id>1000</vlan-id>
+                  </vlan>
+                </vlans>
               </configuration>
             </filter>
         """)).and_return(a_configuration("""
@@ -3211,8 +3438,16 @@ class JuniperTest(unittest.TestCase):
         self.netconf_mock.should_receive("get_config").with_args(source="candidate", filter=is_xml("""
             <filter>
               <configuration>
-                <interfaces/>
-                <vlans/>
+                <interfaces>
+                  <interface>
+                    <name>ge-0/0/6</name>
+                  </interface>
+                </interfaces>
+                <vlans>
+                  <vlan>
+                    <vlan-id>1000</vlan-id>
+                  </vlan>
+                </vlans>
               </configuration>
             </filter>
         """)).and_return(a_configuration("""
@@ -3263,8 +3498,16 @@ class JuniperTest(unittest.TestCase):
         self.netconf_mock.should_receive("get_config").with_args(source="candidate", filter=is_xml("""
             <filter>
               <configuration>
-                <interfaces/>
-                <vlans/>
+                <interfaces>
+                  <interface>
+                    <name>ge-0/0/6</name>
+                  </interface>
+                </interfaces>
+                <vlans>
+                  <vlan>
+                    <vlan-id>1000</vlan-id>
+                  </vlan>
+                </vlans>
               </configuration>
             </filter>
         """)).and_return(a_configuration("""
@@ -3320,8 +3563,16 @@ class JuniperTest(unittest.TestCase):
         self.netconf_mock.should_receive("get_config").with_args(source="candidate", filter=is_xml("""
             <filter>
               <configuration>
-                <interfaces/>
-                <vlans/>
+                <interfaces>
+                  <interface>
+                    <name>ge-0/0/6</name>
+                  </interface>
+                </interfaces>
+                <vlans>
+                  <vlan>
+                    <vlan-id>1000</vlan-id>
+                  </vlan>
+                </vlans>
               </configuration>
             </filter>
         """)).and_return(a_configuration("""
@@ -3357,8 +3608,16 @@ class JuniperTest(unittest.TestCase):
         self.netconf_mock.should_receive("get_config").with_args(source="candidate", filter=is_xml("""
             <filter>
               <configuration>
-                <interfaces/>
-                <vlans/>
+                <interfaces>
+                  <interface>
+                    <name>ge-0/0/6</name>
+                  </interface>
+                </interfaces>
+                <vlans>
+                  <vlan>
+                    <vlan-id>1000</vlan-id>
+                  </vlan>
+                </vlans>
               </configuration>
             </filter>
         """)).and_return(a_configuration("""
@@ -3405,8 +3664,16 @@ class JuniperTest(unittest.TestCase):
         self.netconf_mock.should_receive("get_config").with_args(source="candidate", filter=is_xml("""
             <filter>
               <configuration>
-                <interfaces/>
-                <vlans/>
+                <interfaces>
+                  <interface>
+                    <name>ge-0/0/6</name>
+                  </interface>
+                </interfaces>
+                <vlans>
+                  <vlan>
+                    <vlan-id>1000</vlan-id>
+                  </vlan>
+                </vlans>
               </configuration>
             </filter>
         """)).and_return(a_configuration("""
@@ -3442,8 +3709,16 @@ class JuniperTest(unittest.TestCase):
         self.netconf_mock.should_receive("get_config").with_args(source="candidate", filter=is_xml("""
                 <filter>
                   <configuration>
-                    <interfaces/>
-                    <vlans/>
+                    <interfaces>
+                      <interface>
+                        <name>ge-0/0/99</name>
+                      </interface>
+                    </interfaces>
+                    <vlans>
+                      <vlan>
+                        <vlan-id>1000</vlan-id>
+                      </vlan>
+                    </vlans>
                   </configuration>
                 </filter>
             """)).and_return(a_configuration("""
@@ -3485,8 +3760,16 @@ class JuniperTest(unittest.TestCase):
         self.netconf_mock.should_receive("get_config").with_args(source="candidate", filter=is_xml("""
                 <filter>
                   <configuration>
-                    <interfaces/>
-                    <vlans/>
+                    <interfaces>
+                      <interface>
+                        <name>ge-0/0/6</name>
+                      </interface>
+                    </interfaces>
+                    <vlans>
+                      <vlan>
+                        <vlan-id>1000</vlan-id>
+                      </vlan>
+                    </vlans>
                   </configuration>
                 </filter>
             """)).and_return(a_configuration("""
@@ -3530,7 +3813,6 @@ class JuniperTest(unittest.TestCase):
                     <name>ge-0/0/6</name>
                   </interface>
                 </interfaces>
-                <vlans/>
               </configuration>
             </filter>
         """)).and_return(a_configuration("""
@@ -3581,7 +3863,6 @@ class JuniperTest(unittest.TestCase):
                     <name>ge-0/0/6</name>
                   </interface>
                 </interfaces>
-                <vlans/>
               </configuration>
             </filter>
         """)).and_return(a_configuration("""
@@ -3616,7 +3897,6 @@ class JuniperTest(unittest.TestCase):
                     <name>ge-0/0/6</name>
                   </interface>
                 </interfaces>
-                <vlans/>
               </configuration>
             </filter>
         """)).and_return(a_configuration(""))
@@ -3834,8 +4114,16 @@ class JuniperTest(unittest.TestCase):
         self.netconf_mock.should_receive("get_config").with_args(source="candidate", filter=is_xml("""
             <filter>
               <configuration>
-                <interfaces/>
-                <vlans/>
+                <interfaces>
+                  <interface>
+                    <name>ge-0/0/6</name>
+                  </interface>
+                </interfaces>
+                <vlans>
+                  <vlan>
+                    <vlan-id>1000</vlan-id>
+                  </vlan>
+                </vlans>
               </configuration>
             </filter>
         """)).and_return(a_configuration("""
@@ -3888,8 +4176,16 @@ class JuniperTest(unittest.TestCase):
         self.netconf_mock.should_receive("get_config").with_args(source="candidate", filter=is_xml("""
             <filter>
               <configuration>
-                <interfaces/>
-                <vlans/>
+                <interfaces>
+                  <interface>
+                    <name>ge-0/0/6</name>
+                  </interface>
+                </interfaces>
+                <vlans>
+                  <vlan>
+                    <vlan-id>1000</vlan-id>
+                  </vlan>
+                </vlans>
               </configuration>
             </filter>
         """)).and_return(a_configuration("""
@@ -3925,8 +4221,16 @@ class JuniperTest(unittest.TestCase):
         self.netconf_mock.should_receive("get_config").with_args(source="candidate", filter=is_xml("""
             <filter>
               <configuration>
-                <interfaces/>
-                <vlans/>
+                <interfaces>
+                  <interface>
+                    <name>ge-0/0/6</name>
+                  </interface>
+                </interfaces>
+                <vlans>
+                  <vlan>
+                    <vlan-id>1000</vlan-id>
+                  </vlan>
+                </vlans>
               </configuration>
             </filter>
         """)).and_return(a_configuration("""
@@ -3979,8 +4283,16 @@ class JuniperTest(unittest.TestCase):
         self.netconf_mock.should_receive("get_config").with_args(source="candidate", filter=is_xml("""
             <filter>
               <configuration>
-                <interfaces/>
-                <vlans/>
+                <interfaces>
+                  <interface>
+                    <name>ge-0/0/6</name>
+                  </interface>
+                </interfaces>
+                <vlans>
+                  <vlan>
+                    <vlan-id>1000</vlan-id>
+                  </vlan>
+                </vlans>
               </configuration>
             </filter>
         """)).and_return(a_configuration("""
@@ -4037,8 +4349,16 @@ class JuniperTest(unittest.TestCase):
         self.netconf_mock.should_receive("get_config").with_args(source="candidate", filter=is_xml("""
             <filter>
               <configuration>
-                <interfaces/>
-                <vlans/>
+                <interfaces>
+                  <interface>
+                    <name>ge-0/0/6</name>
+                  </interface>
+                </interfaces>
+                <vlans>
+                  <vlan>
+                    <vlan-id>1000</vlan-id>
+                  </vlan>
+                </vlans>
               </configuration>
             </filter>
         """)).and_return(a_configuration("""
@@ -4076,8 +4396,16 @@ class JuniperTest(unittest.TestCase):
         self.netconf_mock.should_receive("get_config").with_args(source="candidate", filter=is_xml("""
             <filter>
               <configuration>
-                <interfaces/>
-                <vlans/>
+                <interfaces>
+                  <interface>
+                    <name>ge-0/0/6</name>
+                  </interface>
+                </interfaces>
+                <vlans>
+                  <vlan>
+                    <vlan-id>1000</vlan-id>
+                  </vlan>
+                </vlans>
               </configuration>
             </filter>
         """)).and_return(a_configuration("""
@@ -4116,8 +4444,16 @@ class JuniperTest(unittest.TestCase):
         self.netconf_mock.should_receive("get_config").with_args(source="candidate", filter=is_xml("""
             <filter>
               <configuration>
-                <interfaces/>
-                <vlans/>
+                <interfaces>
+                  <interface>
+                    <name>ge-0/0/6</name>
+                  </interface>
+                </interfaces>
+                <vlans>
+                  <vlan>
+                    <vlan-id>1000</vlan-id>
+                  </vlan>
+                </vlans>
               </configuration>
             </filter>
         """)).and_return(a_configuration("""
@@ -4147,8 +4483,16 @@ class JuniperTest(unittest.TestCase):
         self.netconf_mock.should_receive("get_config").with_args(source="candidate", filter=is_xml("""
             <filter>
               <configuration>
-                <interfaces/>
-                <vlans/>
+                <interfaces>
+                  <interface>
+                    <name>ge-0/0/99</name>
+                  </interface>
+                </interfaces>
+                <vlans>
+                  <vlan>
+                    <vlan-id>1000</vlan-id>
+                  </vlan>
+                </vlans>
               </configuration>
             </filter>
         """)).and_return(a_configuration("""
@@ -4192,8 +4536,16 @@ class JuniperTest(unittest.TestCase):
         self.netconf_mock.should_receive("get_config").with_args(source="candidate", filter=is_xml("""
             <filter>
               <configuration>
-                <interfaces/>
-                <vlans/>
+                <interfaces>
+                  <interface>
+                    <name>ge-0/0/6</name>
+                  </interface>
+                </interfaces>
+                <vlans>
+                  <vlan>
+                    <vlan-id>1000</vlan-id>
+                  </vlan>
+                </vlans>
               </configuration>
             </filter>
         """)).and_return(a_configuration("""
@@ -4263,8 +4615,16 @@ class JuniperTest(unittest.TestCase):
         self.netconf_mock.should_receive("get_config").with_args(source="candidate", filter=is_xml("""
             <filter>
               <configuration>
-                <interfaces/>
-                <vlans/>
+                <interfaces>
+                  <interface>
+                    <name>ge-0/0/6</name>
+                  </interface>
+                </interfaces>
+                <vlans>
+                  <vlan>
+                    <vlan-id>1000</vlan-id>
+                  </vlan>
+                </vlans>
               </configuration>
             </filter>
         """)).and_return(a_configuration("""
@@ -4294,6 +4654,18 @@ class JuniperTest(unittest.TestCase):
             </interfaces>
         """))
 
+        self.netconf_mock.should_receive("get_config").with_args(source="candidate", filter=is_xml("""
+            <filter>
+              <configuration>
+                <vlans>
+                  <vlan>
+                    <name>SOEMTHING</name>
+                  </vlan>
+                </vlans>
+              </configuration>
+            </filter>
+        """)).and_return(a_configuration()).once()
+
         self.netconf_mock.should_receive("edit_config").once().with_args(target="candidate", config=is_xml("""
             <config>
               <configuration>
@@ -4323,8 +4695,16 @@ class JuniperTest(unittest.TestCase):
         self.netconf_mock.should_receive("get_config").with_args(source="candidate", filter=is_xml("""
             <filter>
               <configuration>
-                <interfaces/>
-                <vlans/>
+                <interfaces>
+                  <interface>
+                    <name>ge-0/0/6</name>
+                  </interface>
+                </interfaces>
+                <vlans>
+                  <vlan>
+                    <vlan-id>1000</vlan-id>
+                  </vlan>
+                </vlans>
               </configuration>
             </filter>
         """)).and_return(a_configuration("""
@@ -4364,8 +4744,16 @@ class JuniperTest(unittest.TestCase):
         self.netconf_mock.should_receive("get_config").with_args(source="candidate", filter=is_xml("""
             <filter>
               <configuration>
-                <interfaces/>
-                <vlans/>
+                <interfaces>
+                  <interface>
+                    <name>ge-0/0/6</name>
+                  </interface>
+                </interfaces>
+                <vlans>
+                  <vlan>
+                    <vlan-id>1000</vlan-id>
+                  </vlan>
+                </vlans>
               </configuration>
             </filter>
         """)).and_return(a_configuration("""
@@ -4404,8 +4792,16 @@ class JuniperTest(unittest.TestCase):
         self.netconf_mock.should_receive("get_config").with_args(source="candidate", filter=is_xml("""
             <filter>
               <configuration>
-                <interfaces/>
-                <vlans/>
+                <interfaces>
+                  <interface>
+                    <name>ge-0/0/6</name>
+                  </interface>
+                </interfaces>
+                <vlans>
+                  <vlan>
+                    <vlan-id>1000</vlan-id>
+                  </vlan>
+                </vlans>
               </configuration>
             </filter>
         """)).and_return(a_configuration("""
@@ -4443,8 +4839,16 @@ class JuniperTest(unittest.TestCase):
         self.netconf_mock.should_receive("get_config").with_args(source="candidate", filter=is_xml("""
             <filter>
               <configuration>
-                <interfaces/>
-                <vlans/>
+                <interfaces>
+                  <interface>
+                    <name>ge-0/0/6</name>
+                  </interface>
+                </interfaces>
+                <vlans>
+                  <vlan>
+                    <vlan-id>1000</vlan-id>
+                  </vlan>
+                </vlans>
               </configuration>
             </filter>
         """)).and_return(a_configuration("""
@@ -6410,7 +6814,6 @@ class JuniperTest(unittest.TestCase):
     @mock.patch("ncclient.manager.connect")
     def test_connect(self, connect_mock):
         connect_mock.return_value = self.netconf_mock
-        self.netconf_mock._session = mock.Mock()
 
         self.switch = Juniper(
             SwitchDescriptor(model='juniper', hostname="toto", username="tutu", password="titi", port=8000),
@@ -6431,7 +6834,6 @@ class JuniperTest(unittest.TestCase):
     @mock.patch("ncclient.manager.connect")
     def test_connect_without_port_uses_default(self, connect_mock):
         connect_mock.return_value = self.netconf_mock
-        self.netconf_mock._session = mock.Mock()
 
         self.switch = Juniper(
             SwitchDescriptor(model='juniper', hostname="toto", username="tutu", password="titi"),
@@ -6448,6 +6850,116 @@ class JuniperTest(unittest.TestCase):
             timeout=120
         )
 
+    @mock.patch("ncclient.manager.connect")
+    def test_connect_and_disconnect_with_a_connection_pool_reuses_the_session(self, connect_mock):
+        connect_mock.return_value = self.netconf_mock
+        self.netconf_mock.connected = True
+        self.netconf_mock.timeout = 300
+
+        self.switch = Juniper(SwitchDescriptor(model='juniper', hostname="toto"),
+                              custom_strategies=JuniperCustomStrategies())
+        self.switch.connection_pool = ConnectionPool()
+
+        self.switch.connect()
+        self.switch.disconnect()
+
+        self.netconf_mock.should_receive("close_session").never()
+        self.netconf_mock.should_receive("rpc").with_args(is_xml("""
+            <get-software-information/>
+        """)).once().and_return(an_rpc_response(textwrap.dedent("""
+            <software-information/>
+        """)))
+
+        self.switch.connect()
+
+        assert_that(self.switch.netconf, is_(self.netconf_mock))
+        assert_that(self.netconf_mock.timeout, is_(300))
+        assert_that(connect_mock.call_count, is_(1))
+
+    @mock.patch("ncclient.manager.connect")
+    def test_a_pooled_session_timed_out_by_the_device_is_replaced(self, connect_mock):
+        stale_netconf = flexmock(connected=True, timeout=300)
+        connect_mock.side_effect = [stale_netconf, self.netconf_mock]
+
+        self.switch = Juniper(SwitchDescriptor(model='juniper', hostname="toto"),
+                              custom_strategies=JuniperCustomStrategies())
+        self.switch.connection_pool = ConnectionPool()
+
+        self.switch.connect()
+        self.switch.disconnect()
+
+        stale_netconf.should_receive("rpc").once().and_raise(TransportError("Not connected to NETCONF server"))
+        stale_netconf.should_receive("close_session").once()
+
+        self.switch.connect()
+
+        assert_that(self.switch.netconf, is_(self.netconf_mock))
+
+    @mock.patch("ncclient.manager.connect")
+    def test_a_dead_pooled_session_is_replaced(self, connect_mock):
+        dead_netconf = flexmock(connected=True)
+        connect_mock.side_effect = [dead_netconf, self.netconf_mock]
+
+        self.switch = Juniper(SwitchDescriptor(model='juniper', hostname="toto"),
+                              custom_strategies=JuniperCustomStrategies())
+        self.switch.connection_pool = ConnectionPool()
+
+        self.switch.connect()
+        self.switch.disconnect()
+
+        dead_netconf.connected = False
+        dead_netconf.should_receive("close_session").once().and_raise(TimeoutExpiredError)
+
+        self.switch.connect()
+
+        assert_that(self.switch.netconf, is_(self.netconf_mock))
+
+    @mock.patch("ncclient.manager.connect")
+    def test_a_pooled_session_still_holding_the_candidate_lock_is_closed(self, connect_mock):
+        connect_mock.return_value = self.netconf_mock
+
+        self.switch = Juniper(SwitchDescriptor(model='juniper', hostname="toto"),
+                              custom_strategies=JuniperCustomStrategies())
+        self.switch.connection_pool = ConnectionPool()
+
+        self.switch.connect()
+        self.netconf_mock.should_receive("lock").with_args(target="candidate").once().ordered()
+        self.switch.start_transaction()
+
+        self.netconf_mock.should_receive("close_session").once().ordered()
+        self.switch.disconnect()
+
+        self.switch.in_transaction = False
+        self.switch.connect()
+
+        assert_that(connect_mock.call_count, is_(2))
+
+    @mock.patch("ncclient.manager.connect")
+    def test_a_pooled_session_that_failed_to_unlock_the_candidate_is_closed(self, connect_mock):
+        connect_mock.return_value = self.netconf_mock
+
+        self.switch = Juniper(SwitchDescriptor(model='juniper', hostname="toto"),
+                              custom_strategies=JuniperCustomStrategies())
+        self.switch.connection_pool = ConnectionPool()
+
+        self.switch.connect()
+        self.netconf_mock.should_receive("lock").with_args(target="candidate").once().ordered()
+        self.switch.start_transaction()
+
+        self.netconf_mock.should_receive("unlock").with_args(target="candidate").once().ordered() \
+            .and_raise(TimeoutExpiredError)
+        with self.assertRaises(TimeoutExpiredError):
+            self.switch.end_transaction()
+
+        assert_that(self.switch.in_transaction, is_(False))
+
+        self.netconf_mock.should_receive("close_session").once().ordered()
+        self.switch.disconnect()
+
+        self.switch.connect()
+
+        assert_that(connect_mock.call_count, is_(2))
+
     def test_disconnect(self):
         self.netconf_mock.should_receive("close_session").once().ordered()
 
@@ -6555,6 +7067,146 @@ class JuniperTest(unittest.TestCase):
         self.switch.rollback_transaction()
 
 
+class ConfigurationFilterTest(unittest.TestCase):
+
+    def test_sections_are_merged_under_a_single_container(self):
+        filter_node = configuration_filter(one_interface("ge-0/0/1"), one_vlan_by_vlan_id(1000), one_vlan("VLAN2000"))
+
+        assert_that(filter_node, is_(is_xml("""
+            <filter>
+              <configuration>
+                <interfaces>
+                  <interface>
+                    <name>ge-0/0/1</name>
+                  </interface>
+                </interfaces>
+                <vlans>
+                  <vlan>
+                    <vlan-id>1000</vlan-id>
+                  </vlan>
+                  <vlan>
+                    <name>VLAN2000</name>
+                  </vlan>
+                </vlans>
+              </configuration>
+            </filter>
+        """)))
+
+    def test_a_whole_section_wins_over_narrower_ones(self):
+        filter_node = configuration_filter(one_vlan_by_vlan_id(1000), all_vlans)
+
+        assert_that(filter_node, is_(is_xml("""
+            <filter>
+              <configuration>
+                <vlans />
+              </configuration>
+            </filter>
+        """)))
+
+
+class VlanIndexTest(unittest.TestCase):
+
+    def setUp(self):
+        self.config = a_configuration("""
+            <vlans>
+              <vlan>
+                <name>VLAN1000</name>
+                <vlan-id>1000</vlan-id>
+              </vlan>
+              <vlan>
+                <name>VLAN2000</name>
+                <vlan-id>2000</vlan-id>
+              </vlan>
+              <vlan>
+                <name>NO-ID</name>
+              </vlan>
+            </vlans>
+        """)
+
+    def test_vlans_are_indexed_by_name_and_id(self):
+        index = vlan_index(self.config)
+
+        assert_that(index.ids_by_name, is_({"VLAN1000": 1000, "VLAN2000": 2000}))
+        assert_that(index.names_by_id, is_({1000: "VLAN1000", 2000: "VLAN2000"}))
+        assert_that(value_of(index.nodes_by_id[2000].xpath("name")), is_("VLAN2000"))
+
+    def test_the_index_is_built_once_per_configuration(self):
+        assert_that(vlan_index(self.config), is_(vlan_index(self.config)))
+
+    def test_members_are_resolved_by_name_or_by_range(self):
+        interface_node = to_ele("""
+            <interface>
+              <unit>
+                <family>
+                  <ethernet-switching>
+                    <vlan>
+                      <members>VLAN2000</members>
+                      <members>10-12</members>
+                      <members>1000</members>
+                    </vlan>
+                  </ethernet-switching>
+                </family>
+              </unit>
+            </interface>
+        """)
+
+        assert_that(list(list_vlan_members(interface_node, self.config)), is_([10, 11, 12, 1000, 2000]))
+
+
+class InterfaceIndexTest(unittest.TestCase):
+
+    def setUp(self):
+        self.config = a_configuration("""
+            <interfaces>
+              <interface>
+                <name>ge-0/0/1</name>
+                <ether-options>
+                  <ieee-802.3ad>
+                    <bundle>ae1</bundle>
+                  </ieee-802.3ad>
+                </ether-options>
+              </interface>
+              <interface>
+                <name>ge-0/0/2</name>
+                <ether-options>
+                  <ieee-802.3ad>
+                    <bundle>ae1</bundle>
+                  </ieee-802.3ad>
+                </ether-options>
+              </interface>
+              <interface>
+                <name>irb</name>
+                <unit>
+                  <name>1000</name>
+                </unit>
+                <unit>
+                  <name>2000</name>
+                </unit>
+              </interface>
+            </interfaces>
+        """)
+
+    def test_interfaces_are_indexed_by_name(self):
+        index = interface_index(self.config)
+
+        assert_that(sorted(index.nodes_by_name.keys()), is_(["ge-0/0/1", "ge-0/0/2", "irb"]))
+        assert_that(value_of(index.nodes_by_name["ge-0/0/2"].xpath("name")), is_("ge-0/0/2"))
+
+    def test_units_are_indexed_by_interface_and_unit_name(self):
+        index = interface_index(self.config)
+
+        assert_that(sorted(index.units.keys()), is_([("irb", "1000"), ("irb", "2000")]))
+        assert_that(value_of(index.units[("irb", "2000")].xpath("name")), is_("2000"))
+
+    def test_bundle_members_are_kept_in_document_order(self):
+        members = interface_index(self.config).members_by_bundle["ae1"]
+
+        assert_that([value_of(m.xpath("name")) for m in members], is_(["ge-0/0/1", "ge-0/0/2"]))
+
+    def test_the_index_is_built_once_per_configuration(self):
+        assert_that(interface_index(self.config), is_(interface_index(self.config)))
+
+
 def a_configuration(inner_data=""):
     return an_rpc_response("""
         <data>
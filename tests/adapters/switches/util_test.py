@@ -0,0 +1,115 @@
+# Copyright 2016 Internap.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import unittest
+
+import mock
+
+from hamcrest import assert_that, is_, none
+
+from netman import regex
+from netman.adapters.switches.util import LineClassifier, ResultChecker, result_pattern, SubShell, \
+    parse_switchport_interface
+from netman.core.objects.exceptions import CommandTimeout, UnknownVlan
+from netman.core.objects.port_modes import TRUNK
+
+
+class LineClassifierTest(unittest.TestCase):
+
+    def setUp(self):
+        self.classifier = LineClassifier([
+            ("^ name (\S+)", lambda context, name: ("name", context, name)),
+            ("^ (ip) address (\S+) (\S+)", lambda context, *groups: ("ip", context) + groups),
+            ("^ ip (.*)", lambda context, option: ("ip option", context, option)),
+            ("^ shutdown", lambda context: ("shutdown", context)),
+        ])
+
+    def test_the_handler_gets_the_context_and_the_groups_of_its_pattern(self):
+        assert_that(self.classifier.dispatch(" name my-vlan", "vlan"), is_(("name", "vlan", "my-vlan")))
+        assert_that(self.classifier.dispatch(" ip address 1.1.1.1 255.255.255.0", "vlan"),
+                    is_(("ip", "vlan", "ip", "1.1.1.1", "255.255.255.0")))
+        assert_that(self.classifier.dispatch(" shutdown", "vlan"), is_(("shutdown", "vlan")))
+
+    def test_the_first_matching_pattern_wins(self):
+        assert_that(self.classifier.dispatch(" ip redirects", "vlan"), is_(("ip option", "vlan", "redirects")))
+
+    def test_unmatched_lines_give_none(self):
+        assert_that(self.classifier.dispatch("interface Vlan1", "vlan"), none())
+
+
+class ResultCheckerTest(unittest.TestCase):
+
+    def test_a_result_pattern_is_matched_against_the_whole_output(self):
+        checker = ResultChecker(["vlan 1000", "Error: VLAN does not exist."])
+
+        with self.assertRaises(ValueError):
+            checker.on_result_matching(result_pattern(".*VLAN does not exist.*"), ValueError)
+
+    def test_an_output_not_matching_passes(self):
+        checker = ResultChecker(["vlan 1000"])
+
+        assert_that(checker.on_result_matching(result_pattern(".*VLAN does not exist.*"), ValueError), is_(checker))
+
+
+class ParseSwitchportInterfaceTest(unittest.TestCase):
+
+    def test_the_allowed_vlans_are_read_with_the_given_pattern(self):
+        interface = parse_switchport_interface("ethernet 1/g1", [
+            "switchport mode trunk",
+            "switchport trunk allowed vlan add 900,1000-1001",
+            "switchport trunk allowed vlan add 1003",
+            "mtu 5000",
+        ], regex.compile("switchport \S+ allowed vlan add (\S+)"))
+
+        assert_that(interface.port_mode, is_(TRUNK))
+        assert_that(interface.trunk_vlans, is_([900, 1000, 1001, 1003]))
+        assert_that(interface.mtu, is_(5000))
+
+    def test_lines_the_pattern_does_not_match_are_ignored(self):
+        interface = parse_switchport_interface("tengigabitethernet 0/0/1", [
+            "switchport trunk allowed vlan 1000",
+        ], regex.compile("switchport \S+ allowed vlan add (\S+)"))
+
+        assert_that(interface.trunk_vlans, is_([]))
+
+
+class SubShellTest(unittest.TestCase):
+
+    def test_a_session_leaving_a_sub_shell_on_a_timeout_is_marked_as_failed(self):
+        shell = mock.Mock(failed=False)
+
+        with self.assertRaises(CommandTimeout):
+            with SubShell(shell, enter="configure terminal", exit_cmd="exit"):
+                raise CommandTimeout("#")
+
+        assert_that(shell.failed, is_(True))
+        shell.do.assert_called_with("exit")
+
+    def test_a_session_leaving_a_sub_shell_on_a_domain_error_is_not_marked(self):
+        shell = mock.Mock(failed=False)
+
+        with self.assertRaises(UnknownVlan):
+            with SubShell(shell, enter="configure terminal", exit_cmd="exit"):
+                raise UnknownVlan(1000)
+
+        assert_that(shell.failed, is_(False))
+        shell.do.assert_called_with("exit")
+
+    def test_a_session_leaving_a_sub_shell_normally_is_not_marked(self):
+        shell = mock.Mock(failed=False)
+
+        with SubShell(shell, enter="configure terminal", exit_cmd="exit"):
+            pass
+
+        assert_that(shell.failed, is_(False))
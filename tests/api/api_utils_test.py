@@ -0,0 +1,45 @@
+# Copyright 2016 Internap.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import unittest
+
+import flask
+from hamcrest import assert_that, is_
+from mock import patch
+
+from netman.api.api_utils import loggable_body
+
+
+class LoggableBodyTest(unittest.TestCase):
+    def test_small_bodies_are_logged_whole(self):
+        response = flask.Response("a small body")
+
+        assert_that(loggable_body(response), is_("a small body"))
+
+    def test_large_bodies_are_truncated_to_the_logged_body_size(self):
+        response = flask.Response("0123456789")
+
+        with patch("netman.api.api_utils.logged_body_size", 4):
+            assert_that(loggable_body(response), is_("0123... (10 bytes)"))
+
+    def test_no_logged_body_size_logs_bodies_whole(self):
+        response = flask.Response("0123456789")
+
+        with patch("netman.api.api_utils.logged_body_size", None):
+            assert_that(loggable_body(response), is_("0123456789"))
+
+    def test_streamed_bodies_are_not_consumed(self):
+        response = flask.Response(iter(["a", "b"]))
+
+        assert_that(loggable_body(response), is_("<<streamed>>"))
@@ -0,0 +1,93 @@
+# Copyright 2016 Internap.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import unittest
+
+from hamcrest import assert_that, is_, equal_to, is_not
+
+from netman.core.objects.interface import Interface
+from netman.core.objects.vlan_set import VlanSet
+
+
+class VlanSetTest(unittest.TestCase):
+
+    def test_vlans_iterate_in_order_without_duplicates(self):
+        assert_that(list(VlanSet([300, 1, 200, 1])), is_([1, 200, 300]))
+        assert_that(len(VlanSet([300, 1, 200, 1])), is_(3))
+
+    def test_ranges_are_parsed_and_formatted(self):
+        vlans = VlanSet.from_ranges("1-99,200,300-301")
+
+        assert_that(len(vlans), is_(102))
+        assert_that(str(vlans), is_("1-99,200,300-301"))
+        assert_that(str(VlanSet()), is_(""))
+
+    def test_membership(self):
+        vlans = VlanSet.from_range(1, 4093)
+
+        assert_that(4093 in vlans, is_(True))
+        assert_that(4094 in vlans, is_(False))
+        assert_that(0 in vlans, is_(False))
+        assert_that(-1 in vlans, is_(False))
+        assert_that("10" in vlans, is_(False))
+
+    def test_union_and_difference(self):
+        vlans = VlanSet([1, 2, 3])
+
+        assert_that(vlans | [3, 4], equal_to(VlanSet([1, 2, 3, 4])))
+        assert_that(vlans + [5], equal_to(VlanSet([1, 2, 3, 5])))
+        assert_that(vlans - [2], equal_to(VlanSet([1, 3])))
+        assert_that(vlans & [2, 3, 4], equal_to(VlanSet([2, 3])))
+        assert_that(vlans, equal_to(VlanSet([1, 2, 3])))
+
+    def test_list_operations_are_supported(self):
+        vlans = VlanSet()
+        vlans.append(10)
+        vlans += [5, 20]
+        vlans.remove(20)
+
+        assert_that(vlans, equal_to([5, 10]))
+        assert_that(vlans[0], is_(5))
+        with self.assertRaises(ValueError):
+            vlans.remove(20)
+
+    def test_vlan_numbers_outside_the_12_bits_vlan_id_are_rejected(self):
+        for vlan in (-1, 4096, 2 ** 30):
+            with self.assertRaises(ValueError):
+                VlanSet([vlan])
+            with self.assertRaises(ValueError):
+                VlanSet().add(vlan)
+
+        with self.assertRaises(ValueError):
+            VlanSet.from_ranges("1-100000")
+
+        assert_that(VlanSet([0, 4095]), equal_to([0, 4095]))
+
+    def test_equality_with_lists_compares_the_vlans_in_order(self):
+        assert_that(VlanSet([1, 2]), equal_to([1, 2]))
+        assert_that(VlanSet([1, 2]), is_not(equal_to([2, 1])))
+        assert_that(VlanSet([1, 2]), is_not(equal_to([1, 2, 2])))
+        assert_that(VlanSet([1, 2]), is_not(equal_to([1, 2, 3])))
+        assert_that(VlanSet([1, 2]), equal_to({2, 1}))
+        assert_that([1, 2] == VlanSet([1, 2]), is_(True))
+        assert_that(VlanSet([1]) != [1], is_(False))
+
+    def test_interfaces_keep_their_trunk_vlans_in_a_vlan_set(self):
+        interface = Interface(trunk_vlans=[100, 10])
+
+        assert_that(interface.trunk_vlans, is_(VlanSet([10, 100])))
+
+        interface.trunk_vlans = range(1, 5)
+        assert_that(str(interface.trunk_vlans), is_("1-4"))
+        assert_that(vars(interface)["trunk_vlans"], is_(interface.trunk_vlans))
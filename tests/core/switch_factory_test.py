@@ -95,6 +95,16 @@ class SwitchFactoryTest(unittest.TestCase):
         assert_that(switch.wrapped_switch.switch_descriptor,
                     is_(SwitchDescriptor(model='test_model', hostname='hostname')))
 
+    def test_get_switch_by_descriptor_hands_the_connection_pool_to_the_switch(self):
+        self.semaphore_mocks['hostname'] = mock.Mock()
+        connection_pool = mock.Mock()
+        factory = SwitchFactory(switch_source=None, lock_factory=MockLockFactory(self.semaphore_mocks),
+                                connection_pool=connection_pool)
+
+        switch = factory.get_switch_by_descriptor(SwitchDescriptor(model='test_model', hostname='hostname'))
+
+        assert_that(switch.wrapped_switch.connection_pool, is_(connection_pool))
+
 
 class MockLockFactory(object):
 
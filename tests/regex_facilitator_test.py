@@ -1,7 +1,8 @@
+import re
 import unittest
 from threading import Thread
 
-from hamcrest import assert_that, is_
+from hamcrest import assert_that, is_, is_not
 
 from netman import regex
 
@@ -25,3 +26,11 @@ class RegexFacilitatorTest(unittest.TestCase):
         t.join()
 
         assert_that(regex[1], is_('world'))
+
+    def test_patterns_are_compiled_once(self):
+        assert_that(regex.compile('^(\w+)$'), is_(regex.compile('^(\w+)$')))
+        assert_that(regex.compile('^(\w+)$', re.I), is_not(regex.compile('^(\w+)$')))
+
+    def test_should_accept_a_compiled_pattern(self):
+        regex.match(regex.compile('^(\w+)\s(\w+)$'), 'hello world')
+        assert_that(regex[1], is_('world'))